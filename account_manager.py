@@ -1,13 +1,22 @@
 """
 Account Management Module for PropFire
-Handles account setup, equity tracking, and persistence
+Handles account setup, equity tracking, and persistence for any number of
+accounts (challenges and funded accounts) kept side by side in one store
 """
 
 import json
-import sqlite3
 import datetime
-from typing import Optional, List, Dict
-from dataclasses import dataclass
+import time
+from typing import Optional, List, Dict, Tuple
+from dataclasses import dataclass, field
+from database import get_database, date_to_day, day_to_date, DEFAULT_ACCOUNT_ID
+from migrations import migrate, STORE_MIGRATIONS, STORE_PATH
+from query_cache import get_query_cache, ALL_DAYS
+from equity_ledger import get_equity_ledger
+from event_bus import publish, EquityUpdated
+
+# Balance assumed for accounts whose starting balance was never set
+DEFAULT_STARTING_BALANCE = 10000.0
 
 @dataclass
 class EquityPoint:
@@ -16,100 +25,286 @@ class EquityPoint:
     equity: float
     pnl: float
 
+@dataclass
+class Account:
+    """Trading account with its own journal, trades and equity curve"""
+    id: int
+    name: str
+    starting_balance: float
+    created_at: float
+
+@dataclass
+class AccountSummary:
+    """Headline account figures, kept current as writes commit"""
+    starting_balance: float
+    current_equity: float
+    high_water_mark: float
+    last_update: Optional[datetime.date]  # Latest day on the equity curve
+    account_id: int = DEFAULT_ACCOUNT_ID
+    name: str = ""
+    
+    @property
+    def total_pnl(self) -> float:
+        """Profit or loss since the start"""
+        return self.current_equity - self.starting_balance
+    
+    @property
+    def drawdown(self) -> float:
+        """Distance below the high-water mark"""
+        return self.high_water_mark - self.current_equity
+
+@dataclass
+class AccountRollup:
+    """Every account's summary with combined totals"""
+    accounts: List[AccountSummary] = field(default_factory=list)
+    
+    @property
+    def starting_balance(self) -> float:
+        """Combined starting balance"""
+        return sum(a.starting_balance for a in self.accounts)
+    
+    @property
+    def current_equity(self) -> float:
+        """Combined current equity"""
+        return sum(a.current_equity for a in self.accounts)
+    
+    @property
+    def total_pnl(self) -> float:
+        """Combined profit or loss"""
+        return self.current_equity - self.starting_balance
+
+# Account rows per store, read once instead of on every summary
+_accounts: Dict[str, Dict[int, Account]] = {}
+
 class AccountRepository:
-    """Data access layer for account and equity data"""
+    """Data access layer for one account's equity data, and the account list"""
     
-    def __init__(self, db_path: str = "propfire_account.db"):
+    def __init__(self, db_path: str = STORE_PATH, account_id: Optional[int] = None):
         self.db_path = db_path
+        self.db = get_database(db_path)
         self.config_file = "account_config.json"
         self._init_db()
+        self.cache = get_query_cache(self.db)
+        # The active account unless one is named
+        self.account_id = account_id if account_id is not None else self.get_active_account_id()
+        self.ledger = get_equity_ledger(self.db, self.account_id)
     
     def _init_db(self):
-        """Initialize database schema"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS equity_curve (
-                    date TEXT PRIMARY KEY,
-                    equity REAL NOT NULL,
-                    pnl REAL DEFAULT 0
-                )
-            """)
-            conn.commit()
+        """Initialize or upgrade database schema"""
+        migrate(self.db, STORE_MIGRATIONS)
     
-    def get_starting_balance(self) -> Optional[float]:
-        """Get starting balance from config"""
+    def for_account(self, account_id: int) -> 'AccountRepository':
+        """Repository for another account in the same store"""
+        return AccountRepository(self.db_path, account_id)
+    
+    def list_accounts(self) -> List[Account]:
+        """Get every account, oldest first"""
+        rows = self.db.fetchall("SELECT id, name, starting_balance, created_at FROM accounts ORDER BY id")
+        accounts = {row[0]: Account(*row) for row in rows}
+        _accounts[self.db_path] = accounts
+        return list(accounts.values())
+    
+    def get_account(self, account_id: Optional[int] = None) -> Optional[Account]:
+        """Get an account (this repository's by default)"""
+        account_id = self.account_id if account_id is None else account_id
+        if account_id not in _accounts.get(self.db_path, {}):
+            self.list_accounts()
+        return _accounts[self.db_path].get(account_id)
+    
+    def create_account(self, name: str, starting_balance: float) -> Account:
+        """Add an account; its journal and equity start empty"""
+        with self.db.transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO accounts (name, starting_balance, created_at) VALUES (?, ?, ?)
+            """, (name, starting_balance, time.time()))
+            account_id = cursor.lastrowid
+        self.list_accounts()
+        return _accounts[self.db_path][account_id]
+    
+    def get_active_account_id(self) -> int:
+        """Get the account the app opens on"""
         try:
             with open(self.config_file, 'r') as f:
-                config = json.load(f)
-                return config.get('starting_balance')
+                account_id = json.load(f).get('active_account', DEFAULT_ACCOUNT_ID)
         except:
-            return None
+            account_id = DEFAULT_ACCOUNT_ID
+        return account_id if self.get_account(account_id) else DEFAULT_ACCOUNT_ID
     
-    def set_starting_balance(self, balance: float):
-        """Set starting balance and clear existing data"""
-        config = {'starting_balance': balance}
+    def set_active_account(self, account_id: int):
+        """Remember the account the app opens on"""
+        try:
+            with open(self.config_file, 'r') as f:
+                config = json.load(f)
+        except:
+            config = {}
+        config['active_account'] = account_id
         with open(self.config_file, 'w') as f:
             json.dump(config, f)
+    
+    def get_starting_balance(self) -> Optional[float]:
+        """Get starting balance of this account"""
+        account = self.get_account()
+        return account.starting_balance if account else None
+    
+    def set_starting_balance(self, balance: float):
+        """Set starting balance; history is kept and equity re-based on it"""
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE accounts SET starting_balance = ? WHERE id = ?", (balance, self.account_id))
+            # The ledger holds P&L only, so it stays valid; its listeners (the rule
+            # monitor) and the views re-read the summary against the new balance
+            self.db.on_commit(self.ledger.notify)
+            self.db.on_commit(lambda: self._publish_equity(frozenset(), rebased=True))
+            self.cache.invalidate(*ALL_DAYS)
+        self.list_accounts()
+    
+    def reset_equity(self):
+        """Clear this account's equity curve so equity restarts from the starting balance; trades and journal are kept"""
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM equity_curve WHERE account_id = ?", (self.account_id,))
+            self.db.on_commit(self.ledger.reset)
+            self.db.on_commit(lambda: self._publish_equity(frozenset(), rebased=True))
+            self.cache.invalidate(*ALL_DAYS)
+    
+    def get_equity_curve(self, start: Optional[datetime.date] = None,
+                         end: Optional[datetime.date] = None) -> List[EquityPoint]:
+        """Get equity curve data, optionally limited to a date range"""
+        first_day = date_to_day(start) if start else 0
+        last_day = date_to_day(end) if end else date_to_day(datetime.date.max)
         
-        # Clear existing equity data
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM equity_curve")
-            conn.commit()
-    
-    def get_equity_curve(self) -> List[EquityPoint]:
-        """Get equity curve data"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                SELECT date, equity, pnl FROM equity_curve 
-                ORDER BY date
-            """)
-            return [
-                EquityPoint(
-                    date=datetime.datetime.strptime(row[0], "%Y-%m-%d").date(),
-                    equity=row[1],
-                    pnl=row[2]
-                )
-                for row in cursor.fetchall()
-            ]
+        def load():
+            cursor = self.db.execute("""
+                SELECT day, pnl FROM equity_curve 
+                WHERE account_id = ? AND day BETWEEN ? AND ?
+                ORDER BY day
+            """, (self.account_id, first_day, last_day))
+            # Equity before the range comes from the ledger, then runs forward
+            equity = self.effective_starting_balance() + self.ledger.cumulative(first_day - 1)
+            points = []
+            for day, pnl in cursor.fetchall():
+                equity += pnl
+                points.append(EquityPoint(date=day_to_date(day), equity=equity, pnl=pnl))
+            return points
+        return self.cache.get("equity.curve", (first_day, last_day), load, self.account_id)
+    
+    def get_summary(self) -> AccountSummary:
+        """Get current equity, high-water mark and last update in O(1)"""
+        return self._summarize(self.get_account(), self.ledger)
+    
+    @staticmethod
+    def _summarize(account: Optional[Account], ledger) -> AccountSummary:
+        """Summary of an account from its ledger"""
+        starting_balance = account.starting_balance if account else DEFAULT_STARTING_BALANCE
+        total, peak, last_day = ledger.snapshot()
+        return AccountSummary(
+            starting_balance=starting_balance,
+            current_equity=starting_balance + total,
+            high_water_mark=starting_balance + peak,
+            last_update=day_to_date(last_day) if last_day is not None else None,
+            account_id=ledger.account_id,
+            name=account.name if account else ""
+        )
+    
+    def get_rollup(self) -> AccountRollup:
+        """Get every account's summary and the combined totals, O(1) per account"""
+        accounts = list(_accounts[self.db_path].values()) if self.db_path in _accounts else self.list_accounts()
+        return AccountRollup([self._summarize(account, get_equity_ledger(self.db, account.id))
+                              for account in accounts])
+    
+    def get_equity_at(self, date: datetime.date) -> float:
+        """Get account equity at the close of a date in O(log n)"""
+        return self.effective_starting_balance() + self.ledger.cumulative(date_to_day(date))
+    
+    def effective_starting_balance(self) -> float:
+        """Starting balance, defaulting for accounts that were never set up (a balance of 0 is kept)"""
+        balance = self.get_starting_balance()
+        return DEFAULT_STARTING_BALANCE if balance is None else balance
     
     def update_equity(self, date: datetime.date, pnl: float):
         """Update equity curve with new PnL"""
-        starting_balance = self.get_starting_balance() or 10000.0
+        self.set_daily_pnl({date: pnl})
+
+    def set_daily_pnl(self, pnl_by_date: Dict[datetime.date, float]):
+        """Set the P&L of days; equity of every later day follows without rewriting it"""
+        if not pnl_by_date:
+            return
+        rows = [(date_to_day(date), pnl) for date, pnl in pnl_by_date.items()]
         
-        # Get previous equity
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                SELECT equity FROM equity_curve 
-                WHERE date < ? ORDER BY date DESC LIMIT 1
-            """, (date.strftime("%Y-%m-%d"),))
-            
-            result = cursor.fetchone()
-            prev_equity = result[0] if result else starting_balance
-            new_equity = prev_equity + pnl
-            
-            # Insert or update
-            conn.execute("""
-                INSERT OR REPLACE INTO equity_curve (date, equity, pnl)
-                VALUES (?, ?, ?)
-            """, (date.strftime("%Y-%m-%d"), new_equity, pnl))
-            conn.commit()
+        # Inside a caller's transaction on the same store this is a savepoint,
+        # so equity commits (or rolls back) together with the trades it follows
+        with self.db.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO equity_curve (account_id, day, pnl) VALUES (?, ?, ?)
+                ON CONFLICT(account_id, day) DO UPDATE SET pnl = excluded.pnl
+            """, [(self.account_id, day, pnl) for day, pnl in rows])
+            # O(log n) per day once committed; equity is derived, never re-chained
+            self.db.on_commit(lambda: self.ledger.apply(rows))
+            self.db.on_commit(lambda: self._publish_equity(frozenset(day for day, _ in rows)))
+            self.cache.invalidate(min(day for day, _ in rows), ALL_DAYS[1])
+    
+    def set_intraday_extremes(self, extremes_by_date: Dict[datetime.date, Tuple[float, float]]):
+        """Store days' lowest and highest intraday equity; days without trades get a zero-P&L row"""
+        if not extremes_by_date:
+            return
+        rows = [(self.account_id, date_to_day(date), low, high) for date, (low, high) in extremes_by_date.items()]
+        days = [day for _, day, _, _ in rows]
+        with self.db.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO equity_curve (account_id, day, pnl, intraday_low, intraday_high)
+                VALUES (?, ?, 0, ?, ?)
+                ON CONFLICT(account_id, day) DO UPDATE SET
+                    intraday_low = excluded.intraday_low, intraday_high = excluded.intraday_high
+            """, rows)
+            # P&L is unchanged, but a new zero-P&L day can still be the latest on the curve
+            pnl = conn.execute(f"""
+                SELECT day, pnl FROM equity_curve WHERE account_id = ? AND day IN ({", ".join("?" * len(days))})
+            """, (self.account_id, *days)).fetchall()
+            self.db.on_commit(lambda: self.ledger.apply(pnl))
+            self.db.on_commit(lambda: self._publish_equity(frozenset(days)))
+            self.cache.invalidate(min(days), ALL_DAYS[1])
+    
+    def _publish_equity(self, days, rebased: bool = False):
+        """Tell views the equity changed, with the new summary"""
+        publish(EquityUpdated(self.account_id, self.get_summary(), days, rebased))
 
 class AccountService:
     """Business logic for account management"""
     
-    def __init__(self):
-        self.repository = AccountRepository()
+    def __init__(self, account_id: Optional[int] = None):
+        self.repository = AccountRepository(account_id=account_id)
     
-    def setup_account(self, starting_balance: float):
-        """Setup new account with starting balance"""
-        self.repository.set_starting_balance(starting_balance)
+    def setup_account(self, starting_balance: float, clear_history: bool = False):
+        """Setup account with starting balance, optionally clearing its equity history"""
+        with self.repository.db.transaction():
+            self.repository.set_starting_balance(starting_balance)
+            if clear_history:
+                self.repository.reset_equity()
+    
+    def list_accounts(self) -> List[Account]:
+        """Get every account"""
+        return self.repository.list_accounts()
+    
+    def create_account(self, name: str, starting_balance: float) -> Account:
+        """Add an account and switch to it"""
+        account = self.repository.create_account(name, starting_balance)
+        self.switch_account(account.id)
+        return account
+    
+    def switch_account(self, account_id: int):
+        """Make another account the active one"""
+        self.repository.set_active_account(account_id)
+        self.repository = self.repository.for_account(account_id)
+    
+    def get_rollup(self) -> AccountRollup:
+        """Get all accounts' summaries with combined totals"""
+        return self.repository.get_rollup()
     
     def get_current_equity(self) -> float:
         """Get current account equity"""
-        curve = self.repository.get_equity_curve()
-        if not curve:
-            return self.repository.get_starting_balance() or 10000.0
-        return curve[-1].equity
+        return self.repository.get_summary().current_equity
+    
+    def get_summary(self) -> AccountSummary:
+        """Get the account summary for display"""
+        return self.repository.get_summary()
     
     def get_equity_data(self) -> List[EquityPoint]:
         """Get equity curve for charting"""
@@ -0,0 +1,109 @@
+"""
+P&L Aggregates Module for PropFire
+Materialized per-account day/month/year totals kept up to date by the
+repository write path
+"""
+
+import datetime
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+from database import ConnectionManager, JULIAN_DAY_OFFSET, day_to_date
+
+@dataclass
+class PnLSummary:
+    """Aggregated P&L for a day, month or year"""
+    pnl: float = 0.0
+    fees: float = 0.0
+    trade_count: int = 0
+    wins: int = 0
+    losses: int = 0
+
+    @property
+    def win_rate(self) -> float:
+        """Share of decided trades that were winners"""
+        decided = self.wins + self.losses
+        return self.wins / decided if decided else 0.0
+
+    def shifted(self, pnl: float, fees: float, sign: int = 1) -> 'PnLSummary':
+        """Copy with one row added (sign=1) or removed (sign=-1), as PnLAggregates.apply does"""
+        return PnLSummary(self.pnl + sign * pnl, self.fees + sign * fees, self.trade_count + sign,
+                          self.wins + (sign if pnl > 0 else 0), self.losses + (sign if pnl < 0 else 0))
+
+# Key expressions per level: Python from a day number, SQL from a `day` column
+LEVEL_KEYS = {
+    "day": ("day", lambda day: day),
+    "month": (f"CAST(strftime('%Y%m', day + {JULIAN_DAY_OFFSET}) AS INTEGER)",
+              lambda day: month_key(day_to_date(day))),
+    "year": (f"CAST(strftime('%Y', day + {JULIAN_DAY_OFFSET}) AS INTEGER)",
+             lambda day: day_to_date(day).year),
+}
+
+def month_key(date: datetime.date) -> int:
+    """Key of the month containing a date, e.g. 202507"""
+    return date.year * 100 + date.month
+
+class PnLAggregates:
+    """Set of <prefix>_days/_months/_years tables summarizing a P&L source table"""
+
+    def __init__(self, prefix: str, levels: Sequence[str] = ("day", "month", "year")):
+        self.prefix = prefix
+        self.levels = tuple(levels)
+
+    def table(self, level: str) -> str:
+        """Table name for an aggregation level"""
+        return f"{self.prefix}_{level}s"
+
+    def apply(self, conn: sqlite3.Connection, account_id: int, day: int, pnl: float, fees: float, sign: int = 1):
+        """Add (sign=1) or remove (sign=-1) one row's contribution in the caller's transaction"""
+        win = sign if pnl > 0 else 0
+        loss = sign if pnl < 0 else 0
+        for level in self.levels:
+            table = self.table(level)
+            key = LEVEL_KEYS[level][1](day)
+            conn.execute(f"""
+                INSERT INTO {table} (account_id, key, pnl, fees, trade_count, wins, losses)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(account_id, key) DO UPDATE SET
+                    pnl = pnl + excluded.pnl,
+                    fees = fees + excluded.fees,
+                    trade_count = trade_count + excluded.trade_count,
+                    wins = wins + excluded.wins,
+                    losses = losses + excluded.losses
+            """, (account_id, key, sign * pnl, sign * fees, sign, win, loss))
+            conn.execute(f"DELETE FROM {table} WHERE account_id = ? AND key = ? AND trade_count <= 0",
+                         (account_id, key))
+
+    def rebuild(self, conn: sqlite3.Connection, source_table: str, account_id: Optional[int] = None):
+        """Recompute one account's aggregates (every account's by default) in the caller's transaction"""
+        where, params = ("WHERE account_id = ?", (account_id,)) if account_id is not None else ("", ())
+        for level in self.levels:
+            table = self.table(level)
+            key_sql = LEVEL_KEYS[level][0]
+            conn.execute(f"DELETE FROM {table} {where}", params)
+            conn.execute(f"""
+                INSERT INTO {table} (account_id, key, pnl, fees, trade_count, wins, losses)
+                SELECT account_id, {key_sql}, SUM(pnl), SUM(fees), COUNT(*),
+                       SUM(pnl > 0), SUM(pnl < 0)
+                FROM {source_table} {where} GROUP BY 1, 2
+            """, params)
+
+    def get(self, db: ConnectionManager, account_id: int, level: str, key: int) -> PnLSummary:
+        """Get one aggregate row by primary key (O(1) lookup)"""
+        row = db.fetchone(f"""
+            SELECT pnl, fees, trade_count, wins, losses FROM {self.table(level)} WHERE account_id = ? AND key = ?
+        """, (account_id, key))
+        return PnLSummary(*row) if row else PnLSummary()
+
+    def get_range(self, db: ConnectionManager, account_id: int, level: str,
+                  first_key: int, last_key: int) -> Dict[int, PnLSummary]:
+        """Get an account's aggregate rows in an inclusive key range"""
+        rows = db.fetchall(f"""
+            SELECT key, pnl, fees, trade_count, wins, losses FROM {self.table(level)}
+            WHERE account_id = ? AND key BETWEEN ? AND ? ORDER BY key
+        """, (account_id, first_key, last_key))
+        return {row[0]: PnLSummary(*row[1:]) for row in rows}
+
+def year_month_keys(year: int) -> Tuple[int, int]:
+    """Inclusive month key range covering a year"""
+    return year * 100 + 1, year * 100 + 12
@@ -0,0 +1,213 @@
+"""
+Analytics Module for PropFire
+Trading performance statistics computed in vectorized NumPy passes over
+trade and equity columns loaded straight from SQLite. Full-history columns
+are cached in memory until the database changes; date ranges are array slices.
+"""
+
+import datetime
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import numpy as np
+from database import get_database, date_to_day
+from migrations import migrate, STORE_MIGRATIONS, STORE_PATH
+from account_manager import AccountRepository
+
+TRADING_DAYS_PER_YEAR = 252
+
+def _day_slice(days: np.ndarray, first_day: int, last_day: int) -> Tuple[int, int]:
+    """Index bounds of an inclusive day range in a sorted day array"""
+    return int(np.searchsorted(days, first_day, 'left')), int(np.searchsorted(days, last_day, 'right'))
+
+@dataclass
+class TradeColumns:
+    """Trades in a date range as parallel arrays, ordered by day then id"""
+    days: np.ndarray  # int64 day numbers
+    pnl: np.ndarray
+    r_multiple: np.ndarray  # Realized R, NaN where the trade has no usable stop
+
+    def between(self, first_day: int, last_day: int) -> 'TradeColumns':
+        """Trades in an inclusive day range, as views"""
+        lo, hi = _day_slice(self.days, first_day, last_day)
+        return TradeColumns(self.days[lo:hi], self.pnl[lo:hi], self.r_multiple[lo:hi])
+
+@dataclass
+class EquityColumns:
+    """Daily equity curve in a date range as parallel arrays"""
+    days: np.ndarray
+    equity: np.ndarray
+    pnl: np.ndarray
+
+    def between(self, first_day: int, last_day: int) -> 'EquityColumns':
+        """Equity points in an inclusive day range, as views"""
+        lo, hi = _day_slice(self.days, first_day, last_day)
+        return EquityColumns(self.days[lo:hi], self.equity[lo:hi], self.pnl[lo:hi])
+
+@dataclass
+class PerformanceStats:
+    """Performance statistics for a date range"""
+    trade_count: int = 0
+    wins: int = 0
+    losses: int = 0
+    net_pnl: float = 0.0
+    win_rate: float = 0.0
+    avg_win: float = 0.0
+    avg_loss: float = 0.0
+    expectancy: float = 0.0  # Average P&L per trade
+    profit_factor: float = 0.0  # Gross profit / gross loss, inf with no losses
+    avg_r: float = 0.0
+    max_drawdown: float = 0.0  # Largest peak-to-trough equity drop, positive
+    max_drawdown_pct: float = 0.0
+    max_drawdown_days: int = 0  # Longest peak-to-recovery span in calendar days
+    sharpe: float = 0.0  # Annualized, daily returns, zero risk-free rate
+    sortino: float = 0.0
+    longest_win_streak: int = 0
+    longest_loss_streak: int = 0
+    current_streak: int = 0  # Positive for wins, negative for losses
+
+def trade_stats(pnl: np.ndarray, r_multiple: np.ndarray) -> dict:
+    """Win rate, averages, expectancy, profit factor and average R"""
+    if not len(pnl):
+        return {}
+    winners = pnl[pnl > 0]
+    losers = pnl[pnl < 0]
+    gross_profit = winners.sum()
+    gross_loss = -losers.sum()
+    decided = len(winners) + len(losers)
+    usable_r = r_multiple[~np.isnan(r_multiple)]
+    return {
+        "trade_count": len(pnl),
+        "wins": len(winners),
+        "losses": len(losers),
+        "net_pnl": float(pnl.sum()),
+        "win_rate": len(winners) / decided if decided else 0.0,
+        "avg_win": float(winners.mean()) if len(winners) else 0.0,
+        "avg_loss": float(losers.mean()) if len(losers) else 0.0,
+        "expectancy": float(pnl.mean()),
+        "profit_factor": float(gross_profit / gross_loss) if gross_loss else (math.inf if gross_profit else 0.0),
+        "avg_r": float(usable_r.mean()) if len(usable_r) else 0.0,
+    }
+
+def streaks(pnl: np.ndarray) -> Tuple[int, int, int]:
+    """(longest win streak, longest loss streak, current signed streak); breakeven trades are skipped"""
+    signs = np.sign(pnl)
+    signs = signs[signs != 0]
+    if not len(signs):
+        return 0, 0, 0
+    # Run-length encode the win/loss sequence
+    starts = np.flatnonzero(np.concatenate(([True], signs[1:] != signs[:-1])))
+    lengths = np.diff(np.append(starts, len(signs)))
+    values = signs[starts]
+    wins = lengths[values > 0]
+    losses = lengths[values < 0]
+    return (int(wins.max()) if len(wins) else 0,
+            int(losses.max()) if len(losses) else 0,
+            int(lengths[-1] * values[-1]))
+
+def drawdown(days: np.ndarray, equity: np.ndarray) -> Tuple[float, float, int]:
+    """(max drawdown, as a fraction of its peak, longest drawdown in days) of an equity curve"""
+    if len(equity) < 2:
+        return 0.0, 0.0, 0
+    peaks = np.maximum.accumulate(equity)
+    drops = peaks - equity
+    worst = int(drops.argmax())
+    depth = float(drops[worst])
+    depth_pct = depth / peaks[worst] if peaks[worst] > 0 else 0.0
+
+    # A drawdown runs from a high to the next high; the last one may still be open
+    highs = np.flatnonzero(equity >= peaks)
+    ends = np.append(highs[1:], len(equity) - 1)
+    spans = np.where(np.append(np.diff(highs) > 1, highs[-1] < len(equity) - 1),
+                     days[ends] - days[highs], 0)
+    return depth, depth_pct, int(spans.max())
+
+def risk_ratios(returns: np.ndarray) -> Tuple[float, float]:
+    """Annualized (Sharpe, Sortino) of daily returns with a zero risk-free rate"""
+    if len(returns) < 2:
+        return 0.0, 0.0
+    mean = returns.mean()
+    scale = math.sqrt(TRADING_DAYS_PER_YEAR)
+    std = returns.std(ddof=1)
+    downside = math.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    return (float(mean / std * scale) if std > 0 else 0.0,
+            float(mean / downside * scale) if downside > 0 else 0.0)
+
+def compute_stats(trades: TradeColumns, equity: EquityColumns) -> PerformanceStats:
+    """All statistics for already loaded columns"""
+    stats = PerformanceStats(**trade_stats(trades.pnl, trades.r_multiple))
+    stats.longest_win_streak, stats.longest_loss_streak, stats.current_streak = streaks(trades.pnl)
+    if len(equity.equity):
+        # Start from the close before the first day so a first-day loss counts
+        opening = equity.equity[0] - equity.pnl[0]
+        curve = np.concatenate(([opening], equity.equity))
+        curve_days = np.concatenate(([equity.days[0] - 1], equity.days))
+        stats.max_drawdown, stats.max_drawdown_pct, stats.max_drawdown_days = drawdown(curve_days, curve)
+        previous = curve[:-1]
+        returns = np.divide(equity.pnl, previous, out=np.zeros_like(previous), where=previous > 0)
+        stats.sharpe, stats.sortino = risk_ratios(returns)
+    return stats
+
+class PerformanceAnalytics:
+    """Loads an account's trade and equity columns for a date range and computes statistics"""
+
+    def __init__(self, db_path: str = STORE_PATH, account_id: Optional[int] = None):
+        self.db = get_database(db_path)
+        migrate(self.db, STORE_MIGRATIONS)
+        self.account = AccountRepository(db_path, account_id)
+        self.account_id = self.account.account_id
+        # (change token, columns) for the full history of trades and equity
+        self._trades = None
+        self._equity = None
+
+    @staticmethod
+    def _day_range(start: Optional[datetime.date], end: Optional[datetime.date]) -> Tuple[int, int]:
+        """Inclusive day numbers for an optional date range"""
+        return (date_to_day(start) if start else 0,
+                date_to_day(end) if end else date_to_day(datetime.date.max))
+
+    def load_trades(self, start: Optional[datetime.date] = None,
+                    end: Optional[datetime.date] = None) -> TradeColumns:
+        """Trade columns for a date range"""
+        token = self.db.change_token()
+        cached = self._trades
+        if cached is None or cached[0] != token:
+            cached = self._trades = (token, self._query_trades())
+        return cached[1].between(*self._day_range(start, end))
+
+    def load_equity(self, start: Optional[datetime.date] = None,
+                    end: Optional[datetime.date] = None) -> EquityColumns:
+        """Equity curve columns for a date range"""
+        balance = self.account.effective_starting_balance()
+        token = (self.db.change_token(), balance)
+        cached = self._equity
+        if cached is None or cached[0] != token:
+            cached = self._equity = (token, self._query_equity(balance))
+        return cached[1].between(*self._day_range(start, end))
+
+    def _query_trades(self) -> TradeColumns:
+        """Read every trade's columns"""
+        # R is derived in SQL so only numeric columns cross into NumPy
+        rows = self.db.fetchall("""
+            SELECT day, pnl,
+                   CASE WHEN entry_price > 0 AND exit_price > 0 AND stop_loss > 0 AND entry_price != stop_loss
+                        THEN (exit_price - entry_price) / ABS(entry_price - stop_loss)
+                             * (CASE WHEN direction = 'Short' THEN -1 ELSE 1 END)
+                   END
+            FROM trades WHERE account_id = ? ORDER BY day, id
+        """, (self.account_id,))
+        data = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        return TradeColumns(days=data[:, 0].astype(np.int64), pnl=data[:, 1], r_multiple=data[:, 2])
+
+    def _query_equity(self, starting_balance: float) -> EquityColumns:
+        """Read the daily P&L and derive the whole equity curve"""
+        rows = self.db.fetchall("SELECT day, pnl FROM equity_curve WHERE account_id = ? ORDER BY day",
+                                (self.account_id,))
+        data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        return EquityColumns(days=data[:, 0].astype(np.int64), equity=starting_balance + np.cumsum(data[:, 1]),
+                             pnl=data[:, 1])
+
+    def get_stats(self, start: Optional[datetime.date] = None,
+                  end: Optional[datetime.date] = None) -> PerformanceStats:
+        """Performance statistics for a date range (all history by default)"""
+        return compute_stats(self.load_trades(start, end), self.load_equity(start, end))
@@ -0,0 +1,246 @@
+"""
+Backup Module for PropFire
+Online backups of the SQLite store. SQLite's backup API copies a pinned
+snapshot of the database in small page steps, so the app keeps writing while
+it runs. Each backup is gzipped, verified by restoring it to a scratch file,
+and the oldest are rotated out. From the command line:
+
+    python backup.py run
+    python backup.py restore backups/propfire-20250101-120000-000000.db.gz
+"""
+
+import argparse
+import datetime
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from migrations import STORE_PATH
+from worker_pool import get_worker_pool, Job, PRIORITY_BACKGROUND
+
+BACKUP_DIR = "backups"
+KEEP_BACKUPS = 7
+BACKUP_INTERVAL = datetime.timedelta(hours=24)
+PAGES_PER_STEP = 256  # About 1MB per step at the default page size
+STEP_PAUSE = 0.002  # Seconds between steps, so the backup never hogs the disk
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S-%f"  # Microseconds, so quick successive backups never share a name
+
+class BackupCancelled(Exception):
+    """Raised when a backup is stopped part way, e.g. on exit"""
+
+@dataclass
+class BackupResult:
+    """What a backup wrote"""
+    path: str
+    pages: int
+    size: int  # Bytes of the uncompressed snapshot
+    compressed_size: int
+    seconds: float
+    row_counts: Dict[str, int] = field(default_factory=dict)
+
+def _row_counts(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Rows per table, for checking a restored copy against its source"""
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+class BackupService:
+    """Rotating, compressed, verified backups of one database file"""
+
+    def __init__(self, db_path: str = STORE_PATH, backup_dir: Optional[str] = None,
+                 keep: int = KEEP_BACKUPS, interval: datetime.timedelta = BACKUP_INTERVAL):
+        self.db_path = os.path.abspath(db_path)
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(self.db_path), BACKUP_DIR)
+        self.keep = keep
+        self.interval = interval
+        self.prefix = os.path.splitext(os.path.basename(self.db_path))[0]
+        self._cancel = threading.Event()
+        self._job: Optional[Job] = None
+        self._last: Optional[datetime.datetime] = None  # Newest backup's time, read from the folder once
+
+    def backups(self) -> List[str]:
+        """Backup files, newest first"""
+        return sorted(glob.glob(os.path.join(self.backup_dir, f"{self.prefix}-*.db.gz")), reverse=True)
+
+    def last_backup_time(self) -> Optional[datetime.datetime]:
+        """When the newest backup was taken, None if there is none"""
+        if self._last is None:
+            for path in self.backups():
+                stamp = os.path.basename(path)[len(self.prefix) + 1:-len(".db.gz")]
+                try:
+                    self._last = datetime.datetime.strptime(stamp, TIMESTAMP_FORMAT)
+                    break
+                except ValueError:
+                    continue
+        return self._last
+
+    def is_due(self, now: Optional[datetime.datetime] = None) -> bool:
+        """Check if the interval has passed since the newest backup"""
+        last = self.last_backup_time()
+        return last is None or (now or datetime.datetime.now()) - last >= self.interval
+
+    def run_if_due(self) -> Optional[Job]:
+        """Start a backup on the worker pool when one is due and none is running; cheap enough to call every tick"""
+        if not os.path.exists(self.db_path) or (self._job is not None and self._job.is_current()):
+            return None
+        if not self.is_due():
+            return None
+        # Not retried until the next interval, even if it fails
+        self._last = datetime.datetime.now()
+        self._job = get_worker_pool().submit(self.run, "store backup", PRIORITY_BACKGROUND,
+                                             on_done=self._finished, on_error=self._finished)
+        return self._job
+
+    def _finished(self, outcome):
+        """Let the next backup be scheduled"""
+        self._job = None
+
+    def cancel(self):
+        """Stop a running backup at its next step"""
+        self._cancel.set()
+        if self._job is not None:
+            self._job.cancel()
+
+    def run(self, rotate: bool = True) -> BackupResult:
+        """Take a backup now: snapshot, compress, verify and (unless told not to) rotate"""
+        self._cancel.clear()
+        started = time.perf_counter()
+        os.makedirs(self.backup_dir, exist_ok=True)
+        taken = datetime.datetime.now()
+        path = os.path.join(self.backup_dir, f"{self.prefix}-{taken.strftime(TIMESTAMP_FORMAT)}.db.gz")
+        snapshot = path[:-len(".gz")] + ".tmp"
+        compressed = path + ".tmp"
+        try:
+            pages, row_counts = self._snapshot(snapshot)
+            with open(snapshot, 'rb') as src, gzip.open(compressed, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            if not self.verify(compressed, row_counts):
+                raise sqlite3.DatabaseError(f"Backup of {self.db_path} failed verification")
+            os.replace(compressed, path)
+            result = BackupResult(path, pages, os.path.getsize(snapshot), os.path.getsize(path),
+                                  time.perf_counter() - started, row_counts)
+        finally:
+            for leftover in (snapshot, compressed):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        self._last = taken
+        if rotate:
+            self.rotate()
+        print(f"DEBUG: Backed up {self.db_path} to {path} ({result.size:,} -> {result.compressed_size:,} bytes, "
+              f"{result.seconds:.2f}s)")
+        return result
+
+    def _snapshot(self, target: str) -> tuple:
+        """Copy the database to target in page steps; returns (pages, row counts)"""
+        source = sqlite3.connect(self.db_path, isolation_level=None)
+        dest = sqlite3.connect(target)
+        try:
+            # An open read transaction pins the snapshot: without it every commit by
+            # the app would restart the copy, and a busy journal might never finish
+            source.execute("BEGIN")
+            row_counts = _row_counts(source)
+            total = []
+
+            def step(status, remaining, pages):
+                total[:] = [pages]
+                if self._cancel.is_set():
+                    raise BackupCancelled(f"Backup of {self.db_path} cancelled")
+                time.sleep(STEP_PAUSE)
+            source.backup(dest, pages=PAGES_PER_STEP, progress=step)
+            source.execute("COMMIT")
+            return (total[0] if total else 0), row_counts
+        finally:
+            dest.close()
+            source.close()
+
+    def verify(self, path: str, row_counts: Optional[Dict[str, int]] = None) -> bool:
+        """Restore a backup to a scratch file and check it; row counts are compared when given"""
+        with tempfile.TemporaryDirectory() as scratch:
+            return self._restore_checked(path, os.path.join(scratch, "restore.db"), row_counts)
+
+    def _restore_checked(self, path: str, restored: str, row_counts: Optional[Dict[str, int]] = None) -> bool:
+        """Decompress a backup to restored and check the copy; row counts are compared when given"""
+        try:
+            # A truncated or corrupted file fails gzip's CRC check here
+            with gzip.open(path, 'rb') as src, open(restored, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            conn = sqlite3.connect(restored)
+            try:
+                if conn.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+                    print(f"DEBUG: Backup {path} failed the integrity check")
+                    return False
+                if row_counts is not None and _row_counts(conn) != row_counts:
+                    print(f"DEBUG: Backup {path} doesn't match the source's row counts")
+                    return False
+            finally:
+                conn.close()
+        except (OSError, EOFError, sqlite3.DatabaseError) as e:
+            print(f"DEBUG: Backup {path} could not be restored: {e}")
+            return False
+        return True
+
+    def rotate(self) -> List[str]:
+        """Delete all but the newest `keep` backups; returns the deleted paths"""
+        removed = self.backups()[self.keep:]
+        for path in removed:
+            os.remove(path)
+        return removed
+
+    def restore(self, path: str):
+        """Replace the database with a verified backup, keeping a backup of the current one; run with PropFire closed"""
+        with tempfile.TemporaryDirectory() as scratch:
+            restored = os.path.join(scratch, "restore.db")
+            # Decompressed once; the copy that was checked is the one restored
+            if not self._restore_checked(path, restored):
+                raise sqlite3.DatabaseError(f"{path} is not a usable backup")
+            if os.path.exists(self.db_path):
+                # Not rotated: that could delete the very backup being restored
+                self.run(rotate=False)
+            # Copying through the backup API also resets the WAL of the live file
+            source = sqlite3.connect(restored)
+            dest = sqlite3.connect(self.db_path)
+            try:
+                source.backup(dest)
+            finally:
+                dest.close()
+                source.close()
+        print(f"DEBUG: Restored {self.db_path} from {path}")
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Back up and restore the PropFire store")
+    parser.add_argument("--db", default=STORE_PATH, help="store path")
+    parser.add_argument("--dir", help="backup folder (default: backups/ next to the store)")
+    parser.add_argument("--keep", type=int, default=KEEP_BACKUPS, help="backups to keep")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="take a backup now")
+    commands.add_parser("list", help="list backups, newest first")
+    verify = commands.add_parser("verify", help="check that a backup restores")
+    verify.add_argument("path")
+    restore = commands.add_parser("restore", help="replace the store with a backup (PropFire must be closed)")
+    restore.add_argument("path")
+    args = parser.parse_args(argv)
+
+    service = BackupService(args.db, args.dir, args.keep)
+    if args.command == "run":
+        result = service.run()
+        print(f"{result.path}: {result.pages:,} pages, {result.compressed_size:,} bytes in {result.seconds:.2f}s")
+    elif args.command == "list":
+        for path in service.backups():
+            print(f"{path}  {os.path.getsize(path):,} bytes")
+    elif args.command == "verify":
+        ok = service.verify(args.path)
+        print("ok" if ok else "FAILED")
+        return 0 if ok else 1
+    else:
+        service.restore(args.path)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""
+Storage latency benchmark for PropFire
+Compares the per-call sqlite3.connect pattern the repositories used to follow
+against the shared ConnectionManager. Run headless from the repo root:
+
+    python benchmarks/bench_database.py [operations]
+"""
+
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import close_all_databases  # noqa: E402
+from trading_journal import DailyEntry, JournalRepository  # noqa: E402
+from account_manager import AccountRepository  # noqa: E402
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS daily_entries (
+        date TEXT PRIMARY KEY,
+        pnl REAL NOT NULL,
+        gross REAL DEFAULT 0,
+        fees REAL DEFAULT 0,
+        notes TEXT DEFAULT ''
+    )
+"""
+
+EQUITY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS equity_curve (
+        date TEXT PRIMARY KEY,
+        equity REAL NOT NULL,
+        pnl REAL DEFAULT 0
+    )
+"""
+
+def legacy_write(db_path: str, date: datetime.date, pnl: float):
+    """Write the way the repositories did before: new connection per call"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO daily_entries (date, pnl, gross, fees, notes)
+            VALUES (?, ?, ?, ?, ?)
+        """, (date.strftime("%Y-%m-%d"), pnl, 0, 0, ""))
+        conn.commit()
+
+def legacy_read(db_path: str, year: int, month: int):
+    """Read the way the repositories did before: new connection per call"""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.execute("""
+            SELECT date, pnl, gross, fees, notes FROM daily_entries
+            WHERE date LIKE ? ORDER BY date
+        """, (f"{year}-{month:02d}%",))
+        return [
+            DailyEntry(
+                date=datetime.datetime.strptime(row[0], "%Y-%m-%d").date(),
+                pnl=row[1], gross=row[2], fees=row[3], notes=row[4]
+            )
+            for row in cursor.fetchall()
+        ]
+
+def legacy_update_equity(db_path: str, date: datetime.date, pnl: float):
+    """Update equity the way AccountRepository did before"""
+    with sqlite3.connect(db_path) as conn:
+        result = conn.execute("""
+            SELECT equity FROM equity_curve
+            WHERE date < ? ORDER BY date DESC LIMIT 1
+        """, (date.strftime("%Y-%m-%d"),)).fetchone()
+        prev_equity = result[0] if result else 10000.0
+        conn.execute("""
+            INSERT OR REPLACE INTO equity_curve (date, equity, pnl)
+            VALUES (?, ?, ?)
+        """, (date.strftime("%Y-%m-%d"), prev_equity + pnl, pnl))
+        conn.commit()
+
+def timed(label: str, operations: int, func):
+    """Run func operations times and print the mean latency"""
+    start = time.perf_counter()
+    for i in range(operations):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<42} {elapsed / operations * 1e6:>10.1f} us/op")
+
+def main(operations: int = 500):
+    """Run the before/after comparison in a scratch directory"""
+    start_day = datetime.date(2020, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+
+        legacy_db = os.path.join(tmp, "legacy.db")
+        with sqlite3.connect(legacy_db) as conn:
+            conn.execute(SCHEMA)
+            conn.execute(EQUITY_SCHEMA)
+
+        print(f"Operations per case: {operations}")
+        timed("before: daily entry write (connect/op)", operations,
+              lambda i: legacy_write(legacy_db, start_day + datetime.timedelta(days=i), i))
+        timed("before: month read (connect/op)", operations,
+              lambda i: legacy_read(legacy_db, 2020, i % 12 + 1))
+        timed("before: equity update (connect/op)", operations,
+              lambda i: legacy_update_equity(legacy_db, start_day + datetime.timedelta(days=i), 10.0))
+
+        journal = JournalRepository(os.path.join(tmp, "journal.db"))
+        timed("after:  daily entry write (shared WAL)", operations,
+              lambda i: journal.update_daily_pnl(start_day + datetime.timedelta(days=i), i))
+        timed("after:  month read, cache cleared", operations,
+              lambda i: (journal.cache.clear(), journal.get_monthly_pnl(2020, i % 12 + 1)))
+
+        account = AccountRepository(os.path.join(tmp, "account.db"))
+        timed("after:  equity update (shared WAL)", operations,
+              lambda i: account.update_equity(start_day + datetime.timedelta(days=i), 10.0))
+
+        close_all_databases()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,222 @@
+"""
+Hot path benchmarks for PropFire
+News feed parsing, the once-a-second timer tick, journal month loading,
+equity updates and the current equity lookup, at several data sizes. Runs
+headless on synthetic data in a scratch directory. From the repo root:
+
+    python benchmarks/bench_hotpaths.py --save      # record the baseline
+    python benchmarks/bench_hotpaths.py             # compare; exit 1 on a regression
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+from typing import Dict, List
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import news_api  # noqa: E402
+from harness import (Case, BenchResult, run_case, report, load_baseline, save_baseline,  # noqa: E402
+                     MIN_TIME, REGRESSION_THRESHOLD)
+from account_manager import AccountRepository, AccountService  # noqa: E402
+from database import close_all_databases  # noqa: E402
+from enhanced_journal import EnhancedJournalRepository, TradeEntry  # noqa: E402
+from news_api import NewsAPI  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+ROW_SIZES = (1000, 10000, 100000)
+FEED_SIZES = (100, 1000, 10000)
+TRADES_PER_DAY = 4
+FIRST_DAY = datetime.date(2000, 1, 1)
+
+CASES: List[Case] = []
+
+def case(name: str, sizes=None):
+    """Register a generator fixture as a benchmark case"""
+    def register(setup):
+        CASES.append(Case(name, setup, sizes))
+        return setup
+    return register
+
+# Seeded stores, one per row count, shared by the cases that read them
+_stores: Dict[int, str] = {}
+
+def seeded_store(rows: int) -> str:
+    """Store with `rows` trades and `rows` days of equity, built once per size"""
+    if rows not in _stores:
+        path = os.path.abspath(f"store-{rows}.db")
+        rng = random.Random(rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            account = AccountRepository(path)
+            journal = EnhancedJournalRepository(path, account)
+            journal.import_trades(
+                (f"bench-{i}", TradeEntry(date=FIRST_DAY + datetime.timedelta(days=i // TRADES_PER_DAY),
+                                          pnl=round(rng.gauss(20, 150), 2), instrument="EURUSD",
+                                          direction=rng.choice(("Long", "Short")), notes=f"trade {i}"))
+                for i in range(rows))
+            account.set_daily_pnl({FIRST_DAY + datetime.timedelta(days=i): round(rng.gauss(20, 150), 2)
+                                   for i in range(rows)})
+        _stores[rows] = path
+    return _stores[rows]
+
+def synthetic_feed(events: int) -> str:
+    """ForexFactory-style calendar JSON with a mix of currencies and impacts, all in the future"""
+    rng = random.Random(events)
+    start = datetime.datetime.now().replace(second=0, microsecond=0) + datetime.timedelta(days=1)
+    feed = []
+    for i in range(events):
+        when = start + datetime.timedelta(minutes=15 * i)
+        feed.append({
+            "title": f"Event {i}",
+            "country": rng.choice(("USD", "EUR", "GBP", "JPY", "AUD", "CAD")),
+            "date": when.strftime("%Y-%m-%dT%H:%M:00-04:00"),
+            "impact": rng.choice(("High", "Medium", "Low", "Holiday")),
+            "forecast": "0.2%",
+            "previous": "0.1%",
+        })
+    return json.dumps(feed)
+
+class FeedResponse:
+    """Stands in for the HTTP response; JSON decoding still happens per call"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.text)
+
+@case("news.get_high_impact_news", FEED_SIZES)
+def bench_news_parsing(events: int):
+    api = NewsAPI()
+    response = FeedResponse(synthetic_feed(events))
+    with mock.patch.object(news_api.requests, "get", return_value=response):
+        def parse():
+            api.cache.clear()
+            return api.get_high_impact_news("USD", "London")
+        yield parse
+
+@case("timer.tick")
+def bench_timer_tick():
+    # The computations update_timer runs every second, without the widgets
+    from prop_fire import MainCountdownWindow
+    window = MainCountdownWindow.__new__(MainCountdownWindow)
+    window.settings = {"currency": "USD", "day": "Tuesday", "session": "London"}
+    window.sessions = {"London": {"start": "08:00", "end": "17:00"}}
+    window.session_start_times = {"London": "03:00"}
+    start = datetime.datetime.now() + datetime.timedelta(days=1)
+    window.current_news_events = [{"title": f"Event {i}", "datetime": start + datetime.timedelta(hours=i),
+                                   "day_name": "Tuesday"} for i in range(20)]
+
+    def tick():
+        window.calculate_next_trade_time()
+        window.get_current_times()
+        return window.is_selected_day_passed()
+    yield tick
+
+def _month_loader(rows: int, cold: bool):
+    """Everything the journal calendar reads to show the middle month of the history"""
+    repository = EnhancedJournalRepository(seeded_store(rows))
+    month = FIRST_DAY + datetime.timedelta(days=rows // TRADES_PER_DAY // 2)
+
+    def load():
+        if cold:
+            repository.cache.clear()
+        repository.get_month_totals(month.year, month.month)
+        repository.get_month_chart_images(month.year, month.month)
+        repository.get_month_summary(month.year, month.month)
+        return repository.get_year_summary(month.year)
+    return load
+
+@case("journal.month_load.cold", ROW_SIZES)
+def bench_month_load_cold(rows: int):
+    yield _month_loader(rows, cold=True)
+
+@case("journal.month_load.warm", ROW_SIZES)
+def bench_month_load_warm(rows: int):
+    yield _month_loader(rows, cold=False)
+
+@case("account.update_equity", ROW_SIZES)
+def bench_update_equity(rows: int):
+    # Back-dated edits, the case that used to re-chain every later day
+    account = AccountRepository(seeded_store(rows))
+    rng = random.Random(0)
+
+    def update():
+        account.update_equity(FIRST_DAY + datetime.timedelta(days=rng.randrange(rows)), rng.uniform(-100, 100))
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield update
+
+@case("account.get_current_equity", ROW_SIZES)
+def bench_current_equity(rows: int):
+    service = AccountService()
+    service.repository = AccountRepository(seeded_store(rows))
+    yield service.get_current_equity
+
+@case("account.get_current_equity.cold", ROW_SIZES)
+def bench_current_equity_cold(rows: int):
+    # First lookup after start-up or a balance change loads the ledger
+    service = AccountService()
+    service.repository = AccountRepository(seeded_store(rows))
+
+    def lookup():
+        service.repository.ledger.reset()
+        return service.get_current_equity()
+    yield lookup
+
+def main(argv=None) -> int:
+    """Run the cases in a scratch directory, report against the baseline and optionally save it"""
+    parser = argparse.ArgumentParser(description="PropFire hot path benchmarks")
+    parser.add_argument("-k", dest="pattern", default="", help="only cases whose name contains this")
+    parser.add_argument("--sizes", type=int, nargs="+", help="row counts instead of 1k/10k/100k")
+    parser.add_argument("--quick", action="store_true", help="smallest sizes, short runs, no comparison")
+    parser.add_argument("--save", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="median slowdown flagged as a regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+    baseline_path = os.path.abspath(args.baseline)
+    min_time = MIN_TIME / 10 if args.quick else MIN_TIME
+
+    results: List[BenchResult] = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Repositories keep config files in the working directory
+        os.chdir(tmp)
+        try:
+            for bench in CASES:
+                sizes = None
+                if bench.sizes is ROW_SIZES:
+                    sizes = ROW_SIZES[:1] if args.quick else args.sizes
+                elif args.quick and bench.sizes:
+                    sizes = bench.sizes[:1]
+                for name, case_args in bench.instances(sizes):
+                    if args.pattern in name:
+                        results.append(run_case(bench, case_args, name, min_time))
+        finally:
+            close_all_databases()
+            os.chdir(cwd)
+
+    baseline = None if args.quick else load_baseline(baseline_path)
+    regressions = report(results, baseline, args.threshold)
+    if args.save:
+        save_baseline(baseline_path, results)
+        print(f"Baseline saved to {baseline_path}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark harness for PropFire
+Times cases the way pytest-benchmark does (a warm-up call, calibrated rounds,
+min/median/mean/stddev per call), saves results as a JSON baseline and flags
+cases whose median got slower than the baseline by more than a threshold.
+"""
+
+import json
+import os
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+MIN_TIME = 0.3  # Seconds of timed calls per case
+MIN_ROUNDS = 5
+MAX_ROUNDS = 1000
+ROUND_TIME = 0.001  # Fast calls are batched so a round stays above timer resolution
+REGRESSION_THRESHOLD = 0.25  # Median slowdown that counts as a regression
+
+@dataclass
+class BenchResult:
+    """Per-call timings of one case, in seconds"""
+    name: str
+    calls: int
+    min: float
+    median: float
+    mean: float
+    stddev: float
+
+@dataclass
+class Case:
+    """A benchmark: setup is a generator that yields the call to time, then cleans up"""
+    name: str
+    setup: Callable[..., Iterator[Callable[[], object]]]
+    sizes: Optional[Sequence[int]] = None  # Run once per size, None for unsized cases
+
+    def instances(self, sizes: Optional[Sequence[int]] = None) -> List[Tuple[str, tuple]]:
+        """(result name, setup arguments) for each size"""
+        if self.sizes is None:
+            return [(self.name, ())]
+        return [(f"{self.name}[{size}]", (size,)) for size in (sizes or self.sizes)]
+
+def measure(name: str, func: Callable[[], object], min_time: float = MIN_TIME) -> BenchResult:
+    """Time a call over calibrated rounds after one warm-up call"""
+    func()
+    start = time.perf_counter()
+    func()
+    single = max(time.perf_counter() - start, 1e-9)
+    per_round = max(1, int(ROUND_TIME / single))
+    rounds = max(MIN_ROUNDS, min(MAX_ROUNDS, int(min_time / (single * per_round))))
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(per_round):
+            func()
+        samples.append((time.perf_counter() - start) / per_round)
+    return BenchResult(name, rounds * per_round, min(samples), statistics.median(samples),
+                       statistics.fmean(samples), statistics.stdev(samples))
+
+def run_case(case: Case, args: tuple, name: str, min_time: float = MIN_TIME) -> BenchResult:
+    """Set a case up, time it and tear it down"""
+    fixture = case.setup(*args)
+    try:
+        return measure(name, next(fixture), min_time)
+    finally:
+        fixture.close()
+
+def machine_info() -> Dict[str, str]:
+    """Where a baseline was recorded; timings only compare on the same machine"""
+    return {"node": platform.node(), "machine": platform.machine(), "python": platform.python_version(),
+            "processor": platform.processor()}
+
+def save_baseline(path: str, results: List[BenchResult]):
+    """Write results as the baseline, keeping cases that weren't run this time"""
+    baseline = load_baseline(path) or {"results": {}}
+    baseline["machine"] = machine_info()
+    baseline["saved_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    baseline["results"].update({result.name: asdict(result) for result in results})
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+def load_baseline(path: str) -> Optional[Dict]:
+    """Read a saved baseline, None if there is none"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _format_time(seconds: float) -> str:
+    """Seconds in the most readable unit"""
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+def report(results: List[BenchResult], baseline: Optional[Dict] = None,
+           threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Print a results table, compared against a baseline; returns the names of regressed cases"""
+    previous = (baseline or {}).get("results", {})
+    regressions = []
+    print(f"{'case':<40} {'median':>11} {'min':>11} {'stddev':>11} {'calls':>7}  vs baseline")
+    for result in results:
+        change = ""
+        before = previous.get(result.name)
+        if before:
+            ratio = result.median / before["median"] - 1
+            change = f"{ratio:+.0%}"
+            if ratio > threshold:
+                change += "  REGRESSION"
+                regressions.append(result.name)
+        print(f"{result.name:<40} {_format_time(result.median):>11} {_format_time(result.min):>11} "
+              f"{_format_time(result.stddev):>11} {result.calls:>7}  {change}")
+    if baseline and baseline.get("machine") != machine_info():
+        print("Note: the baseline was recorded on a different machine or Python; compare with care")
+    return regressions
@@ -0,0 +1,152 @@
+"""
+Calendar Grid Module for PropFire
+Persistent 6x7 month grid: cells are created once and re-labelled per month
+"""
+
+import customtkinter as ctk
+import calendar
+import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+PLACEHOLDER = ("$0.00", '#666666')
+
+class CalendarGrid:
+    """Month calendar whose 42 day cells are reused across months"""
+
+    ROWS = 6
+
+    def __init__(self, parent, on_day_click: Callable[[datetime.date], None]):
+        self.on_day_click = on_day_click
+        self.frame = ctk.CTkFrame(parent, fg_color="#000000")
+        self.year: Optional[int] = None
+        self.month: Optional[int] = None
+        self._calendar = calendar.Calendar(firstweekday=0)
+        self._cells: List[Dict] = []
+        self._index_by_date: Dict[datetime.date, int] = {}
+        self._build()
+
+    def _build(self):
+        """Create the weekday header and all day cells once"""
+        for i in range(7):
+            self.frame.grid_columnconfigure(i, weight=1, uniform="col")
+        for i in range(self.ROWS + 1):  # 6 weeks + header
+            self.frame.grid_rowconfigure(i, weight=1, uniform="row")
+
+        for i, day in enumerate(WEEKDAYS):
+            label = ctk.CTkLabel(self.frame, text=day,
+                               font=('Inter', 12, 'bold'), text_color='#888888')
+            label.grid(row=0, column=i, padx=1, pady=1, sticky='nsew')
+
+        for index in range(self.ROWS * 7):
+            cell = ctk.CTkFrame(self.frame, fg_color="#111111",
+                              corner_radius=5, border_width=1, border_color="#333333")
+            cell.grid(row=index // 7 + 1, column=index % 7, padx=2, pady=2, sticky='nsew')
+
+            day_label = ctk.CTkLabel(cell, text="",
+                                   font=('Inter', 12, 'bold'), text_color='#ffffff')
+            day_label.pack(anchor='nw', padx=5, pady=2)
+
+            pnl_label = ctk.CTkLabel(cell, text=PLACEHOLDER[0],
+                                   font=('Courier', 10), text_color=PLACEHOLDER[1])
+            pnl_label.pack(anchor='w', padx=5)
+
+            # Bindings look the date up at click time, so they never need rebinding
+            for widget in (cell, day_label, pnl_label):
+                widget.bind("<Button-1>", lambda e, i=index: self._clicked(i))
+
+            self._cells.append({
+                'frame': cell,
+                'day_label': day_label,
+                'pnl_label': pnl_label,
+                'thumb_label': None,  # Created on first thumbnail
+                'thumb': None,
+                'date': None,
+                'visible': True,
+                'value': PLACEHOLDER
+            })
+
+    def pack(self, **kwargs):
+        """Pack the grid frame into its parent"""
+        self.frame.pack(**kwargs)
+
+    def show_month(self, year: int, month: int):
+        """Re-label, reset and show/hide cells for a month"""
+        if (year, month) == (self.year, self.month):
+            return
+        self.year, self.month = year, month
+        self._index_by_date.clear()
+
+        weeks = self._calendar.monthdatescalendar(year, month)
+        dates = [date for week in weeks for date in week]
+        for index, cell in enumerate(self._cells):
+            date = dates[index] if index < len(dates) else None
+            if date is None or date.month != month:
+                cell['date'] = None
+                self._set_visible(cell, False)
+                continue
+
+            cell['date'] = date
+            self._index_by_date[date] = index
+            cell['day_label'].configure(text=str(date.day))
+            self._set_value(cell, PLACEHOLDER)
+            self._set_thumbnail(cell, index, None)
+            self._set_visible(cell, True)
+
+    def set_values(self, values: Dict[datetime.date, Tuple[str, str]]):
+        """Set (text, color) for the given days and reset all other days"""
+        for date, index in self._index_by_date.items():
+            self._set_value(self._cells[index], values.get(date, PLACEHOLDER))
+
+    def set_day(self, date: datetime.date, text: str, color: str):
+        """Update the value shown for a single day"""
+        index = self._index_by_date.get(date)
+        if index is not None:
+            self._set_value(self._cells[index], (text, color))
+
+    def set_thumbnails(self, images: Dict[datetime.date, ctk.CTkImage]):
+        """Show thumbnails for the given days and hide all others"""
+        for date, index in self._index_by_date.items():
+            self._set_thumbnail(self._cells[index], index, images.get(date))
+
+    def dates(self) -> List[datetime.date]:
+        """Dates currently shown"""
+        return list(self._index_by_date)
+
+    def _set_value(self, cell: Dict, value: Tuple[str, str]):
+        """Configure the value label only when it actually changes"""
+        if cell['value'] != value:
+            cell['pnl_label'].configure(text=value[0], text_color=value[1])
+            cell['value'] = value
+
+    def _set_thumbnail(self, cell: Dict, index: int, image: Optional[ctk.CTkImage]):
+        """Show or hide a cell's thumbnail, reusing its label"""
+        if cell['thumb'] is image:
+            return
+        label = cell['thumb_label']
+        if image is None:
+            label.pack_forget()
+        else:
+            if label is None:
+                label = ctk.CTkLabel(cell['frame'], text="")
+                label.bind("<Button-1>", lambda e, i=index: self._clicked(i))
+                cell['thumb_label'] = label
+            label.configure(image=image)
+            label.pack(anchor='center', padx=2, pady=(0, 2))
+        cell['thumb'] = image
+
+    def _set_visible(self, cell: Dict, visible: bool):
+        """Show or hide a cell, keeping its grid slot for reuse"""
+        if cell['visible'] == visible:
+            return
+        if visible:
+            cell['frame'].grid()
+        else:
+            cell['frame'].grid_remove()
+        cell['visible'] = visible
+
+    def _clicked(self, index: int):
+        """Dispatch a click on a cell to the day callback"""
+        date = self._cells[index]['date']
+        if date is not None:
+            self.on_day_click(date)
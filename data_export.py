@@ -0,0 +1,294 @@
+"""
+Data Export Module for PropFire
+Streams trades, daily aggregates, the equity curve and cached news events to
+CSV, JSON Lines or Parquet in constant memory, one account at a time.
+Usable headless:
+
+    python data_export.py --out exports --format jsonl --account 2 trades equity
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple
+from database import get_database, date_to_day, day_to_date
+from migrations import migrate, STORE_MIGRATIONS, STORE_PATH
+from account_manager import AccountRepository
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+CHUNK_SIZE = 5000
+
+# Column types: "int", "float", "str", "date" (stored day number) and "datetime" (ISO text)
+Columns = Sequence[Tuple[str, str]]
+
+@dataclass
+class ExportResult:
+    """One dataset written to one file"""
+    dataset: str
+    path: str
+    rows: int
+    seconds: float
+
+class SqlDataset:
+    """Table exported by streaming a day-ordered query through a cursor"""
+
+    def __init__(self, name: str, db_path: str, migrations, columns: Columns, query: str):
+        self.name = name
+        self.db_path = db_path
+        self.migrations = migrations
+        self.columns = columns
+        self.query = query  # Must filter on "account_id = ? AND day BETWEEN ? AND ?"
+
+    def available(self) -> bool:
+        """Check the source database exists"""
+        return os.path.exists(self.db_path)
+
+    def params(self, account_id: int, start_day: int, end_day: int) -> tuple:
+        """Query parameters for an account's day range"""
+        return account_id, start_day, end_day
+
+    def chunks(self, start_day: int, end_day: int, chunk_size: int,
+               account_id: Optional[int] = None) -> Iterator[List[tuple]]:
+        """Yield rows in chunks; the cursor steps through SQLite without materializing the result"""
+        db = get_database(self.db_path)
+        migrate(db, self.migrations)
+        if account_id is None:
+            account_id = AccountRepository(self.db_path).account_id
+        date_indexes = [i for i, (_, kind) in enumerate(self.columns) if kind == "date"]
+        # A read transaction pins one WAL snapshot for the whole export
+        with db.transaction(immediate=False) as conn:
+            cursor = conn.execute(self.query, self.params(account_id, start_day, end_day))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if date_indexes:
+                    rows = [_convert_days(row, date_indexes) for row in rows]
+                yield rows
+
+def _convert_days(row: tuple, indexes: List[int]) -> tuple:
+    """Replace stored day numbers in a row with dates"""
+    row = list(row)
+    for i in indexes:
+        if row[i] is not None:
+            row[i] = day_to_date(row[i])
+    return tuple(row)
+
+class EquityDataset(SqlDataset):
+    """Equity curve derived from the stored daily P&L and the starting balance"""
+
+    def params(self, account_id: int, start_day: int, end_day: int) -> tuple:
+        """Starting balance, then the account's day range"""
+        balance = AccountRepository(self.db_path, account_id).effective_starting_balance()
+        return balance, account_id, start_day, end_day
+
+class NewsDataset:
+    """Economic events from the news cache file"""
+
+    name = "news"
+    columns = (("datetime", "datetime"), ("currency", "str"), ("title", "str"),
+               ("impact", "str"), ("day_name", "str"))
+
+    def __init__(self, cache_file: str = "news_cache.json"):
+        self.cache_file = cache_file
+
+    def available(self) -> bool:
+        """Check the news cache exists"""
+        return os.path.exists(self.cache_file)
+
+    def chunks(self, start_day: int, end_day: int, chunk_size: int,
+               account_id: Optional[int] = None) -> Iterator[List[tuple]]:
+        """Yield cached events in the day range, in chunks (news is shared by every account)"""
+        with open(self.cache_file, 'r') as f:
+            events = json.load(f).get('events', [])
+        chunk = []
+        for event in events:
+            when = event.get('datetime')
+            if isinstance(when, str):
+                try:
+                    when = datetime.datetime.fromisoformat(when)
+                except ValueError:
+                    continue
+            if not isinstance(when, datetime.datetime) or not start_day <= date_to_day(when.date()) <= end_day:
+                continue
+            chunk.append((when.isoformat(), event.get('currency', ''), event.get('title', ''),
+                          event.get('impact', ''), event.get('day_name', '')))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+DATASETS = {
+    "trades": SqlDataset(
+        "trades", STORE_PATH, STORE_MIGRATIONS,
+        (("id", "int"), ("date", "date"), ("instrument", "str"), ("direction", "str"), ("size", "float"),
+         ("entry_time", "datetime"), ("exit_time", "datetime"), ("entry_price", "float"),
+         ("exit_price", "float"), ("stop_loss", "float"), ("take_profit", "float"), ("fees", "float"),
+         ("pnl", "float"), ("risk_reward", "float"), ("notes", "str"), ("chart_image", "str")),
+        """
+            SELECT id, day, instrument, direction, size, entry_time, exit_time, entry_price, exit_price,
+                   stop_loss, take_profit, fees, pnl, risk_reward, notes, chart_image
+            FROM trades WHERE account_id = ? AND day BETWEEN ? AND ? ORDER BY day, id
+        """),
+    "trade_days": SqlDataset(
+        "trade_days", STORE_PATH, STORE_MIGRATIONS,
+        (("date", "date"), ("pnl", "float"), ("fees", "float"), ("trade_count", "int"),
+         ("wins", "int"), ("losses", "int")),
+        """
+            SELECT key AS day, pnl, fees, trade_count, wins, losses
+            FROM trade_days WHERE account_id = ? AND key BETWEEN ? AND ? ORDER BY key
+        """),
+    "journal_days": SqlDataset(
+        "journal_days", STORE_PATH, STORE_MIGRATIONS,
+        (("date", "date"), ("pnl", "float"), ("gross", "float"), ("fees", "float"), ("notes", "str")),
+        """
+            SELECT day, pnl, gross, fees, notes
+            FROM daily_entries WHERE account_id = ? AND day BETWEEN ? AND ? ORDER BY day
+        """),
+    "equity": EquityDataset(
+        "equity", STORE_PATH, STORE_MIGRATIONS,
+        (("date", "date"), ("equity", "float"), ("pnl", "float")),
+        """
+            SELECT day, ? + equity, pnl FROM (
+                SELECT day, pnl, SUM(pnl) OVER (ORDER BY day) AS equity FROM equity_curve
+                WHERE account_id = ?
+            ) WHERE day BETWEEN ? AND ? ORDER BY day
+        """),
+    "news": NewsDataset(),
+}
+
+class CsvWriter:
+    """CSV with a header row"""
+
+    extension = "csv"
+
+    def __init__(self, path: str, columns: Columns):
+        self.f = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows: List[tuple]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+class JsonLinesWriter:
+    """One JSON object per line"""
+
+    extension = "jsonl"
+
+    def __init__(self, path: str, columns: Columns):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.names = [name for name, _ in columns]
+
+    def write(self, rows: List[tuple]):
+        self.f.write("".join(json.dumps(dict(zip(self.names, row)), default=str) + "\n" for row in rows))
+
+    def close(self):
+        self.f.close()
+
+class ParquetWriter:
+    """Parquet file with one row group per chunk (requires pyarrow)"""
+
+    extension = "parquet"
+    ARROW_TYPES = {"int": "int64", "float": "float64", "str": "string", "date": "date32", "datetime": "string"}
+
+    def __init__(self, path: str, columns: Columns):
+        self.schema = pyarrow.schema([(name, self.ARROW_TYPES[kind]) for name, kind in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows: List[tuple]):
+        arrays = [pyarrow.array([row[i] for row in rows], type=field.type) for i, field in enumerate(self.schema)]
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter}
+if pyarrow is not None:
+    WRITERS["parquet"] = ParquetWriter
+
+def export_dataset(name: str, out_dir: str, fmt: str = "csv",
+                   start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                   chunk_size: int = CHUNK_SIZE, account_id: Optional[int] = None) -> Optional[ExportResult]:
+    """Stream one dataset of an account (the active one by default) to <out_dir>/<name>.<ext>;
+    None if its source doesn't exist"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt} (available: {', '.join(WRITERS)})")
+    dataset = DATASETS[name]
+    if not dataset.available():
+        return None
+
+    started = time.perf_counter()
+    writer_class = WRITERS[fmt]
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}.{writer_class.extension}")
+    # Written under a temp name so a failed export never leaves a truncated file
+    temp_path = path + ".partial"
+    writer = writer_class(temp_path, dataset.columns)
+    rows = 0
+    try:
+        for chunk in dataset.chunks(date_to_day(start) if start else 0,
+                                    date_to_day(end) if end else date_to_day(datetime.date.max),
+                                    chunk_size, account_id):
+            writer.write(chunk)
+            rows += len(chunk)
+    except BaseException:
+        writer.close()
+        os.remove(temp_path)
+        raise
+    writer.close()
+    os.replace(temp_path, path)
+    return ExportResult(dataset=name, path=path, rows=rows, seconds=time.perf_counter() - started)
+
+def export_all(out_dir: str, fmt: str = "csv", names: Optional[Sequence[str]] = None,
+               start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+               account_id: Optional[int] = None) -> List[ExportResult]:
+    """Export several datasets (all by default) of one account, skipping missing sources"""
+    results = []
+    for name in names or DATASETS:
+        result = export_dataset(name, out_dir, fmt, start, end, account_id=account_id)
+        if result:
+            print(f"DEBUG: Exported {result.rows} {name} row(s) to {result.path} in {result.seconds:.2f}s")
+            results.append(result)
+    return results
+
+def close_export_connections():
+    """Close the calling thread's connections, for export worker threads"""
+    for dataset in DATASETS.values():
+        if isinstance(dataset, SqlDataset):
+            get_database(dataset.db_path).close_thread_connection()
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Headless export command"""
+    parser = argparse.ArgumentParser(description="Export PropFire data")
+    parser.add_argument("datasets", nargs="*", help=f"any of {', '.join(DATASETS)} (default: all)")
+    parser.add_argument("--out", default="exports", help="output directory")
+    parser.add_argument("--format", default="csv", choices=list(WRITERS), dest="fmt")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, help="first date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, help="last date (YYYY-MM-DD)")
+    parser.add_argument("--account", type=int, help="account id (default: the active account)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.datasets if name not in DATASETS]
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(unknown)}")
+
+    results = export_all(args.out, args.fmt, args.datasets, args.start, args.end, args.account)
+    for result in results:
+        print(f"{result.dataset}: {result.rows} rows -> {result.path}")
+    return 0 if results else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
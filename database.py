@@ -0,0 +1,215 @@
+"""
+Database Module for PropFire
+Shared SQLite connection management: long-lived per-thread connections,
+WAL journaling, tuned pragmas and an explicit transaction API
+"""
+
+import calendar
+import datetime
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Pragmas applied to every new connection. WAL lets readers run alongside the
+# writer and, with synchronous=NORMAL, only fsyncs on checkpoint instead of
+# on every commit.
+CONNECTION_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),        # ~16MB page cache per connection
+    ("mmap_size", 268435456),      # 256MB memory-mapped reads
+    ("temp_store", "MEMORY"),
+)
+
+# Dates are stored as integer day numbers (proleptic Gregorian ordinals, as
+# returned by date.toordinal()). SQLite's julianday() differs by this offset.
+JULIAN_DAY_OFFSET = 1721424.5
+
+# Account that rows written before multi-account support belong to
+DEFAULT_ACCOUNT_ID = 1
+
+def date_to_day(date: datetime.date) -> int:
+    """Convert a date to its stored day number"""
+    return date.toordinal()
+
+def day_to_date(day: int) -> datetime.date:
+    """Convert a stored day number back to a date"""
+    return datetime.date.fromordinal(day)
+
+def month_range(year: int, month: int) -> Tuple[int, int]:
+    """Get the inclusive day number range covering a month"""
+    first = datetime.date(year, month, 1).toordinal()
+    return first, first + calendar.monthrange(year, month)[1] - 1
+
+def year_range(year: int) -> Tuple[int, int]:
+    """Get the inclusive day number range covering a year"""
+    return datetime.date(year, 1, 1).toordinal(), datetime.date(year, 12, 31).toordinal()
+
+class ConnectionManager:
+    """Per-thread long-lived connections to a single SQLite database"""
+
+    def __init__(self, db_path: str, statement_cache_size: int = 256, busy_timeout: float = 5.0):
+        self.db_path = db_path
+        self.statement_cache_size = statement_cache_size
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection"""
+        # isolation_level=None disables the sqlite3 module's implicit
+        # transactions; writes are grouped explicitly via transaction().
+        # check_same_thread=False only so close_all() can run from any
+        # thread - each connection is still used by its owning thread.
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size
+        )
+        for name, value in CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    @contextmanager
+    def transaction(self, immediate: bool = True) -> Iterator[sqlite3.Connection]:
+        """Run a block in a transaction; nested blocks become savepoints"""
+        conn = self.connection()
+        depth = self._local.depth
+        if depth == 0:
+            # IMMEDIATE takes the write lock up front so read-then-write
+            # blocks can't fail halfway with SQLITE_BUSY on upgrade
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            self._local.on_commit = []
+        else:
+            conn.execute(f"SAVEPOINT sp_{depth}")
+        # Callbacks registered inside a savepoint are dropped if it rolls back
+        mark = len(self._local.on_commit)
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                conn.execute("ROLLBACK")
+                self._local.on_commit = []
+            else:
+                conn.execute(f"ROLLBACK TO sp_{depth}")
+                conn.execute(f"RELEASE sp_{depth}")
+                del self._local.on_commit[mark:]
+            raise
+        self._local.depth = depth
+        if depth == 0:
+            callbacks, self._local.on_commit = self._local.on_commit, []
+            try:
+                conn.execute("COMMIT")
+            except BaseException:
+                # Nothing was committed, so the callbacks' data must not be applied
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            # The write is committed: a failing callback must neither skip the
+            # others (ledger, cache, events) nor look like a failed write
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"DEBUG: Commit callback error: {e}")
+        else:
+            conn.execute(f"RELEASE sp_{depth}")
+
+    def in_transaction(self) -> bool:
+        """Check if the calling thread has an open transaction"""
+        return getattr(self._local, 'depth', 0) > 0
+
+    def on_commit(self, callback: Callable[[], None]):
+        """Run a callback when the calling thread's transaction commits, or now outside one"""
+        # Callbacks carry committed data (ledger updates, events), so ones from
+        # a savepoint that rolled back are discarded with it
+        if self.in_transaction():
+            self._local.on_commit.append(callback)
+        else:
+            callback()
+
+    def change_token(self) -> tuple:
+        """Cheap token that differs after any write to the database, for cache validation"""
+        conn = self.connection()
+        # data_version moves on other connections' commits, total_changes on this one's
+        return id(conn), conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        """Execute a single statement on the calling thread's connection"""
+        return self.connection().execute(sql, params)
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> sqlite3.Cursor:
+        """Execute a statement for every row inside one transaction"""
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows)
+
+    def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        """Execute a query and return the first row"""
+        return self.connection().execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """Execute a query and return all rows"""
+        return self.connection().execute(sql, params).fetchall()
+
+    def close_thread_connection(self):
+        """Close the calling thread's connection, e.g. when a worker exits"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+        self._local.conn = None
+
+    def close_all(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+_managers: Dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+def get_database(db_path: str) -> ConnectionManager:
+    """Get the shared connection manager for a database file"""
+    # In-memory databases are private per connection, so they are never shared
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None or db_path == ":memory:":
+            manager = ConnectionManager(db_path)
+            if db_path != ":memory:":
+                _managers[key] = manager
+        return manager
+
+def close_all_databases():
+    """Close every shared connection, called on application exit"""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close_all()
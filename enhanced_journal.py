@@ -3,118 +3,468 @@ Enhanced Trading Journal with image attachments and trade details
 """
 
 import customtkinter as ctk
-import sqlite3
 import calendar
 import datetime
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, replace
 import os
-import shutil
+import time
 from PIL import Image, ImageTk
-from account_manager import AccountService
+from account_manager import AccountRepository, AccountService
+from database import get_database, date_to_day, day_to_date, month_range, year_range
+from migrations import migrate, STORE_MIGRATIONS, STORE_PATH
+from aggregates import PnLAggregates, PnLSummary, month_key, year_month_keys
+from calendar_grid import CalendarGrid, PLACEHOLDER
+from image_pipeline import ImageInfo, get_image_pipeline, thumbnail_cache, THUMB_LARGE, THUMB_SMALL
+from image_store import ImageStore
+from notes_index import NotesIndex, SearchHit, merge_hits
+from trading_journal import JournalRepository
+from query_cache import get_query_cache, ALL_DAYS
+from write_queue import get_write_queue
+from data_export import export_all, close_export_connections
+from analytics import PerformanceAnalytics, PerformanceStats
+from event_bus import get_event_bus, publish, Event, TradeSaved, TradeDeleted
+from worker_pool import get_worker_pool, PRIORITY_BACKGROUND
+
+# Day, month and year totals and the notes index over trades, maintained on write
+TRADE_AGGREGATES = PnLAggregates("trade")
+TRADE_NOTES_INDEX = NotesIndex("trade_notes_fts", "trades", "id", ("notes", "instrument"))
 
 @dataclass
 class TradeEntry:
-    """Enhanced trade entry with full details"""
+    """Single trade with full details"""
     date: datetime.date
-    pnl: float
+    pnl: float  # Net of fees
+    id: Optional[int] = None
+    instrument: str = ""
+    direction: str = ""  # "Long" or "Short"
+    size: float = 0.0
+    entry_time: Optional[datetime.datetime] = None
+    exit_time: Optional[datetime.datetime] = None
     entry_price: float = 0.0
+    exit_price: float = 0.0
     stop_loss: float = 0.0
     take_profit: float = 0.0
+    fees: float = 0.0
     risk_reward: float = 0.0
     notes: str = ""
     chart_image: str = ""  # Path to image file
 
+@dataclass
+class DailyTotal:
+    """Pre-aggregated totals for one trading day"""
+    date: datetime.date
+    pnl: float = 0.0
+    fees: float = 0.0
+    trade_count: int = 0
+    wins: int = 0
+    losses: int = 0
+
+TRADE_COLUMNS = """
+    id, day, instrument, direction, size, entry_time, exit_time, entry_price, exit_price,
+    stop_loss, take_profit, fees, pnl, risk_reward, notes, chart_image
+"""
+
 class EnhancedJournalRepository:
     """Enhanced repository with image support"""
     
-    def __init__(self, db_path: str = "enhanced_journal.db"):
+    def __init__(self, db_path: str = STORE_PATH, account: Optional[AccountRepository] = None):
         self.db_path = db_path
+        self.db = get_database(db_path)
         self.images_dir = "journal_images"
         os.makedirs(self.images_dir, exist_ok=True)
         self._init_db()
+        self.images = ImageStore(self.db, self.images_dir)
+        self.cache = get_query_cache(self.db)
+        self.writes = get_write_queue(self.db)
+        # Equity follows trade totals inside the trade's own transaction,
+        # which needs both on the same store connection
+        self.account = account or AccountRepository(db_path)
+        if self.account.db is not self.db:
+            raise ValueError("Trades and equity must live in the same store")
+        # Trades are scoped to the account whose equity they feed
+        self.account_id = self.account.account_id
     
     def _init_db(self):
-        """Initialize enhanced database schema"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS trade_entries (
-                    date TEXT PRIMARY KEY,
-                    pnl REAL NOT NULL,
-                    entry_price REAL DEFAULT 0,
-                    stop_loss REAL DEFAULT 0,
-                    take_profit REAL DEFAULT 0,
-                    risk_reward REAL DEFAULT 0,
-                    notes TEXT DEFAULT '',
-                    chart_image TEXT DEFAULT ''
-                )
-            """)
-            conn.commit()
-    
-    def get_trade_entry(self, date: datetime.date) -> Optional[TradeEntry]:
-        """Get trade entry for specific date"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                SELECT * FROM trade_entries WHERE date = ?
-            """, (date.strftime("%Y-%m-%d"),))
-            
-            row = cursor.fetchone()
-            if row:
-                return TradeEntry(
-                    date=datetime.datetime.strptime(row[0], "%Y-%m-%d").date(),
-                    pnl=row[1],
-                    entry_price=row[2],
-                    stop_loss=row[3],
-                    take_profit=row[4],
-                    risk_reward=row[5],
-                    notes=row[6],
-                    chart_image=row[7]
-                )
-            return None
+        """Initialize or upgrade the store schema"""
+        migrate(self.db, STORE_MIGRATIONS)
+    
+    @staticmethod
+    def _row_to_trade(row) -> TradeEntry:
+        """Build a trade from a row selected with TRADE_COLUMNS"""
+        return TradeEntry(
+            id=row[0],
+            date=day_to_date(row[1]),
+            instrument=row[2],
+            direction=row[3],
+            size=row[4],
+            entry_time=datetime.datetime.fromisoformat(row[5]) if row[5] else None,
+            exit_time=datetime.datetime.fromisoformat(row[6]) if row[6] else None,
+            entry_price=row[7],
+            exit_price=row[8],
+            stop_loss=row[9],
+            take_profit=row[10],
+            fees=row[11],
+            pnl=row[12],
+            risk_reward=row[13],
+            notes=row[14],
+            chart_image=row[15]
+        )
+    
+    @staticmethod
+    def _trade_params(entry: TradeEntry) -> tuple:
+        """Column values for a trade, in TRADE_COLUMNS order without id"""
+        return (
+            date_to_day(entry.date),
+            entry.instrument,
+            entry.direction,
+            entry.size,
+            entry.entry_time.isoformat() if entry.entry_time else None,
+            entry.exit_time.isoformat() if entry.exit_time else None,
+            entry.entry_price,
+            entry.exit_price,
+            entry.stop_loss,
+            entry.take_profit,
+            entry.fees,
+            entry.pnl,
+            entry.risk_reward,
+            entry.notes,
+            entry.chart_image
+        )
     
-    def save_trade_entry(self, entry: TradeEntry):
-        """Save trade entry with image"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO trade_entries 
-                (date, pnl, entry_price, stop_loss, take_profit, risk_reward, notes, chart_image)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                entry.date.strftime("%Y-%m-%d"),
-                entry.pnl,
-                entry.entry_price,
-                entry.stop_loss,
-                entry.take_profit,
-                entry.risk_reward,
-                entry.notes,
-                entry.chart_image
-            ))
-            conn.commit()
-    
-    def save_chart_image(self, date: datetime.date, image_path: str) -> str:
-        """Save chart image and return stored path"""
+    def get_trade(self, trade_id: int) -> Optional[TradeEntry]:
+        """Get a single trade by id"""
+        row = self.db.fetchone(f"SELECT {TRADE_COLUMNS} FROM trades WHERE id = ? AND account_id = ?",
+                               (trade_id, self.account_id))
+        return self._row_to_trade(row) if row else None
+    
+    def get_trades_for_day(self, date: datetime.date) -> List[TradeEntry]:
+        """Get all trades on a date in entry order"""
+        day = date_to_day(date)
+        
+        def load():
+            rows = self.db.fetchall(f"""
+                SELECT {TRADE_COLUMNS} FROM trades WHERE account_id = ? AND day = ?
+                ORDER BY entry_time, id
+            """, (self.account_id, day))
+            return [self._row_to_trade(row) for row in rows]
+        return self.cache.get("trades.day", (day, day), load, self.account_id)
+    
+    def get_trades_between(self, start: datetime.date, end: datetime.date) -> List[TradeEntry]:
+        """Get all trades in an inclusive date range"""
+        rows = self.db.fetchall(f"""
+            SELECT {TRADE_COLUMNS} FROM trades WHERE account_id = ? AND day BETWEEN ? AND ?
+            ORDER BY day, entry_time, id
+        """, (self.account_id, date_to_day(start), date_to_day(end)))
+        return [self._row_to_trade(row) for row in rows]
+    
+    def get_daily_total(self, date: datetime.date) -> DailyTotal:
+        """Get the aggregated totals for one day"""
+        day = date_to_day(date)
+        summary = self.cache.get("trades.total", (day, day),
+                                 lambda: TRADE_AGGREGATES.get(self.db, self.account_id, "day", day), self.account_id)
+        return DailyTotal(date, summary.pnl, summary.fees, summary.trade_count, summary.wins, summary.losses)
+    
+    def get_month_totals(self, year: int, month: int) -> Dict[datetime.date, DailyTotal]:
+        """Get aggregated daily totals for a month in one range scan"""
+        days = month_range(year, month)
+        
+        def load():
+            totals = TRADE_AGGREGATES.get_range(self.db, self.account_id, "day", *days)
+            return {
+                day_to_date(day): DailyTotal(day_to_date(day), s.pnl, s.fees, s.trade_count, s.wins, s.losses)
+                for day, s in totals.items()
+            }
+        return self.cache.get("trades.month_totals", days, load, self.account_id)
+    
+    def get_month_summary(self, year: int, month: int) -> PnLSummary:
+        """Get the aggregated totals for a month"""
+        key = month_key(datetime.date(year, month, 1))
+        return self.cache.get("trades.month", month_range(year, month),
+                              lambda: TRADE_AGGREGATES.get(self.db, self.account_id, "month", key), self.account_id)
+    
+    def get_year_summary(self, year: int) -> PnLSummary:
+        """Get the aggregated totals for a year"""
+        return self.cache.get("trades.year", year_range(year),
+                              lambda: TRADE_AGGREGATES.get(self.db, self.account_id, "year", year), self.account_id)
+    
+    def get_year_months(self, year: int) -> Dict[int, PnLSummary]:
+        """Get aggregated totals for each traded month of a year, keyed by month number"""
+        def load():
+            months = TRADE_AGGREGATES.get_range(self.db, self.account_id, "month", *year_month_keys(year))
+            return {key % 100: summary for key, summary in months.items()}
+        return self.cache.get("trades.year_months", year_range(year), load, self.account_id)
+    
+    def save_trade(self, entry: TradeEntry) -> int:
+        """Insert a new trade or update an existing one, returning its id"""
+        changed_dates = [entry.date]
+        with self.db.transaction() as conn:
+            if entry.id is not None:
+                old = conn.execute("""
+                    SELECT day, pnl, fees, chart_image, notes, instrument FROM trades WHERE id = ? AND account_id = ?
+                """, (entry.id, self.account_id)).fetchone()
+                if not old:
+                    raise ValueError(f"Trade {entry.id} not found in account {self.account_id}")
+                changed_dates.append(day_to_date(old[0]))
+                TRADE_AGGREGATES.apply(conn, self.account_id, old[0], old[1], old[2], sign=-1)
+                ImageStore.release(conn, old[3])
+                TRADE_NOTES_INDEX.remove(conn, entry.id, old[4:6])
+                # An UPDATE keeps the import key, so re-importing an edited trade still skips it
+                conn.execute("""
+                    UPDATE trades SET day = ?, instrument = ?, direction = ?, size = ?, entry_time = ?,
+                        exit_time = ?, entry_price = ?, exit_price = ?, stop_loss = ?, take_profit = ?, fees = ?,
+                        pnl = ?, risk_reward = ?, notes = ?, chart_image = ?
+                    WHERE id = ? AND account_id = ?
+                """, self._trade_params(entry) + (entry.id, self.account_id))
+                trade_id = entry.id
+            else:
+                cursor = conn.execute("""
+                    INSERT INTO trades (account_id, day, instrument, direction, size, entry_time, exit_time,
+                        entry_price, exit_price, stop_loss, take_profit, fees, pnl, risk_reward, notes, chart_image)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (self.account_id,) + self._trade_params(entry))
+                trade_id = cursor.lastrowid
+            TRADE_AGGREGATES.apply(conn, self.account_id, date_to_day(entry.date), entry.pnl, entry.fees)
+            ImageStore.retain(conn, entry.chart_image)
+            TRADE_NOTES_INDEX.add(conn, trade_id, (entry.notes, entry.instrument))
+            totals = self._sync_equity(changed_dates)
+            for date in changed_dates:
+                self.cache.invalidate(date_to_day(date))
+            saved = replace(entry, id=trade_id)
+            self.db.on_commit(lambda: publish(TradeSaved(self.account_id, saved, totals)))
+        return trade_id
+    
+    def save_trade_async(self, entry: TradeEntry, previous: Optional[TradeEntry] = None,
+                         image_path: Optional[str] = None, on_image_ready=None,
+                         on_done: Optional[Callable[[int], None]] = None,
+                         on_error: Optional[Callable[[Exception], None]] = None):
+        """Queue a save on the writer thread; cached views show it right away"""
+        self._preview_trade(previous, -1)
+        self._preview_trade(entry, 1)
+        
+        def apply() -> int:
+            # The chart is hashed and staged off the UI thread too
+            if image_path:
+                entry.chart_image = self.save_chart_image(image_path, on_image_ready)
+            return self.save_trade(entry)
+        self.writes.submit(apply, f"save trade on {entry.date}", on_done,
+                           self._revert_preview([entry, previous], on_error))
+    
+    def delete_trade_async(self, trade: TradeEntry, on_done: Optional[Callable[[None], None]] = None,
+                           on_error: Optional[Callable[[Exception], None]] = None):
+        """Queue a delete on the writer thread; cached views drop the trade right away"""
+        self._preview_trade(trade, -1)
+        self.writes.submit(lambda: self.delete_trade(trade.id), f"delete trade {trade.id}", on_done,
+                           self._revert_preview([trade], on_error))
+    
+    def _preview_trade(self, trade: Optional[TradeEntry], sign: int):
+        """Add (sign=1) or remove (sign=-1) a queued trade in the cached views"""
+        if trade is None or (sign < 0 and trade.id is None):
+            return
+        date = trade.date
+        day = date_to_day(date)
+        month_days = month_range(date.year, date.month)
+        
+        def shift(summary):
+            return summary.shifted(trade.pnl, trade.fees, sign)
+        
+        def shift_day(totals):
+            old = totals.get(date)
+            summary = shift(PnLSummary(old.pnl, old.fees, old.trade_count, old.wins, old.losses)
+                            if old else PnLSummary())
+            totals = {d: t for d, t in totals.items() if d != date}
+            if summary.trade_count > 0:
+                totals[date] = DailyTotal(date, summary.pnl, summary.fees, summary.trade_count,
+                                          summary.wins, summary.losses)
+            return totals
+        
+        def shift_month(months):
+            summary = shift(months.get(date.month, PnLSummary()))
+            months = {m: s for m, s in months.items() if m != date.month}
+            if summary.trade_count > 0:
+                months[date.month] = summary
+            return months
+        
+        def update_trades(trades):
+            trades = [t for t in trades if trade.id is None or t.id != trade.id]
+            return trades + [trade] if sign > 0 else trades
+        
+        self.cache.patch("trades.total", (day, day), shift, self.account_id)
+        self.cache.patch("trades.day", (day, day), update_trades, self.account_id)
+        self.cache.patch("trades.month_totals", month_days, shift_day, self.account_id)
+        self.cache.patch("trades.month", month_days, shift, self.account_id)
+        self.cache.patch("trades.year", year_range(date.year), shift, self.account_id)
+        self.cache.patch("trades.year_months", year_range(date.year), shift_month, self.account_id)
+    
+    def _revert_preview(self, trades: List[Optional[TradeEntry]], on_error):
+        """Error callback that drops optimistic values for the trades' days before reporting"""
+        def failed(error: Exception):
+            for trade in trades:
+                if trade is not None:
+                    self.cache.invalidate(date_to_day(trade.date))
+            if on_error:
+                on_error(error)
+        return failed
+    
+    def import_trades(self, trades: Iterable[Tuple[str, TradeEntry]], batch_size: int = 5000,
+                      progress: Optional[Callable[[int, int], None]] = None) -> Tuple[int, List[datetime.date]]:
+        """Bulk insert (import_key, trade) pairs in one transaction, returning (inserted, days touched)"""
+        sql = """
+            INSERT OR IGNORE INTO trades (day, instrument, direction, size, entry_time, exit_time,
+                entry_price, exit_price, stop_loss, take_profit, fees, pnl, risk_reward, notes, chart_image,
+                import_key, account_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        read = inserted = 0
+        days = []
+        with self.db.transaction() as conn:
+            # New rows get ids above the current maximum, so they can be indexed in one statement
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM trades").fetchone()[0]
+            batch = []
+            for import_key, entry in trades:
+                batch.append(self._trade_params(entry) + (import_key, self.account_id))
+                if len(batch) >= batch_size:
+                    inserted += self._insert_batch(conn, sql, batch)
+                    read += len(batch)
+                    batch = []
+                    if progress:
+                        progress(read, inserted)
+            if batch:
+                inserted += self._insert_batch(conn, sql, batch)
+                read += len(batch)
+                if progress:
+                    progress(read, inserted)
+            # One aggregate rebuild and equity re-chain at the end instead of per row
+            if inserted:
+                # Only the days of rows actually inserted; duplicates skipped by OR IGNORE changed nothing
+                days = [row[0] for row in conn.execute("""
+                    SELECT DISTINCT day FROM trades WHERE id > ? AND account_id = ? ORDER BY day
+                """, (last_id, self.account_id))]
+                TRADE_AGGREGATES.rebuild(conn, "trades", account_id=self.account_id)
+                TRADE_NOTES_INDEX.add_after(conn, last_id)
+                self._sync_equity(day_to_date(day) for day in days)
+                self.cache.invalidate(days[0], days[-1])
+        return inserted, [day_to_date(day) for day in days]
+    
+    @staticmethod
+    def _insert_batch(conn, sql: str, batch: List[tuple]) -> int:
+        """Insert one batch, returning how many rows were new"""
+        before = conn.total_changes
+        conn.executemany(sql, batch)
+        return conn.total_changes - before
+    
+    def search_notes(self, text: str, limit: int = 50) -> List[SearchHit]:
+        """Trades whose notes or instrument match a full-text query, best first"""
+        rows = TRADE_NOTES_INDEX.search(self.db, text, "s.day, s.instrument, s.direction, s.pnl", limit,
+                                        self.account_id)
+        return [
+            SearchHit("trade", row[0], day_to_date(row[1]), f"{row[2] or 'Trade'} {row[3]}".strip(),
+                      row[5], row[4], row[6])
+            for row in rows
+        ]
+    
+    def get_daily_totals(self, dates: Iterable[datetime.date]) -> Dict[datetime.date, DailyTotal]:
+        """Get aggregated totals for specific days with one range scan"""
+        wanted = {date_to_day(date) for date in dates}
+        if not wanted:
+            return {}
+        days = TRADE_AGGREGATES.get_range(self.db, self.account_id, "day", min(wanted), max(wanted))
+        return {
+            day_to_date(day): DailyTotal(day_to_date(day), s.pnl, s.fees, s.trade_count, s.wins, s.losses)
+            for day, s in days.items() if day in wanted
+        }
+    
+    def delete_trade(self, trade_id: int):
+        """Delete a trade and remove it from the aggregates"""
+        with self.db.transaction() as conn:
+            old = conn.execute("""
+                SELECT day, pnl, fees, chart_image, notes, instrument FROM trades WHERE id = ? AND account_id = ?
+            """, (trade_id, self.account_id)).fetchone()
+            if not old:
+                return
+            conn.execute("DELETE FROM trades WHERE id = ?", (trade_id,))
+            TRADE_AGGREGATES.apply(conn, self.account_id, old[0], old[1], old[2], sign=-1)
+            ImageStore.release(conn, old[3])
+            TRADE_NOTES_INDEX.remove(conn, trade_id, old[4:6])
+            totals = self._sync_equity([day_to_date(old[0])])
+            self.cache.invalidate(old[0])
+            self.db.on_commit(lambda: publish(TradeDeleted(self.account_id, trade_id, day_to_date(old[0]), totals)))
+    
+    def _sync_equity(self, dates: Iterable[datetime.date]) -> Dict[datetime.date, Optional[DailyTotal]]:
+        """Set the equity curve's P&L for days to their new trade totals, in the caller's transaction;
+        returns the totals (None for days left without trades)"""
+        dates = set(dates)
+        totals = self.get_daily_totals(dates)
+        # Days whose last trade was removed drop to zero
+        self.account.set_daily_pnl({date: totals[date].pnl if date in totals else 0.0 for date in dates})
+        return {date: totals.get(date) for date in dates}
+    
+    def rebuild_aggregates(self):
+        """Recompute this account's day/month/year aggregates from the trades table"""
+        with self.db.transaction() as conn:
+            TRADE_AGGREGATES.rebuild(conn, "trades", account_id=self.account_id)
+            self.cache.invalidate(*ALL_DAYS)
+    
+    def rebuild_image_refcounts(self):
+        """Recompute image reference counts from the trades table"""
+        with self.db.transaction() as conn:
+            rows = conn.execute("SELECT chart_image FROM trades WHERE chart_image != ''").fetchall()
+            ImageStore.rebuild(conn, (row[0] for row in rows))
+    
+    def save_chart_image(self, image_path: str, on_ready=None) -> str:
+        """Add a chart image to the content-addressed store, returning its blob path"""
         if not os.path.exists(image_path):
             return ""
+        # Identical screenshots map to one blob; copy and thumbnails run off the UI thread
+        return self.images.add(image_path, on_ready)
+    
+    def get_chart_image_size(self, image_path: str) -> Optional[tuple]:
+        """Get the (width, height) of a processed chart image"""
+        return self.images.get_dimensions(image_path)
+    
+    def get_month_chart_images(self, year: int, month: int) -> Dict[datetime.date, str]:
+        """Get the first chart image attached on each day of a month"""
+        days = month_range(year, month)
         
-        # Create unique filename
-        ext = os.path.splitext(image_path)[1]
-        filename = f"{date.strftime('%Y-%m-%d')}_chart{ext}"
-        dest_path = os.path.join(self.images_dir, filename)
-        
-        # Copy image
-        shutil.copy2(image_path, dest_path)
-        return dest_path
+        def load():
+            rows = self.db.fetchall("""
+                SELECT day, MIN(chart_image) FROM trades
+                WHERE account_id = ? AND day BETWEEN ? AND ? AND chart_image != ''
+                GROUP BY day
+            """, (self.account_id, *days))
+            return {day_to_date(row[0]): row[1] for row in rows}
+        return self.cache.get("trades.month_images", days, load, self.account_id)
+    
+    def backfill_thumbnails(self, on_ready=None):
+        """Queue thumbnailing for referenced charts that were never processed"""
+        rows = self.db.fetchall("""
+            SELECT path FROM image_blobs WHERE refcount > 0 AND width IS NULL
+        """)
+        for (path,) in rows:
+            if os.path.exists(path):
+                get_image_pipeline().ingest(path, path, lambda info: self.images.record_ingested(info, on_ready))
+    
+    def collect_garbage(self):
+        """Delete unreferenced chart images in the background"""
+        return self.images.collect_garbage_async()
 
 class EnhancedJournalWindow:
     """Enhanced journal window with trade details and images"""
     
     def __init__(self):
-        self.repository = EnhancedJournalRepository()
-        self.account_service = AccountService()
-        self.current_date = datetime.date.today()
+        # Everything in the window belongs to the account active when it opened
+        account = AccountRepository()
+        self.repository = EnhancedJournalRepository(account=account)
+        self.account_service = AccountService(account.account_id)
+        self.daily_journal = JournalRepository(account_id=account.account_id)  # Searched alongside trade notes
+        self.analytics = PerformanceAnalytics(account_id=account.account_id)
+        # Pinned to the 1st so month navigation never hits a missing day
+        self.current_date = datetime.date.today().replace(day=1)
         self.journal_window = None
+        self.calendar_grid = None
+        self.subscriptions = []
     
     def show(self):
         """Display enhanced journal window"""
@@ -123,13 +473,22 @@ class EnhancedJournalWindow:
             return
             
         self.journal_window = ctk.CTkToplevel()
-        self.journal_window.title("PropFire - Enhanced Trading Journal")
+        account = self.repository.account.get_account()
+        self.journal_window.title(f"PropFire - Enhanced Trading Journal ({account.name if account else 'Main'})")
         self.journal_window.geometry("900x700+150+50")
         self.journal_window.configure(fg_color="#000000")
         self.journal_window.attributes('-topmost', True)
         
         self._create_widgets()
         self._load_month_data()
+        # Committed saves from this or any other window update the calendar
+        bus = get_event_bus()
+        self.subscriptions = [bus.subscribe(TradeSaved, self._on_trades_changed),
+                              bus.subscribe(TradeDeleted, self._on_trades_changed)]
+        # Charts saved before thumbnailing existed are processed in the background
+        self.repository.backfill_thumbnails(
+            on_ready=lambda info: self.journal_window.after(0, lambda: self._on_image_ready(info)))
+        self.repository.collect_garbage()
     
     def _create_widgets(self):
         """Create enhanced journal UI"""
@@ -160,94 +519,164 @@ class EnhancedJournalWindow:
                                 command=self._next_month, fg_color="#333333")
         next_btn.pack(side='right')
         
-        # Calendar grid
-        self.calendar_frame = ctk.CTkFrame(self.journal_window, fg_color="#000000")
-        self.calendar_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        import_btn = ctk.CTkButton(nav_frame, text="⬆ Import", width=80, height=30,
+                                  command=self._import_statement, fg_color="#333333")
+        import_btn.pack(side='right', padx=10)
         
-        # Configure grid
-        for i in range(7):
-            self.calendar_frame.grid_columnconfigure(i, weight=1, uniform="col")
-        for i in range(7):  # 6 weeks + header
-            self.calendar_frame.grid_rowconfigure(i, weight=1, uniform="row")
+        export_btn = ctk.CTkButton(nav_frame, text="⬇ Export", width=80, height=30,
+                                  command=self._export_data, fg_color="#333333")
+        export_btn.pack(side='right')
         
-        # Weekday headers
-        weekdays = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        for i, day in enumerate(weekdays):
-            label = ctk.CTkLabel(self.calendar_frame, text=day,
-                               font=('Inter', 12, 'bold'), text_color='#888888')
-            label.grid(row=0, column=i, padx=1, pady=1, sticky='nsew')
+        search_btn = ctk.CTkButton(nav_frame, text="🔍 Search", width=80, height=30,
+                                  command=self._open_search, fg_color="#333333")
+        search_btn.pack(side='right', padx=10)
         
-        # Create day cells
-        self.day_cells = {}
-        self._create_calendar_grid()
+        stats_btn = ctk.CTkButton(nav_frame, text="📊 Stats", width=80, height=30,
+                                 command=self._open_stats, fg_color="#333333")
+        stats_btn.pack(side='right')
+        
+        # Month and year totals from the aggregate tables
+        summary_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
+        summary_frame.pack(fill='x', pady=(0, 5))
+        
+        self.month_total_label = ctk.CTkLabel(summary_frame, text="",
+                                             font=('Inter', 14, 'bold'), text_color='#888888')
+        self.month_total_label.pack(side='left', expand=True)
+        
+        self.year_total_label = ctk.CTkLabel(summary_frame, text="",
+                                            font=('Inter', 14, 'bold'), text_color='#888888')
+        self.year_total_label.pack(side='left', expand=True)
+        
+        # Calendar grid, built once and re-labelled on navigation
+        self.calendar_grid = CalendarGrid(self.journal_window, self._edit_day)
+        self.calendar_grid.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        self.calendar_grid.show_month(self.current_date.year, self.current_date.month)
         
         # Close button
         close_btn = ctk.CTkButton(self.journal_window, text="Close",
                                  command=self._close_journal, fg_color="#ff6b35")
         close_btn.pack(pady=10)
     
-    def _create_calendar_grid(self):
-        """Create calendar day cells"""
-        # Clear existing day cells
-        for widget in self.calendar_frame.winfo_children():
-            if int(widget.grid_info().get("row", 0)) > 0:  # Keep headers
-                widget.destroy()
-        
-        self.day_cells.clear()
-        
-        # Get calendar data
-        cal = calendar.monthcalendar(self.current_date.year, self.current_date.month)
-        
-        for week_num, week in enumerate(cal, 1):
-            for day_num, day in enumerate(week):
-                if day == 0:
-                    continue
-                    
-                # Create day cell
-                cell = ctk.CTkFrame(self.calendar_frame, fg_color="#111111", 
-                                  corner_radius=5, border_width=1, border_color="#333333")
-                cell.grid(row=week_num, column=day_num, padx=2, pady=2, sticky='nsew')
-                
-                # Day number
-                day_label = ctk.CTkLabel(cell, text=str(day),
-                                       font=('Inter', 12, 'bold'), text_color='#ffffff')
-                day_label.pack(anchor='nw', padx=5, pady=2)
-                
-                # PnL placeholder
-                pnl_label = ctk.CTkLabel(cell, text="$0.00",
-                                       font=('Courier', 10), text_color='#666666')
-                pnl_label.pack(anchor='w', padx=5)
-                
-                # Store cell reference
-                cell_date = datetime.date(self.current_date.year, self.current_date.month, day)
-                self.day_cells[cell_date] = {
-                    'frame': cell,
-                    'pnl_label': pnl_label
-                }
-                
-                # Bind click event
-                cell.bind("<Button-1>", lambda e, d=cell_date: self._edit_day(d))
-                day_label.bind("<Button-1>", lambda e, d=cell_date: self._edit_day(d))
-    
     def _edit_day(self, date: datetime.date):
         """Open enhanced trade dialog for day"""
-        from enhanced_journal import EnhancedTradeDialog
-        EnhancedTradeDialog(date, self.repository, self.account_service)
+        EnhancedTradeDialog(date, self.repository, self.account_service, self._refresh_calendar)
+    
+    def _open_search(self):
+        """Open the notes search panel"""
+        SearchDialog(lambda text: merge_hits(self.repository.search_notes(text),
+                                             self.daily_journal.search_notes(text)),
+                     self._show_day)
+    
+    def _open_stats(self):
+        """Open performance statistics for the displayed month"""
+        StatsDialog(self.analytics, self.current_date)
+    
+    def _show_day(self, date: datetime.date):
+        """Jump the calendar to a date's month and open that day"""
+        self.current_date = date.replace(day=1)
+        self._refresh_calendar()
+        self._edit_day(date)
+    
+    def _import_statement(self):
+        """Bulk import a broker statement into the journal"""
+        # Imported here: trade_import builds on this module's repository and entries
+        from trade_import import ImportDialog
+        ImportDialog(self.repository, on_complete=lambda result: self._refresh_calendar())
+    
+    def _export_data(self):
+        """Export journal, equity and news data to CSV files in a chosen folder"""
+        out_dir = filedialog.askdirectory(title="Export Folder")
+        if not out_dir:
+            return
+        
+        def run_export():
+            try:
+                return export_all(out_dir, account_id=self.repository.account_id)
+            finally:
+                close_export_connections()
+        
+        def show_results(results):
+            message = "\n".join(f"{r.dataset}: {r.rows:,} rows" for r in results) or "Nothing to export"
+            messagebox.showinfo("Export Complete", message)
+        
+        get_worker_pool().submit(
+            run_export, "export", PRIORITY_BACKGROUND,
+            on_done=show_results,
+            on_error=lambda e: messagebox.showerror("Error", f"Export failed: {e}"),
+            deliver=lambda call: self.journal_window.after(0, call)
+        )
     
     def _load_month_data(self):
         """Load and display month data"""
-        # Load trade entries for the month
-        for day in range(1, 32):
-            try:
-                cell_date = datetime.date(self.current_date.year, self.current_date.month, day)
-                if cell_date in self.day_cells:
-                    entry = self.repository.get_trade_entry(cell_date)
-                    if entry and entry.pnl != 0:
-                        pnl_text = f"${entry.pnl:,.0f}" if abs(entry.pnl) >= 1 else f"${entry.pnl:.2f}"
-                        pnl_color = '#00FF00' if entry.pnl > 0 else '#FF4444' if entry.pnl < 0 else '#666666'
-                        self.day_cells[cell_date]['pnl_label'].configure(text=pnl_text, text_color=pnl_color)
-            except ValueError:
-                break  # Invalid date
+        # Read pre-aggregated daily totals for the month in a single range query
+        totals = self.repository.get_month_totals(self.current_date.year, self.current_date.month)
+        self.calendar_grid.set_values({cell_date: self._cell_value(total) for cell_date, total in totals.items()})
+        
+        # Thumbnails are decoded lazily and reused from the LRU cache
+        thumbnails = {}
+        for cell_date, path in self.repository.get_month_chart_images(
+                self.current_date.year, self.current_date.month).items():
+            image = thumbnail_cache.get(path, THUMB_SMALL)
+            if image is not None:
+                thumbnails[cell_date] = image
+        self.calendar_grid.set_thumbnails(thumbnails)
+        
+        self._show_summaries()
+    
+    @staticmethod
+    def _cell_value(total: Optional[DailyTotal]) -> Tuple[str, str]:
+        """Calendar cell (text, color) for a day's totals"""
+        if total is None:
+            return PLACEHOLDER
+        pnl_text = f"${total.pnl:,.0f}" if abs(total.pnl) >= 1 else f"${total.pnl:.2f}"
+        if total.trade_count > 1:
+            pnl_text += f" ({total.trade_count})"
+        pnl_color = '#00FF00' if total.pnl > 0 else '#FF4444' if total.pnl < 0 else '#666666'
+        return pnl_text, pnl_color
+    
+    def _show_summaries(self):
+        """Show the displayed month's and year's totals"""
+        # Month and year totals are single-row lookups
+        month = self.repository.get_month_summary(self.current_date.year, self.current_date.month)
+        year = self.repository.get_year_summary(self.current_date.year)
+        self._show_summary(self.month_total_label, "Month", month)
+        self._show_summary(self.year_total_label, str(self.current_date.year), year)
+    
+    def _show_summary(self, label: ctk.CTkLabel, title: str, summary: PnLSummary):
+        """Render an aggregate summary into a header label"""
+        color = '#00FF00' if summary.pnl > 0 else '#FF4444' if summary.pnl < 0 else '#888888'
+        label.configure(
+            text=f"{title}: ${summary.pnl:,.2f} · {summary.trade_count} trades · "
+                 f"{summary.wins}W/{summary.losses}L · fees ${summary.fees:,.2f}",
+            text_color=color
+        )
+    
+    def _on_trades_changed(self, events: List[Event]):
+        """Update the cells of committed saves and deletes from the totals they carry"""
+        if not (self.journal_window and self.journal_window.winfo_exists()):
+            self._close_subscriptions()
+            return
+        year_changed = False
+        for event in events:
+            if event.account_id != self.repository.account_id:
+                continue
+            for date, total in event.totals.items():
+                self.calendar_grid.set_day(date, *self._cell_value(total))
+                year_changed = year_changed or date.year == self.current_date.year
+        if year_changed:
+            self._show_summaries()
+    
+    def _close_subscriptions(self):
+        """Stop receiving events"""
+        for unsubscribe in self.subscriptions:
+            unsubscribe()
+        self.subscriptions = []
+    
+    def _on_image_ready(self, info: ImageInfo):
+        """Show a chart's thumbnail once the pipeline has generated it"""
+        thumbnail_cache.invalidate(info.path)
+        if self.journal_window and self.journal_window.winfo_exists():
+            self._load_month_data()
     
     def _prev_month(self):
         """Navigate to previous month"""
@@ -268,81 +697,181 @@ class EnhancedJournalWindow:
     def _refresh_calendar(self):
         """Refresh calendar display"""
         self.month_label.configure(text=f"{calendar.month_name[self.current_date.month]} {self.current_date.year}")
-        self._create_calendar_grid()
+        self.calendar_grid.show_month(self.current_date.year, self.current_date.month)
         self._load_month_data()
     
     def _close_journal(self):
         """Close journal window"""
+        self._close_subscriptions()
         if self.journal_window:
             self.journal_window.destroy()
 
 class EnhancedTradeDialog:
-    """Enhanced trade entry dialog with image support"""
+    """Trade entry dialog listing every trade on a day, with image support"""
     
-    def __init__(self, date: datetime.date, repository: EnhancedJournalRepository, account_service: AccountService):
+    def __init__(self, date: datetime.date, repository: EnhancedJournalRepository, account_service: AccountService,
+                 refresh_callback=None):
         self.date = date
         self.repository = repository
         self.account_service = account_service
-        self.entry = repository.get_trade_entry(date) or TradeEntry(date=date, pnl=0.0)
+        self.refresh_callback = refresh_callback
+        self.trades = repository.get_trades_for_day(date)
+        self.entry = TradeEntry(date=date, pnl=0.0)
         self.image_path = ""
         
         self._create_dialog()
+        self._load_trade(self.trades[0] if self.trades else self.entry)
     
     def _create_dialog(self):
         """Create enhanced trade dialog"""
         self.dialog = ctk.CTkToplevel()
         self.dialog.title(f"Trade Entry - {self.date.strftime('%B %d, %Y')}")
-        self.dialog.geometry("500x600+300+200")
+        self.dialog.geometry("520x760+300+100")
         self.dialog.configure(fg_color="#111111")
         self.dialog.attributes('-topmost', True)
         self.dialog.grab_set()
         
-        # Trade details frame
-        details_frame = ctk.CTkFrame(self.dialog)
-        details_frame.pack(fill='x', padx=20, pady=10)
+        # Trades already logged on this day
+        list_frame = ctk.CTkFrame(self.dialog)
+        list_frame.pack(fill='x', padx=20, pady=(10, 0))
+        
+        header = ctk.CTkFrame(list_frame, fg_color="transparent")
+        header.pack(fill='x')
+        self.day_total_label = ctk.CTkLabel(header, text="", font=('Inter', 12, 'bold'))
+        self.day_total_label.pack(side='left', padx=5)
+        ctk.CTkButton(header, text="+ New Trade", command=self._new_trade, width=100,
+                     fg_color="#333333", font=('Inter', 11)).pack(side='right', padx=5, pady=5)
         
-        # Entry Price
-        ctk.CTkLabel(details_frame, text="Entry Price:", font=('Inter', 12)).pack(anchor='w', pady=2)
-        self.entry_price_var = ctk.StringVar(value=str(self.entry.entry_price))
-        ctk.CTkEntry(details_frame, textvariable=self.entry_price_var, font=('Inter', 11)).pack(fill='x', pady=2)
+        self.trade_list = ctk.CTkScrollableFrame(list_frame, height=110)
+        self.trade_list.pack(fill='x', padx=5, pady=5)
+        self._populate_trade_list()
         
-        # Stop Loss
-        ctk.CTkLabel(details_frame, text="Stop Loss:", font=('Inter', 12)).pack(anchor='w', pady=2)
-        self.stop_loss_var = ctk.StringVar(value=str(self.entry.stop_loss))
-        ctk.CTkEntry(details_frame, textvariable=self.stop_loss_var, font=('Inter', 11)).pack(fill='x', pady=2)
+        # Trade details frame
+        details_frame = ctk.CTkScrollableFrame(self.dialog, height=420)
+        details_frame.pack(fill='both', expand=True, padx=20, pady=10)
+        details_frame.grid_columnconfigure((0, 1), weight=1)
         
-        # Take Profit
-        ctk.CTkLabel(details_frame, text="Take Profit:", font=('Inter', 12)).pack(anchor='w', pady=2)
-        self.take_profit_var = ctk.StringVar(value=str(self.entry.take_profit))
-        ctk.CTkEntry(details_frame, textvariable=self.take_profit_var, font=('Inter', 11)).pack(fill='x', pady=2)
+        self.instrument_var = self._add_field(details_frame, 0, 0, "Instrument:")
+        ctk.CTkLabel(details_frame, text="Direction:", font=('Inter', 12)).grid(row=0, column=1, sticky='w', padx=5)
+        self.direction_combo = ctk.CTkComboBox(details_frame, values=["Long", "Short"], font=('Inter', 11))
+        self.direction_combo.grid(row=1, column=1, sticky='ew', padx=5, pady=2)
         
-        # PnL
-        ctk.CTkLabel(details_frame, text="Net PnL ($):", font=('Inter', 12)).pack(anchor='w', pady=2)
-        self.pnl_var = ctk.StringVar(value=str(self.entry.pnl))
-        ctk.CTkEntry(details_frame, textvariable=self.pnl_var, font=('Inter', 11)).pack(fill='x', pady=2)
+        self.size_var = self._add_field(details_frame, 2, 0, "Size (lots):")
+        self.fees_var = self._add_field(details_frame, 2, 1, "Fees ($):")
+        self.entry_time_var = self._add_field(details_frame, 4, 0, "Entry Time (HH:MM):")
+        self.exit_time_var = self._add_field(details_frame, 4, 1, "Exit Time (HH:MM):")
+        self.entry_price_var = self._add_field(details_frame, 6, 0, "Entry Price:")
+        self.exit_price_var = self._add_field(details_frame, 6, 1, "Exit Price:")
+        self.stop_loss_var = self._add_field(details_frame, 8, 0, "Stop Loss:")
+        self.take_profit_var = self._add_field(details_frame, 8, 1, "Take Profit:")
+        self.pnl_var = self._add_field(details_frame, 10, 0, "Net PnL ($):")
         
         # Risk/Reward (calculated)
-        self.rr_label = ctk.CTkLabel(details_frame, text=f"R/R: {self.entry.risk_reward:.2f}", 
+        self.rr_label = ctk.CTkLabel(details_frame, text="R/R: 0.00", 
                                     font=('Inter', 12), text_color='#00FF00')
-        self.rr_label.pack(anchor='w', pady=5)
+        self.rr_label.grid(row=11, column=1, sticky='w', padx=5)
+        
+        ctk.CTkLabel(details_frame, text="Notes:", font=('Inter', 12)).grid(row=12, column=0, sticky='w', padx=5)
+        self.notes_entry = ctk.CTkTextbox(details_frame, height=70)
+        self.notes_entry.grid(row=13, column=0, columnspan=2, sticky='ew', padx=5, pady=2)
         
         # Image attachment
         image_frame = ctk.CTkFrame(self.dialog)
-        image_frame.pack(fill='x', padx=20, pady=10)
+        image_frame.pack(fill='x', padx=20, pady=(0, 10))
         
         ctk.CTkButton(image_frame, text="📷 Attach Chart Image", 
                      command=self._attach_image, font=('Inter', 11)).pack(pady=5)
         
-        # Save/Cancel buttons
+        # Image and status labels are separate: CTkLabel can't clear an image once set
+        self.preview_label = ctk.CTkLabel(image_frame, text="")
+        self.preview_status = ctk.CTkLabel(image_frame, text="No chart attached",
+                                          font=('Inter', 11), text_color='#888888')
+        self.preview_status.pack(pady=(0, 5))
+        self.preview_image = None
+        
+        # Save/Delete/Cancel buttons
         btn_frame = ctk.CTkFrame(self.dialog, fg_color="transparent")
-        btn_frame.pack(pady=20)
+        btn_frame.pack(pady=(0, 15))
         
         ctk.CTkButton(btn_frame, text="Save", command=self._save_entry,
                      fg_color="#00AA00", width=80, font=('Inter', 11)).pack(side='left', padx=5)
         
+        self.delete_btn = ctk.CTkButton(btn_frame, text="Delete", command=self._delete_entry,
+                                       fg_color="#AA0000", width=80, font=('Inter', 11))
+        self.delete_btn.pack(side='left', padx=5)
+        
         ctk.CTkButton(btn_frame, text="Cancel", command=self.dialog.destroy,
                      fg_color="#666666", width=80, font=('Inter', 11)).pack(side='left', padx=5)
     
+    def _add_field(self, parent, row: int, column: int, label: str) -> ctk.StringVar:
+        """Add a labelled entry to the details grid and return its variable"""
+        ctk.CTkLabel(parent, text=label, font=('Inter', 12)).grid(row=row, column=column, sticky='w', padx=5)
+        var = ctk.StringVar()
+        ctk.CTkEntry(parent, textvariable=var, font=('Inter', 11)).grid(row=row + 1, column=column,
+                                                                       sticky='ew', padx=5, pady=2)
+        return var
+    
+    def _populate_trade_list(self):
+        """Show one selectable row per trade logged on the day"""
+        for widget in self.trade_list.winfo_children():
+            widget.destroy()
+        
+        total = sum(trade.pnl for trade in self.trades)
+        self.day_total_label.configure(
+            text=f"{len(self.trades)} trade(s) · ${total:,.2f}",
+            text_color='#00FF00' if total > 0 else '#FF4444' if total < 0 else '#888888'
+        )
+        if not self.trades:
+            ctk.CTkLabel(self.trade_list, text="No trades logged for this day",
+                        font=('Inter', 11), text_color='#888888').pack(pady=5)
+            return
+        
+        for trade in self.trades:
+            time_text = trade.entry_time.strftime("%H:%M") if trade.entry_time else "--:--"
+            text = f"{time_text}  {trade.instrument or '-'}  {trade.direction or ''}  {trade.size:g}  ${trade.pnl:,.2f}"
+            ctk.CTkButton(self.trade_list, text=text, anchor='w', font=('Courier', 11),
+                         fg_color="#222222", hover_color="#333333",
+                         command=lambda t=trade: self._load_trade(t)).pack(fill='x', pady=1)
+    
+    def _load_trade(self, trade: TradeEntry):
+        """Fill the form with a trade for editing"""
+        self.entry = trade
+        self.image_path = ""
+        self.instrument_var.set(trade.instrument)
+        self.direction_combo.set(trade.direction or "Long")
+        self.size_var.set(f"{trade.size:g}")
+        self.fees_var.set(f"{trade.fees:g}")
+        self.entry_time_var.set(trade.entry_time.strftime("%H:%M") if trade.entry_time else "")
+        self.exit_time_var.set(trade.exit_time.strftime("%H:%M") if trade.exit_time else "")
+        self.entry_price_var.set(str(trade.entry_price))
+        self.exit_price_var.set(str(trade.exit_price))
+        self.stop_loss_var.set(str(trade.stop_loss))
+        self.take_profit_var.set(str(trade.take_profit))
+        self.pnl_var.set(str(trade.pnl))
+        self.rr_label.configure(text=f"R/R: {trade.risk_reward:.2f}")
+        self.notes_entry.delete("1.0", "end")
+        self.notes_entry.insert("1.0", trade.notes)
+        self.delete_btn.configure(state='normal' if trade.id is not None else 'disabled')
+        self._show_preview(thumbnail_cache.get(trade.chart_image, THUMB_LARGE) if trade.chart_image else None,
+                           "Chart still processing..." if trade.chart_image else "No chart attached")
+    
+    def _show_preview(self, image: Optional[ctk.CTkImage], text: str = ""):
+        """Show a chart preview, or a placeholder text without one"""
+        # Keep a reference so Tk doesn't drop the image while it's displayed
+        self.preview_image = image
+        if image is None:
+            self.preview_label.pack_forget()
+            self.preview_status.configure(text=text)
+            self.preview_status.pack(pady=(0, 5))
+        else:
+            self.preview_status.pack_forget()
+            self.preview_label.configure(image=image)
+            self.preview_label.pack(pady=(0, 5))
+    
+    def _new_trade(self):
+        """Clear the form for a new trade on the same day"""
+        self._load_trade(TradeEntry(date=self.date, pnl=0.0))
+    
     def _attach_image(self):
         """Attach chart image"""
         file_path = filedialog.askopenfilename(
@@ -351,6 +880,21 @@ class EnhancedTradeDialog:
         )
         if file_path:
             self.image_path = file_path
+            self._show_preview(None, "Loading preview...")
+            # Decode a reduced preview off the UI thread; never the full-size image
+            future = get_image_pipeline().preview(file_path, THUMB_LARGE)
+            future.add_done_callback(lambda f: self.dialog.after(0, lambda: self._preview_loaded(file_path, f)))
+    
+    def _preview_loaded(self, file_path: str, future):
+        """Display a decoded preview if it is still the selected attachment"""
+        if file_path != self.image_path or not self.dialog.winfo_exists():
+            return
+        try:
+            pil_image = future.result()
+        except Exception as e:
+            self._show_preview(None, f"Cannot read image: {e}")
+            return
+        self._show_preview(ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=pil_image.size))
     
     def _calculate_rr(self) -> float:
         """Calculate risk/reward ratio"""
@@ -367,6 +911,13 @@ class EnhancedTradeDialog:
             pass
         return 0.0
     
+    def _parse_time(self, value: str) -> Optional[datetime.datetime]:
+        """Combine an HH:MM field with the dialog date"""
+        value = value.strip()
+        if not value:
+            return None
+        return datetime.datetime.combine(self.date, datetime.datetime.strptime(value, "%H:%M").time())
+    
     def _save_entry(self):
         """Save enhanced trade entry"""
         try:
@@ -375,25 +926,229 @@ class EnhancedTradeDialog:
             
             # Create entry
             entry = TradeEntry(
+                id=self.entry.id,
                 date=self.date,
+                instrument=self.instrument_var.get().strip().upper(),
+                direction=self.direction_combo.get(),
+                size=float(self.size_var.get() or "0"),
+                entry_time=self._parse_time(self.entry_time_var.get()),
+                exit_time=self._parse_time(self.exit_time_var.get()),
                 pnl=float(self.pnl_var.get() or "0"),
                 entry_price=float(self.entry_price_var.get() or "0"),
+                exit_price=float(self.exit_price_var.get() or "0"),
                 stop_loss=float(self.stop_loss_var.get() or "0"),
                 take_profit=float(self.take_profit_var.get() or "0"),
+                fees=float(self.fees_var.get() or "0"),
                 risk_reward=rr,
-                chart_image=self.repository.save_chart_image(self.date, self.image_path) if self.image_path else ""
+                notes=self.notes_entry.get("1.0", "end-1c"),
+                chart_image=self.entry.chart_image
             )
-            
-            # Save to repository
-            self.repository.save_trade_entry(entry)
-            
-            # Update equity curve
-            self.account_service.repository.update_equity(self.date, entry.pnl)
-            
-            self.dialog.destroy()
-            
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save entry: {e}")
+            return
+        
+        # Committed by the writer thread; the calendar shows the change meanwhile
+        self.repository.save_trade_async(
+            entry, previous=self.entry if self.entry.id is not None else None,
+            image_path=self.image_path,
+            on_image_ready=self._image_ready_callback() if self.image_path else None,
+            on_error=self._failure_callback("Failed to save entry"))
+        self._after_change()
+    
+    def _image_ready_callback(self):
+        """Callback for the image pipeline that refreshes the calendar on the Tk thread"""
+        # The dialog is usually closed by then, so schedule on its master
+        master = self.dialog.master
+        refresh = self.refresh_callback
+        
+        def on_ready(info: ImageInfo):
+            def apply():
+                thumbnail_cache.invalidate(info.path)
+                if refresh:
+                    try:
+                        refresh()
+                    except tk.TclError:
+                        pass  # Journal window was closed meanwhile
+            master.after(0, apply)
+        return on_ready
+    
+    def _delete_entry(self):
+        """Delete the selected trade"""
+        if self.entry.id is None:
+            return
+        if not messagebox.askyesno("Delete Trade", "Delete this trade?", parent=self.dialog):
+            return
+        self.repository.delete_trade_async(self.entry, on_error=self._failure_callback("Failed to delete entry"))
+        self._after_change()
+    
+    def _failure_callback(self, message: str):
+        """Callback for a failed queued write that reports it and refreshes on the Tk thread"""
+        master = self.dialog.master
+        refresh = self.refresh_callback
+        
+        def on_error(error: Exception):
+            def report():
+                messagebox.showerror("Error", f"{message}: {error}")
+                if refresh:
+                    try:
+                        refresh()  # Drops the optimistic values
+                    except tk.TclError:
+                        pass
+            master.after(0, report)
+        return on_error
+    
+    def _after_change(self):
+        """Close right after queueing a save or delete"""
+        self.dialog.destroy()
+        if self.refresh_callback:
+            self.refresh_callback()
+
+class SearchDialog:
+    """Full-text search over journal notes with ranked, snippeted results"""
+    
+    DEBOUNCE_MS = 150
+    
+    def __init__(self, search, on_select):
+        self.search = search  # Callable[[str], List[SearchHit]]
+        self.on_select = on_select
+        self._pending = None
+        self._create_dialog()
+    
+    def _create_dialog(self):
+        """Create search dialog"""
+        self.dialog = ctk.CTkToplevel()
+        self.dialog.title("Search Journal")
+        self.dialog.geometry("560x520+320+120")
+        self.dialog.configure(fg_color="#111111")
+        self.dialog.attributes('-topmost', True)
+        
+        self.query_var = ctk.StringVar()
+        query_entry = ctk.CTkEntry(self.dialog, textvariable=self.query_var, font=('Inter', 14),
+                                   placeholder_text='e.g. NFP fade, "revenge trade"')
+        query_entry.pack(fill='x', padx=20, pady=(20, 5))
+        query_entry.bind("<KeyRelease>", lambda e: self._schedule_search())
+        query_entry.focus_set()
+        
+        self.status_label = ctk.CTkLabel(self.dialog, text="", font=('Inter', 11), text_color='#888888')
+        self.status_label.pack(anchor='w', padx=20)
+        
+        self.results_frame = ctk.CTkScrollableFrame(self.dialog)
+        self.results_frame.pack(fill='both', expand=True, padx=20, pady=(5, 20))
+    
+    def _schedule_search(self):
+        """Search once typing pauses instead of on every keystroke"""
+        if self._pending:
+            self.dialog.after_cancel(self._pending)
+        self._pending = self.dialog.after(self.DEBOUNCE_MS, self._run_search)
+    
+    def _run_search(self):
+        """Run the query and list the hits"""
+        self._pending = None
+        for widget in self.results_frame.winfo_children():
+            widget.destroy()
+        
+        text = self.query_var.get().strip()
+        if not text:
+            self.status_label.configure(text="")
+            return
+        try:
+            started = time.perf_counter()
+            hits = self.search(text)
+            elapsed = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            self.status_label.configure(text=f"Invalid search: {e}")
+            return
+        
+        self.status_label.configure(text=f"{len(hits)} result(s) in {elapsed:.0f} ms")
+        for hit in hits:
+            color = '#00FF00' if hit.pnl > 0 else '#FF4444' if hit.pnl < 0 else '#888888'
+            row = ctk.CTkFrame(self.results_frame, fg_color="#222222")
+            row.pack(fill='x', pady=2)
+            header = ctk.CTkLabel(row, text=f"{hit.date.strftime('%a %d %b %Y')}  ·  {hit.title}  ·  ${hit.pnl:,.2f}",
+                                  font=('Inter', 12, 'bold'), text_color=color, anchor='w')
+            header.pack(fill='x', padx=8, pady=(4, 0))
+            snippet = ctk.CTkLabel(row, text=hit.snippet, font=('Inter', 11), text_color='#cccccc',
+                                   anchor='w', justify='left', wraplength=480)
+            snippet.pack(fill='x', padx=8, pady=(0, 4))
+            for widget in (row, header, snippet):
+                widget.bind("<Button-1>", lambda e, d=hit.date: self.on_select(d))
+
+class StatsDialog:
+    """Performance statistics for the displayed month, its year or all history"""
+    
+    PERIODS = ("Month", "Year", "All Time")
+    
+    def __init__(self, analytics: PerformanceAnalytics, month: datetime.date):
+        self.analytics = analytics
+        self.month = month
+        self._create_dialog()
+        self._show_period("Month")
+    
+    def _create_dialog(self):
+        """Create statistics dialog"""
+        self.dialog = ctk.CTkToplevel()
+        self.dialog.title("Performance Statistics")
+        self.dialog.geometry("420x520+360+140")
+        self.dialog.configure(fg_color="#111111")
+        self.dialog.attributes('-topmost', True)
+        
+        period_selector = ctk.CTkSegmentedButton(self.dialog, values=list(self.PERIODS),
+                                                 command=self._show_period)
+        period_selector.set("Month")
+        period_selector.pack(pady=(20, 10))
+        
+        self.range_label = ctk.CTkLabel(self.dialog, text="", font=('Inter', 12), text_color='#888888')
+        self.range_label.pack()
+        
+        self.stats_frame = ctk.CTkFrame(self.dialog, fg_color="#222222")
+        self.stats_frame.pack(fill='both', expand=True, padx=20, pady=(10, 20))
+        self.stats_frame.grid_columnconfigure(1, weight=1)
+    
+    def _period_range(self, period: str) -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
+        """Date range covered by a period choice"""
+        if period == "Month":
+            first, last = month_range(self.month.year, self.month.month)
+            return day_to_date(first), day_to_date(last)
+        if period == "Year":
+            return datetime.date(self.month.year, 1, 1), datetime.date(self.month.year, 12, 31)
+        return None, None
+    
+    def _show_period(self, period: str):
+        """Compute and display statistics for a period"""
+        start, end = self._period_range(period)
+        started = time.perf_counter()
+        stats = self.analytics.get_stats(start, end)
+        elapsed = (time.perf_counter() - started) * 1000
+        span = f"{start:%d %b %Y} - {end:%d %b %Y}" if start else "All history"
+        self.range_label.configure(text=f"{span} · computed in {elapsed:.0f} ms")
+        
+        for widget in self.stats_frame.winfo_children():
+            widget.destroy()
+        for row, (name, value) in enumerate(self._format_stats(stats)):
+            ctk.CTkLabel(self.stats_frame, text=name, font=('Inter', 12),
+                        text_color='#aaaaaa', anchor='w').grid(row=row, column=0, sticky='w', padx=10, pady=2)
+            ctk.CTkLabel(self.stats_frame, text=value, font=('Inter', 12, 'bold'),
+                        text_color='#ffffff', anchor='e').grid(row=row, column=1, sticky='e', padx=10, pady=2)
+    
+    @staticmethod
+    def _format_stats(stats: PerformanceStats) -> List[Tuple[str, str]]:
+        """Label and display text for each statistic"""
+        streak = (f"{stats.current_streak}W" if stats.current_streak > 0
+                  else f"{-stats.current_streak}L" if stats.current_streak < 0 else "-")
+        return [
+            ("Trades", f"{stats.trade_count} ({stats.wins}W / {stats.losses}L)"),
+            ("Net P&L", f"${stats.net_pnl:,.2f}"),
+            ("Win rate", f"{stats.win_rate:.1%}"),
+            ("Average win / loss", f"${stats.avg_win:,.2f} / ${stats.avg_loss:,.2f}"),
+            ("Expectancy", f"${stats.expectancy:,.2f} per trade"),
+            ("Profit factor", f"{stats.profit_factor:.2f}"),
+            ("Average R", f"{stats.avg_r:.2f}R"),
+            ("Max drawdown", f"${stats.max_drawdown:,.2f} ({stats.max_drawdown_pct:.1%})"),
+            ("Longest drawdown", f"{stats.max_drawdown_days} days"),
+            ("Sharpe / Sortino", f"{stats.sharpe:.2f} / {stats.sortino:.2f}"),
+            ("Longest win / loss streak", f"{stats.longest_win_streak} / {stats.longest_loss_streak}"),
+            ("Current streak", streak),
+        ]
 
 class AccountSetupDialog:
     """Account setup dialog"""
@@ -407,7 +1162,7 @@ class AccountSetupDialog:
         """Create account setup dialog"""
         self.dialog = ctk.CTkToplevel()
         self.dialog.title("Account Setup")
-        self.dialog.geometry("400x200+400+300")
+        self.dialog.geometry("400x240+400+300")
         self.dialog.configure(fg_color="#111111")
         self.dialog.attributes('-topmost', True)
         self.dialog.grab_set()
@@ -420,8 +1175,13 @@ class AccountSetupDialog:
                                    font=('Inter', 14), width=200)
         balance_entry.pack(pady=10)
         
+        # History is kept by default; clearing restarts the equity curve from the new balance
+        self.clear_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(self.dialog, text="Clear equity history", variable=self.clear_var,
+                       font=('Inter', 12)).pack(pady=5)
+        
         btn_frame = ctk.CTkFrame(self.dialog, fg_color="transparent")
-        btn_frame.pack(pady=20)
+        btn_frame.pack(pady=15)
         
         ctk.CTkButton(btn_frame, text="Set Balance", command=self._save_balance,
                      fg_color="#00AA00", font=('Inter', 12)).pack(side='left', padx=5)
@@ -433,9 +1193,65 @@ class AccountSetupDialog:
         """Save starting balance"""
         try:
             balance = float(self.balance_var.get())
-            self.account_service.setup_account(balance)
+            self.account_service.setup_account(balance, clear_history=self.clear_var.get())
             self.dialog.destroy()
             if self.callback:
                 self.callback()
         except ValueError:
-            messagebox.showerror("Error", "Please enter a valid number")
\ No newline at end of file
+            messagebox.showerror("Error", "Please enter a valid number")
+
+class NewAccountDialog:
+    """Dialog adding another account (challenge or funded) and switching to it"""
+    
+    def __init__(self, account_service: AccountService, callback=None):
+        self.account_service = account_service
+        self.callback = callback
+        self._create_dialog()
+    
+    def _create_dialog(self):
+        """Create new account dialog"""
+        self.dialog = ctk.CTkToplevel()
+        self.dialog.title("New Account")
+        self.dialog.geometry("400x260+400+300")
+        self.dialog.configure(fg_color="#111111")
+        self.dialog.attributes('-topmost', True)
+        self.dialog.grab_set()
+        
+        ctk.CTkLabel(self.dialog, text="Add Account", 
+                    font=('Inter', 16, 'bold')).pack(pady=20)
+        
+        self.name_var = ctk.StringVar(value=f"Account {len(self.account_service.list_accounts()) + 1}")
+        ctk.CTkEntry(self.dialog, textvariable=self.name_var, 
+                    font=('Inter', 14), width=200).pack(pady=5)
+        
+        self.balance_var = ctk.StringVar(value="10000")
+        ctk.CTkEntry(self.dialog, textvariable=self.balance_var, 
+                    font=('Inter', 14), width=200).pack(pady=5)
+        
+        btn_frame = ctk.CTkFrame(self.dialog, fg_color="transparent")
+        btn_frame.pack(pady=20)
+        
+        ctk.CTkButton(btn_frame, text="Add Account", command=self._save_account,
+                     fg_color="#00AA00", font=('Inter', 12)).pack(side='left', padx=5)
+        
+        ctk.CTkButton(btn_frame, text="Cancel", command=self.dialog.destroy,
+                     fg_color="#666666", font=('Inter', 12)).pack(side='left', padx=5)
+    
+    def _save_account(self):
+        """Create the account and make it active"""
+        name = self.name_var.get().strip()
+        if not name:
+            messagebox.showerror("Error", "Please enter an account name")
+            return
+        try:
+            balance = float(self.balance_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid number")
+            return
+        if any(account.name == name for account in self.account_service.list_accounts()):
+            messagebox.showerror("Error", f"An account named '{name}' already exists")
+            return
+        self.account_service.create_account(name, balance)
+        self.dialog.destroy()
+        if self.callback:
+            self.callback()
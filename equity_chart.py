@@ -0,0 +1,355 @@
+"""
+Equity Chart Module for PropFire
+Equity curve drawn as one polyline on a single Tk canvas. Points are
+downsampled to the plot's pixel width (min-max preselection, then LTTB),
+so zooming and panning cost the same on a month or a decade of history.
+"""
+
+import customtkinter as ctk
+import datetime
+import time
+import tkinter as tk
+from typing import List, Optional, Tuple
+import numpy as np
+from analytics import PerformanceAnalytics
+from database import date_to_day, day_to_date
+from event_bus import get_event_bus, EquityUpdated
+
+MARGIN_LEFT = 80  # Room for the equity axis labels
+MARGIN_RIGHT = 12
+MARGIN_TOP = 12
+MARGIN_BOTTOM = 26
+GRID_LINES = 5
+MIN_SPAN = 1 / 96  # Narrowest zoom: 15 minutes, in days
+ZOOM_STEP = 1.25
+EDGE_PADDING = 0.03  # Share of the span left free after the last point for live appends
+MAX_APPENDED_SEGMENTS = 500  # Incremental segments drawn before a full redraw
+
+def minmax_indices(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Indices of the lowest and highest point of each of about `buckets` equal slices"""
+    n = len(y)
+    size = -(-n // buckets)
+    full = n - n % size
+    offsets = np.arange(0, full, size)
+    blocks = y[:full].reshape(-1, size)
+    picks = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1), [0, n - 1]]
+    if full < n:
+        tail = y[full:]
+        picks.append([full + int(tail.argmin()), full + int(tail.argmax())])
+    return np.unique(np.concatenate(picks))
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the curve's shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # First and last points are kept; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Mean of every bucket at once; the last "bucket" is the final point
+    bounds = np.append(edges, n)
+    counts = np.diff(bounds)
+    mean_x = np.add.reduceat(x, bounds[:-1]) / counts
+    mean_y = np.add.reduceat(y, bounds[:-1]) / counts
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    anchor = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area between the last pick, each candidate and the next bucket's mean
+        area = np.abs((x[anchor] - mean_x[i + 1]) * (y[lo:hi] - y[anchor])
+                      - (x[anchor] - x[lo:hi]) * (mean_y[i + 1] - y[anchor]))
+        anchor = lo + int(area.argmax())
+        picked[i + 1] = anchor
+    return picked
+
+def downsample(x: np.ndarray, y: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce a curve to about one point per pixel of width"""
+    if len(x) <= width:
+        return x, y
+    if len(x) > 4 * width:
+        # Min-max first keeps spikes and bounds LTTB's per-bucket work
+        keep = minmax_indices(y, 2 * width)
+        x, y = x[keep], y[keep]
+    # The extremes always stay so the vertical scale is exact
+    keep = np.union1d(lttb_indices(x, y, width), [int(y.argmin()), int(y.argmax())])
+    return x[keep], y[keep]
+
+class EquityChart:
+    """Zoomable, pannable equity curve on one canvas; appended points are drawn in place"""
+
+    def __init__(self, parent, baseline: Optional[float] = None):
+        self.canvas = tk.Canvas(parent, bg="#111111", highlightthickness=0)
+        self.baseline = baseline  # Drawn dashed, e.g. the starting balance
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._count = 0
+        self.view: Optional[Tuple[float, float]] = None  # None follows the whole curve
+        self._scale = None  # (x0, x1, y0, y1) of the last full draw
+        self._last_vertex: Optional[Tuple[float, float]] = None
+        self._appended = 0
+        self._redraw_job = None
+        self._drag_x: Optional[int] = None
+        self.last_render_ms = 0.0
+
+        self.canvas.bind("<Configure>", lambda e: self.schedule_redraw())
+        self.canvas.bind("<MouseWheel>", lambda e: self._zoom(e.x, e.delta > 0))
+        self.canvas.bind("<Button-4>", lambda e: self._zoom(e.x, True))
+        self.canvas.bind("<Button-5>", lambda e: self._zoom(e.x, False))
+        self.canvas.bind("<ButtonPress-1>", self._start_drag)
+        self.canvas.bind("<B1-Motion>", self._drag)
+        self.canvas.bind("<Double-Button-1>", lambda e: self.reset_view())
+
+    def pack(self, **kwargs):
+        """Pack the canvas into its parent"""
+        self.canvas.pack(**kwargs)
+
+    @property
+    def x(self) -> np.ndarray:
+        """Day numbers (fractional for intraday points) of every point"""
+        return self._x[:self._count]
+
+    @property
+    def y(self) -> np.ndarray:
+        """Equity of every point"""
+        return self._y[:self._count]
+
+    def set_data(self, x: np.ndarray, y: np.ndarray):
+        """Replace the whole curve"""
+        self._x = np.asarray(x, dtype=np.float64).copy()
+        self._y = np.asarray(y, dtype=np.float64).copy()
+        self._count = len(self._x)
+        self.schedule_redraw()
+
+    def append(self, x: float, y: float):
+        """Add a point after the last one, drawing just its segment when it fits the current scale"""
+        if self._count == len(self._x):
+            # Grow by doubling so live appends stay amortized O(1)
+            capacity = max(1024, 2 * len(self._x))
+            self._x = np.resize(self._x, capacity)
+            self._y = np.resize(self._y, capacity)
+        self._x[self._count], self._y[self._count] = x, y
+        self._count += 1
+
+        fits = (self._scale is not None and self._last_vertex is not None and self._redraw_job is None
+                and self._scale[0] <= x <= self._scale[1] and self._scale[2] <= y <= self._scale[3]
+                and self._appended < MAX_APPENDED_SEGMENTS)
+        if not fits:
+            self.schedule_redraw()
+            return
+        vertex = self._to_pixels(x, y)
+        self.canvas.create_line(*self._last_vertex, *vertex, fill='#00FF00', width=2, tags="curve")
+        self._last_vertex = vertex
+        self._appended += 1
+
+    def reset_view(self):
+        """Zoom back out to the whole curve"""
+        self.view = None
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        """Redraw once the event loop is idle; repeated requests collapse into one"""
+        if self._redraw_job is None:
+            self._redraw_job = self.canvas.after_idle(self._redraw)
+
+    def _plot_size(self) -> Tuple[int, int]:
+        """Width and height of the plotting area in pixels"""
+        return (max(1, self.canvas.winfo_width() - MARGIN_LEFT - MARGIN_RIGHT),
+                max(1, self.canvas.winfo_height() - MARGIN_TOP - MARGIN_BOTTOM))
+
+    def _x_range(self) -> Tuple[float, float]:
+        """Visible day range"""
+        if self.view is not None:
+            return self.view
+        first, last = float(self.x[0]), float(self.x[-1])
+        span = max(last - first, 1.0)
+        return first, last + span * EDGE_PADDING
+
+    def _to_pixels(self, x: float, y: float) -> Tuple[float, float]:
+        """Canvas coordinates of a point under the last full draw's scale"""
+        x0, x1, y0, y1 = self._scale
+        width, height = self._plot_size()
+        return (MARGIN_LEFT + (x - x0) / (x1 - x0) * width,
+                MARGIN_TOP + (y1 - y) / (y1 - y0) * height)
+
+    def _redraw(self):
+        """Downsample the visible range to the pixel width and draw it as one polyline"""
+        self._redraw_job = None
+        started = time.perf_counter()
+        self.canvas.delete("all")
+        self._scale = None
+        self._last_vertex = None
+        self._appended = 0
+        if not self._count:
+            self.canvas.create_text(self.canvas.winfo_width() // 2, self.canvas.winfo_height() // 2,
+                                    text="No equity data yet", fill='#666666', font=('Inter', 12))
+            return
+
+        x0, x1 = self._x_range()
+        # One point either side of the range so the line runs off the edges
+        lo = max(0, int(np.searchsorted(self.x, x0, 'left')) - 1)
+        hi = min(self._count, int(np.searchsorted(self.x, x1, 'right')) + 1)
+        width, height = self._plot_size()
+        xs, ys = downsample(self.x[lo:hi], self.y[lo:hi], width)
+
+        y0, y1 = float(ys.min()), float(ys.max())
+        if self.baseline is not None:
+            y0, y1 = min(y0, self.baseline), max(y1, self.baseline)
+        pad = max((y1 - y0) * 0.05, 1.0)
+        y0, y1 = y0 - pad, y1 + pad
+        self._scale = (x0, x1, y0, y1)
+
+        self._draw_grid(width, height)
+        if self.baseline is not None:
+            _, base_y = self._to_pixels(x0, self.baseline)
+            self.canvas.create_line(MARGIN_LEFT, base_y, MARGIN_LEFT + width, base_y,
+                                    fill='#666666', dash=(4, 4))
+
+        px = MARGIN_LEFT + (xs - x0) / (x1 - x0) * width
+        py = MARGIN_TOP + (y1 - ys) / (y1 - y0) * height
+        if len(px) > 1:
+            coords = np.column_stack((px, py)).ravel().tolist()
+            self.canvas.create_line(*coords, fill='#00FF00', width=2, tags="curve")
+        self._draw_labels(x0, x1, y0, y1, width, height)
+        if hi == self._count:
+            self._last_vertex = (float(px[-1]), float(py[-1]))
+        self.last_render_ms = (time.perf_counter() - started) * 1000
+
+    def _draw_grid(self, width: int, height: int):
+        """Horizontal grid lines behind the curve"""
+        for i in range(GRID_LINES + 1):
+            y = MARGIN_TOP + height * i / GRID_LINES
+            self.canvas.create_line(MARGIN_LEFT, y, MARGIN_LEFT + width, y, fill='#222222')
+
+    def _draw_labels(self, x0: float, x1: float, y0: float, y1: float, width: int, height: int):
+        """Equity and date labels over margins that hide the curve running past the plot"""
+        total_width = self.canvas.winfo_width()
+        self.canvas.create_rectangle(0, 0, MARGIN_LEFT, self.canvas.winfo_height(), fill='#111111', width=0)
+        self.canvas.create_rectangle(MARGIN_LEFT + width, 0, total_width, self.canvas.winfo_height(),
+                                     fill='#111111', width=0)
+        for i in range(GRID_LINES + 1):
+            y = MARGIN_TOP + height * i / GRID_LINES
+            value = y1 - (y1 - y0) * i / GRID_LINES
+            self.canvas.create_text(MARGIN_LEFT - 6, y, text=f"${value:,.0f}", anchor='e',
+                                    fill='#888888', font=('Inter', 10))
+        span = x1 - x0
+        for i in range(GRID_LINES + 1):
+            x = MARGIN_LEFT + width * i / GRID_LINES
+            day = x0 + span * i / GRID_LINES
+            self.canvas.create_text(x, MARGIN_TOP + height + 6, text=self._format_day(day, span),
+                                    anchor='n', fill='#888888', font=('Inter', 10))
+
+    @staticmethod
+    def _format_day(day: float, span: float) -> str:
+        """Axis label for a day number, with the time of day when zoomed into intraday"""
+        date = day_to_date(int(day))
+        if span < 3:
+            moment = datetime.datetime.combine(date, datetime.time()) + datetime.timedelta(days=day % 1)
+            return moment.strftime("%d %b %H:%M")
+        return date.strftime("%d %b %Y" if span > 60 else "%d %b")
+
+    def _zoom(self, pixel_x: int, zoom_in: bool):
+        """Zoom around the day under the cursor"""
+        if not self._count:
+            return
+        if self.view is None and not zoom_in:
+            return  # Already showing everything
+        x0, x1 = self._x_range()
+        width, _ = self._plot_size()
+        anchor = x0 + (pixel_x - MARGIN_LEFT) / width * (x1 - x0)
+        factor = 1 / ZOOM_STEP if zoom_in else ZOOM_STEP
+        span = max(MIN_SPAN, (x1 - x0) * factor)
+        x0 = anchor - (anchor - x0) * span / (x1 - x0)
+        self._set_view(x0, x0 + span)
+
+    def _start_drag(self, event):
+        """Remember where a pan started"""
+        self._drag_x = event.x
+
+    def _drag(self, event):
+        """Pan by the distance dragged"""
+        if self._drag_x is None or not self._count:
+            return
+        x0, x1 = self._x_range()
+        width, _ = self._plot_size()
+        shift = (self._drag_x - event.x) / width * (x1 - x0)
+        self._drag_x = event.x
+        self._set_view(x0 + shift, x1 + shift)
+
+    def _set_view(self, x0: float, x1: float):
+        """Show a day range, kept within the curve; the whole curve resumes following it"""
+        first, last = float(self.x[0]), float(self.x[-1])
+        full_span = max(last - first, 1.0) * (1 + EDGE_PADDING)
+        span = x1 - x0
+        if span >= full_span:
+            self.view = None
+        else:
+            x0 = min(max(x0, first), first + full_span - span)
+            self.view = (x0, x0 + span)
+        self.schedule_redraw()
+
+class EquityChartWindow:
+    """Window charting the equity curve, picking up new points as they are saved"""
+
+    def __init__(self, analytics: Optional[PerformanceAnalytics] = None):
+        self.analytics = analytics or PerformanceAnalytics()
+        self._shown: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._create_window()
+        self.refresh()
+        self._unsubscribe = get_event_bus().subscribe(EquityUpdated, self._on_equity_updated)
+
+    def _create_window(self):
+        """Create chart window"""
+        self.window = ctk.CTkToplevel()
+        self.window.title("Equity Curve")
+        self.window.geometry("900x520+180+120")
+        self.window.configure(fg_color="#111111")
+
+        balance = self.analytics.account.effective_starting_balance()
+        self.chart = EquityChart(self.window, baseline=balance)
+        self.chart.pack(fill='both', expand=True, padx=10, pady=(10, 0))
+
+        self.status_label = ctk.CTkLabel(self.window, text="", font=('Inter', 11), text_color='#888888')
+        self.status_label.pack(pady=5)
+
+    def refresh(self):
+        """Load the curve; points added after the shown ones are appended instead of redrawn"""
+        if not self.window.winfo_exists():
+            return
+        equity = self.analytics.load_equity()
+        days, values = equity.days.astype(np.float64), equity.equity
+        shown = self._shown
+        if (shown is not None and len(days) > len(shown[0])
+                and np.array_equal(days[:len(shown[0])], shown[0])
+                and np.array_equal(values[:len(shown[1])], shown[1])):
+            for day, value in zip(days[len(shown[0]):], values[len(shown[1]):]):
+                self.chart.append(float(day), float(value))
+        elif (shown is None or not np.array_equal(days, shown[0])
+              or not np.array_equal(values, shown[1])):
+            self.chart.baseline = self.analytics.account.effective_starting_balance()
+            self.chart.set_data(days, values)
+        self._shown = (days, values)
+        self._show_status()
+
+    def _on_equity_updated(self, events: List[EquityUpdated]):
+        """Append a new last day straight from the event's summary; any other change reloads the curve"""
+        if not self.window.winfo_exists():
+            self._unsubscribe()
+            return
+        for event in events:
+            if event.account_id != self.analytics.account_id:
+                continue
+            summary, shown = event.summary, self._shown
+            last_day = date_to_day(summary.last_update) if summary.last_update else None
+            if (not event.rebased and shown is not None and last_day is not None and event.days == {last_day}
+                    and (not len(shown[0]) or last_day > shown[0][-1])):
+                self.chart.append(float(last_day), summary.current_equity)
+                self._shown = (np.append(shown[0], float(last_day)), np.append(shown[1], summary.current_equity))
+                self._show_status()
+            else:
+                self.refresh()
+
+    def _show_status(self):
+        """Point count and render time under the chart"""
+        self.status_label.configure(
+            text=f"{len(self._shown[0]):,} points · drawn in {self.chart.last_render_ms:.1f} ms · "
+                 f"scroll to zoom, drag to pan, double-click to reset")
@@ -0,0 +1,243 @@
+"""
+Equity Ledger Module for PropFire
+Daily P&L held in a Fenwick (binary indexed) tree over calendar days, so
+equity at any date and back-dated inserts, edits and deletions are O(log n).
+Running total, peak, last day and trading-day count are kept alongside for
+O(1) summaries, and listeners hear about every committed change.
+"""
+
+import threading
+import weakref
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from database import ConnectionManager
+
+MIN_CAPACITY = 1024  # Calendar days covered before the first resize
+
+class FenwickTree:
+    """Prefix sums over a fixed number of slots with O(log n) point updates"""
+
+    def __init__(self, values: List[float]):
+        # Linear-time construction: each slot pushes its total to its parent
+        self.size = len(values)
+        self.tree = [0.0] + list(values)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index: int, delta: float):
+        """Add delta to the slot at a 0-based index"""
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, index: int) -> float:
+        """Sum of slots 0..index inclusive (0.0 for a negative index)"""
+        total = 0.0
+        i = min(index, self.size - 1) + 1
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+class PeakTree:
+    """Highest prefix sum (never below zero) over a power-of-two number of slots"""
+
+    def __init__(self, values: List[float]):
+        # Each node holds (sum of its slots, best prefix sum within them)
+        self.size = len(values)
+        self.sums = [0.0] * (2 * self.size)
+        self.best = [0.0] * (2 * self.size)
+        for i, value in enumerate(values):
+            self.sums[self.size + i] = value
+            self.best[self.size + i] = max(0.0, value)
+        for node in range(self.size - 1, 0, -1):
+            self._combine(node)
+
+    def _combine(self, node: int):
+        """Recompute a node from its two children"""
+        left, right = 2 * node, 2 * node + 1
+        self.sums[node] = self.sums[left] + self.sums[right]
+        self.best[node] = max(self.best[left], self.sums[left] + self.best[right])
+
+    def set(self, index: int, value: float):
+        """Set a slot and update its ancestors"""
+        node = self.size + index
+        self.sums[node] = value
+        self.best[node] = max(0.0, value)
+        node //= 2
+        while node:
+            self._combine(node)
+            node //= 2
+
+    def peak(self) -> float:
+        """Highest prefix sum of all slots"""
+        return self.best[1] if self.size else 0.0
+
+class EquityLedger:
+    """Cumulative daily P&L for one account, loaded lazily and updated as writes commit"""
+
+    def __init__(self, db: ConnectionManager, account_id: int):
+        self.db = db
+        self.account_id = account_id
+        self._lock = threading.Lock()
+        self._pnl: Optional[Dict[int, float]] = None  # None until loaded
+        self._tree: Optional[FenwickTree] = None
+        self._peaks: Optional[PeakTree] = None
+        self._base_day = 0
+        self._total = 0.0
+        self._last_day: Optional[int] = None
+        self._trading_days = 0  # Days with non-zero P&L
+        self._listeners: List[Callable[[], None]] = []
+
+    def _load(self):
+        """Build the tree from the stored P&L (caller holds the lock)"""
+        # Read under the lock so a commit landing mid-load is applied after it
+        rows = self.db.fetchall("SELECT day, pnl FROM equity_curve WHERE account_id = ?", (self.account_id,))
+        self._pnl = {day: pnl for day, pnl in rows}
+        self._total = sum(self._pnl.values())
+        self._last_day = max(self._pnl, default=None)
+        self._trading_days = sum(1 for pnl in self._pnl.values() if pnl)
+        self._rebuild(min(self._pnl, default=0), max(self._pnl, default=0))
+
+    def _rebuild(self, first_day: int, last_day: int):
+        """Re-lay the tree so it spans at least first_day..last_day, with room to grow"""
+        capacity = MIN_CAPACITY
+        while capacity <= (last_day - first_day) * 2:
+            capacity *= 2
+        self._base_day = first_day
+        values = [0.0] * capacity
+        for day, pnl in self._pnl.items():
+            values[day - first_day] = pnl
+        self._tree = FenwickTree(values)
+        self._peaks = PeakTree(values)
+
+    def _ensure_loaded(self):
+        """Load on first use (caller holds the lock)"""
+        if self._pnl is None:
+            self._load()
+
+    def cumulative(self, day: int) -> float:
+        """Total P&L of every day up to and including a day"""
+        with self._lock:
+            if self._pnl is None and self.db.in_transaction():
+                return self._sum_until(day)
+            self._ensure_loaded()
+            return self._tree.prefix_sum(day - self._base_day) if day >= self._base_day else 0.0
+
+    def total(self) -> float:
+        """Total P&L of all days"""
+        with self._lock:
+            if self._pnl is None and self.db.in_transaction():
+                return self._sum_until(None)
+            self._ensure_loaded()
+            return self._total
+
+    def snapshot(self) -> Tuple[float, float, Optional[int]]:
+        """(total P&L, highest cumulative P&L, last day with an entry) in O(1)"""
+        with self._lock:
+            if self._pnl is None and self.db.in_transaction():
+                row = self.db.fetchone("""
+                    SELECT TOTAL(pnl), MAX(0, COALESCE(MAX(running), 0)), MAX(day) FROM (
+                        SELECT day, pnl, SUM(pnl) OVER (ORDER BY day) AS running FROM equity_curve
+                        WHERE account_id = ?
+                    )
+                """, (self.account_id,))
+                return row[0], row[1], row[2]
+            self._ensure_loaded()
+            return self._total, self._peaks.peak(), self._last_day
+
+    def day_pnl(self, day: int) -> float:
+        """P&L recorded for one day"""
+        with self._lock:
+            if self._pnl is None and self.db.in_transaction():
+                row = self.db.fetchone("SELECT pnl FROM equity_curve WHERE account_id = ? AND day = ?",
+                                       (self.account_id, day))
+                return row[0] if row else 0.0
+            self._ensure_loaded()
+            return self._pnl.get(day, 0.0)
+
+    def trading_days(self) -> int:
+        """Number of days with a non-zero P&L"""
+        with self._lock:
+            if self._pnl is None and self.db.in_transaction():
+                return self.db.fetchone("SELECT COUNT(*) FROM equity_curve WHERE account_id = ? AND pnl != 0",
+                                        (self.account_id,))[0]
+            self._ensure_loaded()
+            return self._trading_days
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Call back after every committed change, on the committing thread"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]):
+        """Stop calling a listener back"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def notify(self):
+        """Tell listeners that something they derive from the ledger changed, e.g. the starting balance"""
+        self._notify()
+
+    def _notify(self):
+        """Tell listeners the ledger changed (outside the lock, so they can read it)"""
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"DEBUG: Equity listener error: {e}")
+
+    def _sum_until(self, day: Optional[int]) -> float:
+        """Sum straight from SQL, for reads inside a transaction that may still roll back"""
+        row = self.db.fetchone("SELECT TOTAL(pnl) FROM equity_curve WHERE account_id = ? AND day <= ?",
+                               (self.account_id, day if day is not None else 1 << 62))
+        return row[0]
+
+    def apply(self, pnl_by_day: Iterable[Tuple[int, float]]):
+        """Set days' P&L, called once the write storing them has committed"""
+        with self._lock:
+            # Not loaded yet: the first read will see the committed rows
+            if self._pnl is not None:
+                self._apply(pnl_by_day)
+        self._notify()
+
+    def _apply(self, pnl_by_day: Iterable[Tuple[int, float]]):
+        """Update the loaded state (caller holds the lock)"""
+        for day, pnl in pnl_by_day:
+            self._total += pnl - self._pnl.get(day, 0.0)
+            self._trading_days += bool(pnl) - bool(self._pnl.get(day, 0.0))
+            if self._last_day is None or day > self._last_day:
+                self._last_day = day
+            offset = day - self._base_day
+            if offset < 0 or offset >= self._tree.size:
+                # Outside the laid-out span: re-lay it over the days actually held (amortized
+                # by doubling), not from the empty ledger's day 0 placeholder
+                self._pnl[day] = pnl
+                self._rebuild(min(self._pnl), max(self._pnl))
+                continue
+            delta = pnl - self._pnl.get(day, 0.0)
+            self._pnl[day] = pnl
+            if delta:
+                self._tree.add(offset, delta)
+                self._peaks.set(offset, pnl)
+
+    def reset(self):
+        """Forget the loaded state, e.g. after the curve was cleared"""
+        with self._lock:
+            self._pnl = None
+            self._tree = None
+            self._peaks = None
+        self._notify()
+
+_ledgers: "weakref.WeakKeyDictionary[ConnectionManager, Dict[int, EquityLedger]]" = weakref.WeakKeyDictionary()
+_ledgers_lock = threading.Lock()
+
+def get_equity_ledger(db: ConnectionManager, account_id: int) -> EquityLedger:
+    """Get the ledger shared by every repository on an account"""
+    with _ledgers_lock:
+        ledgers = _ledgers.setdefault(db, {})
+        ledger = ledgers.get(account_id)
+        if ledger is None:
+            ledger = ledgers[account_id] = EquityLedger(db, account_id)
+        return ledger
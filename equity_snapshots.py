@@ -0,0 +1,256 @@
+"""
+Equity Snapshots Module for PropFire
+Intraday (timestamp, balance, equity) snapshots, appended to one fixed-width
+binary file per account and read through a memory map, so months of
+second-resolution data stay out of SQLite. Per-block minima and maxima answer
+window extremes without scanning, and each finished day's low and high are
+rolled up into equity_curve. Usable headless, e.g. from an EA:
+
+    python equity_snapshots.py append 100000 99450.25
+"""
+
+import argparse
+import datetime
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from account_manager import AccountRepository
+from database import ConnectionManager, get_database, day_to_date
+from migrations import migrate, STORE_MIGRATIONS, STORE_PATH
+
+SNAPSHOTS_DIR = "equity_snapshots"
+MAGIC = b"PFEQSNP1"
+HEADER_SIZE = 16  # Magic plus padding, so records stay 8-byte aligned
+RECORD = np.dtype([("ts", "<f8"), ("balance", "<f8"), ("equity", "<f8")])
+BLOCK_SIZE = 4096  # Records summarized by one min/max pair
+
+def day_bounds(date: datetime.date) -> Tuple[float, float]:
+    """POSIX timestamps of a local day's start and the next day's start"""
+    start = datetime.datetime.combine(date, datetime.time())
+    return start.timestamp(), (start + datetime.timedelta(days=1)).timestamp()
+
+class SnapshotStore:
+    """Append-only intraday equity file of one account; one writer, any number of readers"""
+
+    def __init__(self, db: ConnectionManager, account_id: int, path: str):
+        self.db = db
+        self.account_id = account_id
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None  # Append handle, opened on the first write
+        self._last_ts: Optional[float] = None
+        self._mapped_size = -1
+        self._records = np.empty(0, RECORD)
+        # First timestamp, lowest and highest equity of every full block
+        self._block_start = np.empty(0)
+        self._block_min = np.empty(0)
+        self._block_max = np.empty(0)
+
+    def _writer(self):
+        """Append handle; a record torn by an interrupted write is cut off first (caller holds the lock)"""
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            f = open(self.path, 'a+b')
+            size = f.seek(0, os.SEEK_END)
+            if size < HEADER_SIZE:
+                f.truncate(0)
+                f.write(MAGIC.ljust(HEADER_SIZE, b"\0"))
+            else:
+                self._check_header(f)
+                whole = HEADER_SIZE + (size - HEADER_SIZE) // RECORD.itemsize * RECORD.itemsize
+                if whole != size:
+                    print(f"DEBUG: Dropping {size - whole} bytes of a torn snapshot in {self.path}")
+                    f.truncate(whole)
+                if whole > HEADER_SIZE:
+                    f.seek(whole - RECORD.itemsize)
+                    self._last_ts = float(np.frombuffer(f.read(RECORD.itemsize), RECORD)["ts"][0])
+            f.flush()
+            self._file = f
+        return self._file
+
+    def _check_header(self, f):
+        """Refuse files that aren't snapshot files"""
+        f.seek(0)
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{self.path} is not an equity snapshot file")
+
+    def append(self, balance: float, equity: float, timestamp: Optional[float] = None):
+        """Record one snapshot (timestamped now by default)"""
+        self.extend([(time.time() if timestamp is None else timestamp, balance, equity)])
+
+    def extend(self, snapshots: Iterable[Tuple[float, float, float]]):
+        """Record (timestamp, balance, equity) snapshots in one write; timestamps must not go backwards"""
+        records = np.array(list(snapshots), RECORD)
+        if not len(records):
+            return
+        with self._lock:
+            f = self._writer()
+            previous = self._last_ts
+            first = previous if previous is not None else records["ts"][0]
+            if records["ts"][0] < first or (np.diff(records["ts"]) < 0).any():
+                raise ValueError("Equity snapshots must be appended in time order")
+            f.write(records.tobytes())
+            f.flush()
+            self._last_ts = float(records["ts"][-1])
+        # The first snapshot of a new day closes the days before it
+        if previous is not None and (datetime.date.fromtimestamp(self._last_ts) >
+                                     datetime.date.fromtimestamp(previous)):
+            self.rollup()
+
+    def refresh(self) -> bool:
+        """Pick up snapshots appended since the last read, e.g. by another process; True if any"""
+        with self._lock:
+            return self._remap()
+
+    def _remap(self) -> bool:
+        """Re-map the file if it grew (caller holds the lock)"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size == self._mapped_size:
+            return False
+        count = max(0, size - HEADER_SIZE) // RECORD.itemsize
+        if count:
+            if self._mapped_size < HEADER_SIZE:
+                with open(self.path, 'rb') as f:
+                    self._check_header(f)
+            self._records = np.memmap(self.path, RECORD, 'r', offset=HEADER_SIZE, shape=(count,))
+        self._mapped_size = size
+        self._extend_blocks()
+        return True
+
+    def _extend_blocks(self):
+        """Summarize blocks that filled up since the last map (caller holds the lock)"""
+        have, full = len(self._block_min), len(self._records) // BLOCK_SIZE
+        if full <= have:
+            return
+        new = self._records[have * BLOCK_SIZE:full * BLOCK_SIZE]
+        equity = new["equity"].reshape(-1, BLOCK_SIZE)
+        self._block_start = np.concatenate((self._block_start, new["ts"][::BLOCK_SIZE]))
+        self._block_min = np.concatenate((self._block_min, equity.min(axis=1)))
+        self._block_max = np.concatenate((self._block_max, equity.max(axis=1)))
+
+    def _position(self, timestamp: float) -> int:
+        """Index of the first snapshot at or after a timestamp, in O(log n) (caller holds the lock)"""
+        # Find the block first, then search only inside it; searching the
+        # strided timestamp column directly would copy the whole file
+        block = int(np.searchsorted(self._block_start, timestamp, 'left'))
+        lo = max(0, block - 1) * BLOCK_SIZE
+        hi = block * BLOCK_SIZE if block < len(self._block_start) else len(self._records)
+        return lo + int(np.searchsorted(np.ascontiguousarray(self._records["ts"][lo:hi]), timestamp, 'left'))
+
+    def between(self, start: float, end: float) -> np.ndarray:
+        """Snapshots with start <= timestamp < end, as a view of the memory map"""
+        with self._lock:
+            self._remap()
+            return self._records[self._position(start):self._position(end)]
+
+    def extremes(self, start: float, end: float) -> Optional[Tuple[float, float]]:
+        """(lowest, highest) equity with start <= timestamp < end, or None without snapshots"""
+        with self._lock:
+            self._remap()
+            lo, hi = self._position(start), self._position(end)
+            if lo >= hi:
+                return None
+            equity = self._records["equity"]
+            first_block, last_block = -(-lo // BLOCK_SIZE), hi // BLOCK_SIZE
+            if first_block >= last_block:
+                part = equity[lo:hi]
+                return float(part.min()), float(part.max())
+            # Whole blocks from the summaries, only the ragged ends from the file
+            lows = [self._block_min[first_block:last_block].min()]
+            highs = [self._block_max[first_block:last_block].max()]
+            for part in (equity[lo:first_block * BLOCK_SIZE], equity[last_block * BLOCK_SIZE:hi]):
+                if len(part):
+                    lows.append(part.min())
+                    highs.append(part.max())
+            return float(min(lows)), float(max(highs))
+
+    def latest(self) -> Optional[Tuple[float, float, float]]:
+        """Most recent (timestamp, balance, equity)"""
+        with self._lock:
+            self._remap()
+            return tuple(float(v) for v in self._records[-1]) if len(self._records) else None
+
+    def rollup(self, until: Optional[datetime.date] = None) -> int:
+        """Store the intraday low and high of days before `until` (today) in equity_curve; returns days written"""
+        with self._lock:
+            self._remap()
+            if not len(self._records):
+                return 0
+            first_ts, last_ts = float(self._records["ts"][0]), float(self._records["ts"][-1])
+        until = until or datetime.date.today()
+        # Days already rolled up are skipped; only finished days are written
+        row = self.db.fetchone("""
+            SELECT MAX(day) FROM equity_curve WHERE account_id = ? AND intraday_low IS NOT NULL
+        """, (self.account_id,))
+        date = datetime.date.fromtimestamp(first_ts)
+        if row[0] is not None:
+            date = max(date, day_to_date(row[0]) + datetime.timedelta(days=1))
+        last = min(until - datetime.timedelta(days=1), datetime.date.fromtimestamp(last_ts))
+
+        extremes_by_date = {}
+        while date <= last:
+            extremes = self.extremes(*day_bounds(date))
+            if extremes:
+                extremes_by_date[date] = extremes
+            date += datetime.timedelta(days=1)
+        # Through the account, so the ledger and equity views follow the new rows
+        AccountRepository(self.db.db_path, self.account_id).set_intraday_extremes(extremes_by_date)
+        return len(extremes_by_date)
+
+    def close(self):
+        """Close the append handle"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+_stores: "weakref.WeakKeyDictionary[ConnectionManager, Dict[int, SnapshotStore]]" = weakref.WeakKeyDictionary()
+_stores_lock = threading.Lock()
+
+def get_snapshot_store(db: ConnectionManager, account_id: int) -> SnapshotStore:
+    """Get the snapshot store of an account, kept in <store dir>/equity_snapshots/"""
+    with _stores_lock:
+        stores = _stores.setdefault(db, {})
+        store = stores.get(account_id)
+        if store is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(db.db_path)), SNAPSHOTS_DIR,
+                                f"account_{account_id}.bin")
+            store = stores[account_id] = SnapshotStore(db, account_id, path)
+        return store
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Record and query intraday equity snapshots")
+    parser.add_argument("--db", default=STORE_PATH, help="store path")
+    parser.add_argument("--account", type=int, help="account id (default: the active account)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    append = commands.add_parser("append", help="record a snapshot timestamped now")
+    append.add_argument("balance", type=float)
+    append.add_argument("equity", type=float)
+    commands.add_parser("rollup", help="store finished days' intraday low and high")
+    extremes = commands.add_parser("extremes", help="lowest and highest equity over dates")
+    extremes.add_argument("--start", type=datetime.date.fromisoformat, default=datetime.date.today())
+    extremes.add_argument("--end", type=datetime.date.fromisoformat, default=datetime.date.today())
+    args = parser.parse_args(argv)
+
+    db = get_database(args.db)
+    migrate(db, STORE_MIGRATIONS)
+    account_id = args.account if args.account is not None else AccountRepository(args.db).account_id
+    store = get_snapshot_store(db, account_id)
+    if args.command == "append":
+        store.append(args.balance, args.equity)
+    elif args.command == "rollup":
+        print(f"{store.rollup()} days rolled up")
+    else:
+        result = store.extremes(day_bounds(args.start)[0], day_bounds(args.end)[1])
+        print("no snapshots" if result is None else f"low {result[0]:,.2f}  high {result[1]:,.2f}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
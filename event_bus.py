@@ -0,0 +1,171 @@
+"""
+Event Bus Module for PropFire
+In-process publish/subscribe for data changes. Events carry the changed data,
+so views update from the payload instead of re-querying SQLite. Deliveries
+are coalesced per Tk frame: events about the same thing are merged, and each
+subscriber gets the frame's events in batches, in the order they happened.
+"""
+
+import datetime
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Type
+
+FRAME_MS = 16  # One frame at 60 Hz
+
+@dataclass(frozen=True)
+class Event:
+    """Base event; events with the same key are merged within a frame"""
+
+    @property
+    def key(self) -> Hashable:
+        """What the event is about (by default every event stands alone)"""
+        return id(self)
+
+    def merged(self, earlier: 'Event') -> 'Event':
+        """Combine with an earlier event of the same key (the newer one wins by default)"""
+        return self
+
+@dataclass(frozen=True)
+class TradeSaved(Event):
+    """A trade was inserted or edited and committed"""
+    account_id: int
+    trade: Any  # TradeEntry with its id
+    totals: Dict[datetime.date, Any] = field(default_factory=dict)  # New DailyTotal per touched day, None if emptied
+
+    @property
+    def key(self) -> Hashable:
+        return ("trade", self.account_id, self.trade.id)
+
+@dataclass(frozen=True)
+class TradeDeleted(Event):
+    """A trade was deleted and committed"""
+    account_id: int
+    trade_id: int
+    date: datetime.date
+    totals: Dict[datetime.date, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> Hashable:
+        return ("trade", self.account_id, self.trade_id)
+
+@dataclass(frozen=True)
+class EquityUpdated(Event):
+    """An account's equity changed; carries the new summary and the days whose P&L changed"""
+    account_id: int
+    summary: Any  # AccountSummary
+    days: FrozenSet[int] = frozenset()  # Day numbers whose P&L changed
+    rebased: bool = False  # The starting balance changed, so every point moved
+
+    @property
+    def key(self) -> Hashable:
+        return ("equity", self.account_id)
+
+    def merged(self, earlier: 'EquityUpdated') -> 'EquityUpdated':
+        return EquityUpdated(self.account_id, self.summary, self.days | earlier.days,
+                             self.rebased or earlier.rebased)
+
+@dataclass(frozen=True)
+class NewsSnapshotChanged(Event):
+    """A news fetch finished; carries the events found, or the error"""
+    events: List[Dict] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> Hashable:
+        return "news"
+
+Handler = Callable[[List[Event]], None]
+
+class EventBus:
+    """Routes events to subscribers by type, once per frame on the Tk thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[Type[Event], List[Handler]] = {}
+        self._pending: Dict[Hashable, Event] = {}  # By key, in order of the latest publish
+        self._widget = None  # Delivers on this widget's Tk thread; None delivers right away
+        self._scheduled = False
+
+    def attach(self, widget):
+        """Deliver through a Tk widget's event loop, once per frame"""
+        with self._lock:
+            self._widget = widget
+
+    def detach(self, widget):
+        """Stop delivering through a widget that is going away"""
+        with self._lock:
+            if self._widget is widget:
+                self._widget = None
+                self._scheduled = False
+        self.flush()
+
+    def subscribe(self, event_type: Type[Event], handler: Handler) -> Callable[[], None]:
+        """Call handler with batches of events of a type, once per frame; returns an unsubscribe function"""
+        with self._lock:
+            self._subscribers.setdefault(event_type, []).append(handler)
+
+        def unsubscribe():
+            with self._lock:
+                handlers = self._subscribers.get(event_type, [])
+                if handler in handlers:
+                    handlers.remove(handler)
+        return unsubscribe
+
+    def publish(self, event: Event):
+        """Queue an event for the next frame; safe from any thread"""
+        with self._lock:
+            if not self._subscribers.get(type(event)):
+                return
+            # A later event about the same thing (e.g. a delete after a save) replaces
+            # or merges with the earlier one and moves to the back of the queue
+            earlier = self._pending.pop(event.key, None)
+            merge = earlier is not None and type(earlier) is type(event)
+            self._pending[event.key] = event.merged(earlier) if merge else event
+            if self._scheduled:
+                return
+            widget = self._widget
+            self._scheduled = widget is not None
+        if widget is None:
+            self.flush()
+            return
+        try:
+            widget.after(FRAME_MS, self.flush)
+        except Exception as e:
+            # The window went away between attach and now
+            print(f"DEBUG: Event bus falling back to direct delivery: {e}")
+            self.detach(widget)
+
+    def flush(self):
+        """Deliver everything pending, consecutive events of one type as one batch"""
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+            self._scheduled = False
+            handlers = {type(event): list(self._subscribers.get(type(event), [])) for event in pending}
+        start = 0
+        while start < len(pending):
+            event_type = type(pending[start])
+            end = start + 1
+            while end < len(pending) and type(pending[end]) is event_type:
+                end += 1
+            batch, start = pending[start:end], end
+            for handler in handlers[event_type]:
+                try:
+                    handler(batch)
+                except Exception as e:
+                    print(f"DEBUG: {event_type.__name__} handler error: {e}")
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = EventBus()
+        return _bus
+
+def publish(event: Event):
+    """Publish an event on the process-wide bus"""
+    get_event_bus().publish(event)
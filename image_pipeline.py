@@ -0,0 +1,161 @@
+"""
+Chart Image Pipeline for PropFire
+Background ingestion of chart attachments with thumbnailing, plus a lazily
+decoded LRU cache of thumbnails for the UI
+"""
+
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+import customtkinter as ctk
+from PIL import Image, features
+
+# Thumbnail edge lengths in pixels: calendar cells and dialog preview
+THUMB_SMALL = 64
+THUMB_LARGE = 256
+THUMBNAIL_SIZES = (THUMB_LARGE, THUMB_SMALL)
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "PNG"
+
+@dataclass
+class ImageInfo:
+    """Stored chart image with its original dimensions and thumbnails"""
+    path: str
+    width: int
+    height: int
+    thumbnails: Dict[int, str] = field(default_factory=dict)
+
+def resolve_image_path(path: str) -> str:
+    """Normalize a stored path, which may use Windows separators"""
+    return os.path.normpath(path.replace("\\", "/")) if path else ""
+
+def thumbnail_path(image_path: str, size: int) -> str:
+    """Deterministic thumbnail location for an image and edge size"""
+    image_path = resolve_image_path(image_path)
+    directory, filename = os.path.split(image_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, "thumbs", f"{stem}_{size}.{THUMBNAIL_FORMAT.lower()}")
+
+def make_thumbnails(image_path: str) -> ImageInfo:
+    """Generate every thumbnail size for an image, decoding it once at reduced scale"""
+    image_path = resolve_image_path(image_path)
+    os.makedirs(os.path.join(os.path.dirname(image_path), "thumbs"), exist_ok=True)
+
+    thumbnails = {size: thumbnail_path(image_path, size) for size in THUMBNAIL_SIZES}
+    with Image.open(image_path) as img:
+        # Dimensions come from the header; no pixel data is decoded yet
+        width, height = img.size
+        if all(os.path.exists(path) for path in thumbnails.values()):
+            return ImageInfo(path=image_path, width=width, height=height, thumbnails=thumbnails)
+        largest = THUMBNAIL_SIZES[0]
+        # reducing_gap lets JPEG decode via DCT scaling (draft) and other
+        # formats via reduce(), so a 4K screenshot is never resampled at full size
+        img.thumbnail((largest, largest), Image.LANCZOS, reducing_gap=2.0)
+        thumb = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    for size in THUMBNAIL_SIZES:
+        thumb.thumbnail((size, size), Image.LANCZOS)
+        thumb.save(thumbnails[size], THUMBNAIL_FORMAT)
+    return ImageInfo(path=image_path, width=width, height=height, thumbnails=thumbnails)
+
+class ImagePipeline:
+    """Worker pool that copies attachments into the journal and thumbnails them"""
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image")
+
+    def ingest(self, source_path: str, dest_path: str,
+               on_done: Optional[Callable[[ImageInfo], None]] = None) -> Future:
+        """Copy an attachment to dest_path and build its thumbnails in the background"""
+        def run() -> ImageInfo:
+            # An existing destination is the same content-addressed blob; skip the copy
+            if not os.path.exists(dest_path):
+                os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+                # Copy to a temp name and rename so readers never see a partial file
+                temp_path = f"{dest_path}.{threading.get_ident()}.tmp"
+                shutil.copyfile(source_path, temp_path)
+                os.replace(temp_path, dest_path)
+            info = make_thumbnails(dest_path)
+            if on_done:
+                on_done(info)
+            return info
+        return self._executor.submit(run)
+
+    def preview(self, source_path: str, size: int = THUMB_LARGE) -> Future:
+        """Decode a reduced-size preview of any image file in the background"""
+        def run() -> Image.Image:
+            with Image.open(source_path) as img:
+                img.thumbnail((size, size), Image.LANCZOS, reducing_gap=2.0)
+                return img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        return self._executor.submit(run)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Run other image housekeeping (e.g. GC) on the worker pool"""
+        return self._executor.submit(fn, *args)
+
+    def shutdown(self, wait: bool = False, cancel_futures: bool = False):
+        """Stop accepting work; queued jobs finish unless cancelled, and wait blocks until running ones do"""
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+class ThumbnailCache:
+    """LRU cache of decoded thumbnails; only use from the Tk thread"""
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self._images: "OrderedDict[Tuple[str, int], ctk.CTkImage]" = OrderedDict()
+
+    def get(self, image_path: str, size: int = THUMB_SMALL) -> Optional[ctk.CTkImage]:
+        """Get a thumbnail, decoding it from disk on first use"""
+        key = (resolve_image_path(image_path), size)
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            return image
+
+        path = thumbnail_path(image_path, size)
+        if not os.path.exists(path):
+            return None  # Not generated yet
+        with Image.open(path) as thumb:
+            thumb.load()
+            image = self.put_image(key, thumb.copy())
+        return image
+
+    def put_image(self, key: Tuple[str, int], pil_image: Image.Image) -> ctk.CTkImage:
+        """Wrap a decoded PIL image for CTk widgets and cache it"""
+        # CTkImage wraps ImageTk.PhotoImage and rescales it on HighDPI displays
+        image = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=pil_image.size)
+        self._images[key] = image
+        self._images.move_to_end(key)
+        while len(self._images) > self.capacity:
+            self._images.popitem(last=False)
+        return image
+
+    def invalidate(self, image_path: str):
+        """Drop every cached size of an image after it changes"""
+        path = resolve_image_path(image_path)
+        for key in [key for key in self._images if key[0] == path]:
+            del self._images[key]
+
+_pipeline: Optional[ImagePipeline] = None
+_pipeline_lock = threading.Lock()
+
+def get_image_pipeline() -> ImagePipeline:
+    """Get the shared image pipeline, creating it on first use"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = ImagePipeline()
+        return _pipeline
+
+def shutdown_image_pipeline():
+    """Drop queued image jobs and wait for running ones; the next get_image_pipeline() starts a fresh one"""
+    global _pipeline
+    with _pipeline_lock:
+        pipeline, _pipeline = _pipeline, None
+    if pipeline:
+        pipeline.shutdown(wait=True, cancel_futures=True)
+
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,170 @@
+"""
+Image Store Module for PropFire
+Content-addressed chart image storage: identical screenshots share one blob,
+journal rows hold reference counts and unreferenced blobs are garbage collected
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Tuple
+from database import ConnectionManager
+from image_pipeline import (ImageInfo, THUMBNAIL_SIZES, get_image_pipeline, resolve_image_path,
+                            thumbnail_path)
+
+OBJECTS_DIR = "objects"
+# Unreferenced blobs survive this long, so an attachment that is being saved
+# (or was just detached by an edit that is then redone) is never collected
+GC_GRACE_SECONDS = 600.0
+
+def content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def remove_image_files(image_path: str) -> int:
+    """Delete an image and its thumbnails, returning the bytes freed"""
+    freed = 0
+    for path in [resolve_image_path(image_path)] + [thumbnail_path(image_path, size) for size in THUMBNAIL_SIZES]:
+        try:
+            freed += os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            pass
+    return freed
+
+class ImageStore:
+    """Hash-named image blobs under <images_dir>/objects/<2 hex>/, refcounted in image_blobs"""
+
+    def __init__(self, db: ConnectionManager, images_dir: str):
+        self.db = db
+        self.images_dir = images_dir
+        self.objects_dir = os.path.join(images_dir, OBJECTS_DIR)
+
+    def blob_path(self, digest: str, ext: str) -> str:
+        """Stored path of a blob; the first two hex digits shard the directory"""
+        return resolve_image_path(os.path.join(self.objects_dir, digest[:2], f"{digest}{ext.lower()}"))
+
+    def add(self, source_path: str, on_ready=None) -> str:
+        """Stage an image in the store and return its blob path; retain() it to keep it"""
+        digest = content_hash(source_path)
+        path = self.blob_path(digest, os.path.splitext(source_path)[1])
+        with self.db.transaction() as conn:
+            # New blobs start unreferenced; touching released_at restarts the
+            # grace period so GC can't take a blob that is about to be retained
+            conn.execute("""
+                INSERT INTO image_blobs (path, sha256, bytes, refcount, released_at)
+                VALUES (?, ?, ?, 0, ?)
+                ON CONFLICT(path) DO UPDATE SET released_at = excluded.released_at
+            """, (path, digest, os.path.getsize(source_path), time.time()))
+        # Existing blobs are neither copied nor re-thumbnailed
+        get_image_pipeline().ingest(source_path, path, lambda info: self.record_ingested(info, on_ready))
+        return path
+
+    def record_ingested(self, info: ImageInfo, on_ready=None):
+        """Record a processed blob's dimensions (runs on an image worker thread)"""
+        self.record_dimensions(info)
+        if on_ready:
+            on_ready(info)
+
+    def record_dimensions(self, info: ImageInfo):
+        """Store the original dimensions of an image"""
+        with self.db.transaction() as conn:
+            conn.execute("""
+                INSERT INTO image_blobs (path, width, height, released_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET width = excluded.width, height = excluded.height
+            """, (info.path, info.width, info.height, time.time()))
+
+    def get_dimensions(self, image_path: str) -> Optional[Tuple[int, int]]:
+        """Get the (width, height) of a processed image"""
+        row = self.db.fetchone("""
+            SELECT width, height FROM image_blobs WHERE path = ? AND width IS NOT NULL
+        """, (resolve_image_path(image_path),))
+        return tuple(row) if row else None
+
+    @staticmethod
+    def retain(conn: sqlite3.Connection, image_path: str):
+        """Add a journal reference to an image in the caller's transaction"""
+        if not image_path:
+            return
+        conn.execute("""
+            INSERT INTO image_blobs (path, refcount) VALUES (?, 1)
+            ON CONFLICT(path) DO UPDATE SET refcount = refcount + 1, released_at = NULL
+        """, (resolve_image_path(image_path),))
+
+    @staticmethod
+    def release(conn: sqlite3.Connection, image_path: str):
+        """Drop a journal reference in the caller's transaction"""
+        if not image_path:
+            return
+        conn.execute("""
+            UPDATE image_blobs SET refcount = refcount - 1,
+                released_at = CASE WHEN refcount <= 1 THEN ? ELSE released_at END
+            WHERE path = ?
+        """, (time.time(), resolve_image_path(image_path)))
+
+    @staticmethod
+    def rebuild(conn: sqlite3.Connection, references: Iterable[str]):
+        """Recompute every refcount from the referencing rows in the caller's transaction"""
+        counts = {}
+        for image_path in references:
+            if image_path:
+                path = resolve_image_path(image_path)
+                counts[path] = counts.get(path, 0) + 1
+        now = time.time()
+        conn.execute("UPDATE image_blobs SET refcount = 0, released_at = COALESCE(released_at, ?)", (now,))
+        conn.executemany("""
+            INSERT INTO image_blobs (path, refcount) VALUES (?, ?)
+            ON CONFLICT(path) DO UPDATE SET refcount = excluded.refcount, released_at = NULL
+        """, counts.items())
+
+    def collect_garbage(self, grace: float = GC_GRACE_SECONDS) -> Tuple[int, int]:
+        """Delete unreferenced blobs and stray files, returning (files removed, bytes freed)"""
+        cutoff = time.time() - grace
+        removed = freed = 0
+        candidates = self.db.fetchall("""
+            SELECT path FROM image_blobs WHERE refcount <= 0 AND released_at < ?
+        """, (cutoff,))
+        for (path,) in candidates:
+            # Re-check in the delete itself: a save may have retained it since
+            with self.db.transaction() as conn:
+                deleted = conn.execute("""
+                    DELETE FROM image_blobs WHERE path = ? AND refcount <= 0 AND released_at < ?
+                """, (path, cutoff)).rowcount
+            if deleted:
+                freed += remove_image_files(path)
+                removed += 1
+
+        # Blobs left behind by an interrupted save or a rebuilt database
+        known = {row[0] for row in self.db.fetchall("SELECT path FROM image_blobs")}
+        for path in self._object_files():
+            if path not in known and os.path.getmtime(path) < cutoff:
+                freed += remove_image_files(path)
+                removed += 1
+
+        if removed:
+            print(f"DEBUG: Image GC removed {removed} blob(s), freed {freed:,} bytes")
+        return removed, freed
+
+    def collect_garbage_async(self, grace: float = GC_GRACE_SECONDS):
+        """Run a GC pass on the image worker pool"""
+        return get_image_pipeline().submit(self.collect_garbage, grace)
+
+    def _object_files(self) -> List[str]:
+        """Blob files currently in the sharded objects directory"""
+        paths = []
+        if not os.path.isdir(self.objects_dir):
+            return paths
+        for shard in os.listdir(self.objects_dir):
+            shard_dir = os.path.join(self.objects_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                path = os.path.join(shard_dir, name)
+                if os.path.isfile(path):
+                    paths.append(resolve_image_path(path))
+        return paths
@@ -0,0 +1,528 @@
+"""
+Schema Migration Module for PropFire
+Versioned, in-place schema upgrades driven by PRAGMA user_version. Each
+migration carries its own SQL: a migration must keep producing the same
+schema however the live repositories change later.
+"""
+
+import json
+import os
+import pathlib
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Sequence
+from database import ConnectionManager, DEFAULT_ACCOUNT_ID, JULIAN_DAY_OFFSET
+
+# Single database holding the journal, trades and equity curve, so one
+# transaction covers a trade and everything derived from it
+STORE_PATH = "propfire.db"
+
+@dataclass
+class Migration:
+    """Single schema step; applying it moves the file to `version`"""
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Read the schema version stored in the database header"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(db: ConnectionManager, migrations: List[Migration]) -> int:
+    """Apply pending migrations in order, each in its own transaction"""
+    version = get_schema_version(db.connection())
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= version:
+            continue
+        with db.transaction() as conn:
+            # Re-check under the write lock in case another process migrated
+            version = get_schema_version(conn)
+            if migration.version <= version:
+                continue
+            print(f"DEBUG: Migrating {db.db_path} to v{migration.version}: {migration.description}")
+            migration.apply(conn)
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            version = migration.version
+    return version
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Get the column names of a table, empty if it doesn't exist"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _rekey_by_day(conn: sqlite3.Connection, table: str, create_sql: str, columns: str):
+    """Rebuild a TEXT date keyed table with an INTEGER day primary key"""
+    if "day" in table_columns(conn, table):
+        return
+    conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+    conn.execute(create_sql)
+    # Rows with unparseable dates are dropped; julianday() returns NULL for them
+    conn.execute(f"""
+        INSERT OR REPLACE INTO {table} (day, {columns})
+        SELECT CAST(julianday(date) - {JULIAN_DAY_OFFSET} AS INTEGER), {columns}
+        FROM {table}_legacy
+        WHERE julianday(date) IS NOT NULL
+    """)
+    conn.execute(f"DROP TABLE {table}_legacy")
+
+# Aggregate and full-text layouts as these migrations create them; PnLAggregates
+# and NotesIndex maintain them at run time, but changing those must not change an
+# old migration.
+
+AGGREGATE_KEY_SQL = {
+    "day": "day",
+    "month": f"CAST(strftime('%Y%m', day + {JULIAN_DAY_OFFSET}) AS INTEGER)",
+    "year": f"CAST(strftime('%Y', day + {JULIAN_DAY_OFFSET}) AS INTEGER)",
+}
+
+def _create_aggregate_tables(conn: sqlite3.Connection, prefix: str, levels: Sequence[str]):
+    """Create <prefix>_days/_months/_years tables of per-account P&L totals"""
+    for level in levels:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {prefix}_{level}s (
+                account_id INTEGER NOT NULL DEFAULT {DEFAULT_ACCOUNT_ID},
+                key INTEGER NOT NULL,
+                pnl REAL NOT NULL DEFAULT 0,
+                fees REAL NOT NULL DEFAULT 0,
+                trade_count INTEGER NOT NULL DEFAULT 0,
+                wins INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (account_id, key)
+            ) WITHOUT ROWID
+        """)
+
+def _rebuild_aggregate_tables(conn: sqlite3.Connection, prefix: str, levels: Sequence[str], source: str):
+    """Recompute aggregate tables from their source table"""
+    # Sources from before accounts existed belong to the default account
+    account_sql = "account_id" if "account_id" in table_columns(conn, source) else str(DEFAULT_ACCOUNT_ID)
+    for level in levels:
+        conn.execute(f"DELETE FROM {prefix}_{level}s")
+        conn.execute(f"""
+            INSERT INTO {prefix}_{level}s (account_id, key, pnl, fees, trade_count, wins, losses)
+            SELECT {account_sql}, {AGGREGATE_KEY_SQL[level]}, SUM(pnl), SUM(fees), COUNT(*),
+                   SUM(pnl > 0), SUM(pnl < 0)
+            FROM {source} GROUP BY 1, 2
+        """)
+
+def _create_notes_index(conn: sqlite3.Connection, fts_table: str, source: str, rowid_column: str,
+                        columns: str):
+    """Create an external-content FTS5 table over a source table and fill it"""
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {columns},
+            content='{source}', content_rowid='{rowid_column}',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    """)
+    _rebuild_notes_index(conn, fts_table)
+
+def _rebuild_notes_index(conn: sqlite3.Connection, fts_table: str):
+    """Re-index every row of an FTS5 table's source"""
+    conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+# --- trading_journal.db ---------------------------------------------------
+
+def _journal_v1(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_entries (
+            date TEXT PRIMARY KEY,
+            pnl REAL NOT NULL,
+            gross REAL DEFAULT 0,
+            fees REAL DEFAULT 0,
+            notes TEXT DEFAULT ''
+        )
+    """)
+
+def _journal_v2(conn: sqlite3.Connection):
+    _rekey_by_day(conn, "daily_entries", """
+        CREATE TABLE daily_entries (
+            day INTEGER PRIMARY KEY,
+            pnl REAL NOT NULL,
+            gross REAL DEFAULT 0,
+            fees REAL DEFAULT 0,
+            notes TEXT DEFAULT ''
+        )
+    """, "pnl, gross, fees, notes")
+
+def _journal_v3(conn: sqlite3.Connection):
+    _create_aggregate_tables(conn, "journal", ("month", "year"))
+    _rebuild_aggregate_tables(conn, "journal", ("month", "year"), "daily_entries")
+
+def _journal_v4(conn: sqlite3.Connection):
+    _create_notes_index(conn, "journal_notes_fts", "daily_entries", "rowid", "notes")
+
+JOURNAL_MIGRATIONS = [
+    Migration(1, "daily entries keyed by date text", _journal_v1),
+    Migration(2, "daily entries keyed by integer day number", _journal_v2),
+    Migration(3, "monthly and yearly P&L aggregates", _journal_v3),
+    Migration(4, "full-text index over notes", _journal_v4),
+]
+
+# --- enhanced_journal.db --------------------------------------------------
+
+def _enhanced_v1(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS trade_entries (
+            date TEXT PRIMARY KEY,
+            pnl REAL NOT NULL,
+            entry_price REAL DEFAULT 0,
+            stop_loss REAL DEFAULT 0,
+            take_profit REAL DEFAULT 0,
+            risk_reward REAL DEFAULT 0,
+            notes TEXT DEFAULT '',
+            chart_image TEXT DEFAULT ''
+        )
+    """)
+
+def _enhanced_v2(conn: sqlite3.Connection):
+    _rekey_by_day(conn, "trade_entries", """
+        CREATE TABLE trade_entries (
+            day INTEGER PRIMARY KEY,
+            pnl REAL NOT NULL,
+            entry_price REAL DEFAULT 0,
+            stop_loss REAL DEFAULT 0,
+            take_profit REAL DEFAULT 0,
+            risk_reward REAL DEFAULT 0,
+            notes TEXT DEFAULT '',
+            chart_image TEXT DEFAULT ''
+        )
+    """, "pnl, entry_price, stop_loss, take_profit, risk_reward, notes, chart_image")
+
+def _enhanced_v3(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY,
+            day INTEGER NOT NULL,
+            instrument TEXT DEFAULT '',
+            direction TEXT DEFAULT '',
+            size REAL DEFAULT 0,
+            entry_time TEXT,
+            exit_time TEXT,
+            entry_price REAL DEFAULT 0,
+            exit_price REAL DEFAULT 0,
+            stop_loss REAL DEFAULT 0,
+            take_profit REAL DEFAULT 0,
+            fees REAL DEFAULT 0,
+            pnl REAL NOT NULL,
+            risk_reward REAL DEFAULT 0,
+            notes TEXT DEFAULT '',
+            chart_image TEXT DEFAULT ''
+        )
+    """)
+    conn.execute("CREATE INDEX idx_trades_day ON trades (day)")
+    # Per-day totals maintained by the repository write path, so calendar
+    # and equity views never have to aggregate the trades table
+    conn.execute("""
+        CREATE TABLE trade_days (
+            day INTEGER PRIMARY KEY,
+            pnl REAL NOT NULL DEFAULT 0,
+            fees REAL NOT NULL DEFAULT 0,
+            trade_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Each legacy one-per-day entry becomes a single trade on that day
+    conn.execute("""
+        INSERT INTO trades (day, entry_price, stop_loss, take_profit, pnl, risk_reward, notes, chart_image)
+        SELECT day, entry_price, stop_loss, take_profit, pnl, risk_reward, notes, chart_image
+        FROM trade_entries ORDER BY day
+    """)
+    conn.execute("""
+        INSERT INTO trade_days (day, pnl, fees, trade_count)
+        SELECT day, SUM(pnl), SUM(fees), COUNT(*) FROM trades GROUP BY day
+    """)
+    conn.execute("DROP TABLE trade_entries")
+
+def _enhanced_v4(conn: sqlite3.Connection):
+    # trade_days is replaced by the generic aggregate layout (adds win/loss counts)
+    conn.execute("DROP TABLE IF EXISTS trade_days")
+    _create_aggregate_tables(conn, "trade", ("day", "month", "year"))
+    _rebuild_aggregate_tables(conn, "trade", ("day", "month", "year"), "trades")
+
+def _enhanced_v5(conn: sqlite3.Connection):
+    # Original dimensions of each stored chart; thumbnails live next to it
+    conn.execute("""
+        CREATE TABLE chart_images (
+            path TEXT PRIMARY KEY,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL
+        )
+    """)
+
+def _enhanced_v6(conn: sqlite3.Connection):
+    # Every stored image, content-addressed or legacy, with its journal refcount
+    conn.execute("""
+        CREATE TABLE image_blobs (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT,
+            bytes INTEGER,
+            width INTEGER,
+            height INTEGER,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            released_at REAL
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX idx_image_blobs_released ON image_blobs (released_at) WHERE refcount <= 0
+    """)
+    # Legacy date-named files become blobs without a hash, counted per trade
+    counts = {}
+    for (chart_image,) in conn.execute("SELECT chart_image FROM trades WHERE chart_image != ''"):
+        # Stored paths may use Windows separators
+        path = os.path.normpath(chart_image.replace("\\", "/"))
+        counts[path] = counts.get(path, 0) + 1
+    conn.executemany("INSERT INTO image_blobs (path, refcount) VALUES (?, ?)", counts.items())
+    conn.execute("""
+        INSERT INTO image_blobs (path, width, height, refcount, released_at)
+        SELECT path, width, height, 0, ? FROM chart_images WHERE true
+        ON CONFLICT(path) DO UPDATE SET width = excluded.width, height = excluded.height
+    """, (time.time(),))
+    conn.execute("DROP TABLE chart_images")
+
+def _enhanced_v7(conn: sqlite3.Connection):
+    # Broker identity of imported trades; re-importing a statement is a no-op
+    conn.execute("ALTER TABLE trades ADD COLUMN import_key TEXT")
+    conn.execute("""
+        CREATE UNIQUE INDEX idx_trades_import_key ON trades (import_key) WHERE import_key IS NOT NULL
+    """)
+
+def _enhanced_v8(conn: sqlite3.Connection):
+    _create_notes_index(conn, "trade_notes_fts", "trades", "id", "notes, instrument")
+
+ENHANCED_JOURNAL_MIGRATIONS = [
+    Migration(1, "trade entries keyed by date text", _enhanced_v1),
+    Migration(2, "trade entries keyed by integer day number", _enhanced_v2),
+    Migration(3, "normalized trades table with daily totals", _enhanced_v3),
+    Migration(4, "daily, monthly and yearly trade aggregates", _enhanced_v4),
+    Migration(5, "chart image dimensions", _enhanced_v5),
+    Migration(6, "reference counted content-addressed images", _enhanced_v6),
+    Migration(7, "import keys for broker statement deduplication", _enhanced_v7),
+    Migration(8, "full-text index over trade notes and instruments", _enhanced_v8),
+]
+
+# --- propfire_account.db --------------------------------------------------
+
+def _account_v1(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS equity_curve (
+            date TEXT PRIMARY KEY,
+            equity REAL NOT NULL,
+            pnl REAL DEFAULT 0
+        )
+    """)
+
+def _account_v2(conn: sqlite3.Connection):
+    _rekey_by_day(conn, "equity_curve", """
+        CREATE TABLE equity_curve (
+            day INTEGER PRIMARY KEY,
+            equity REAL NOT NULL,
+            pnl REAL DEFAULT 0
+        )
+    """, "equity, pnl")
+
+ACCOUNT_MIGRATIONS = [
+    Migration(1, "equity curve keyed by date text", _account_v1),
+    Migration(2, "equity curve keyed by integer day number", _account_v2),
+]
+
+# --- propfire.db ----------------------------------------------------------
+
+# Per-feature files used before the store was consolidated, merged by v2:
+# (file name, its migrations, {table: columns copied})
+LEGACY_STORES = (
+    ("trading_journal.db", JOURNAL_MIGRATIONS, {
+        "daily_entries": "day, pnl, gross, fees, notes",
+    }),
+    ("enhanced_journal.db", ENHANCED_JOURNAL_MIGRATIONS, {
+        "trades": "id, day, instrument, direction, size, entry_time, exit_time, entry_price, exit_price, "
+                  "stop_loss, take_profit, fees, pnl, risk_reward, notes, chart_image, import_key",
+        "image_blobs": "path, sha256, bytes, width, height, refcount, released_at",
+    }),
+    ("propfire_account.db", ACCOUNT_MIGRATIONS, {
+        "equity_curve": "day, equity, pnl",
+    }),
+)
+
+def _store_v1(conn: sqlite3.Connection):
+    # The consolidated schema is exactly where each per-file chain ends up
+    for _, migrations, _ in LEGACY_STORES:
+        for migration in migrations:
+            migration.apply(conn)
+
+def _copy_legacy_store(path: str, scratch: str) -> str:
+    """Snapshot a legacy file into scratch through a read-only connection; returns the copy's path"""
+    copy = os.path.join(scratch, os.path.basename(path))
+    source = sqlite3.connect(pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro", uri=True)
+    dest = sqlite3.connect(copy)
+    try:
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+    return copy
+
+def _store_v2(conn: sqlite3.Connection):
+    store_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not store_file:
+        return  # In-memory store, nothing to merge
+    store_dir = os.path.dirname(store_file)
+    merged = False
+    # The legacy files are only read: each is brought up to date as a scratch
+    # copy, so a failed merge leaves them exactly as the old version wrote them
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, migrations, tables in LEGACY_STORES:
+            path = os.path.join(store_dir, name)
+            if not os.path.exists(path):
+                continue
+            legacy = ConnectionManager(_copy_legacy_store(path, scratch))
+            try:
+                migrate(legacy, migrations)
+                for table, columns in tables.items():
+                    before = conn.total_changes
+                    placeholders = ", ".join("?" for _ in columns.split(","))
+                    # Streamed from the legacy cursor, never held in memory
+                    conn.executemany(f"INSERT OR IGNORE INTO {table} ({columns}) VALUES ({placeholders})",
+                                     legacy.execute(f"SELECT {columns} FROM {table}"))
+                    print(f"DEBUG: Merged {conn.total_changes - before} {table} row(s) from {name}")
+            finally:
+                legacy.close_all()
+            merged = True
+    if not merged:
+        return
+
+    _rebuild_aggregate_tables(conn, "journal", ("month", "year"), "daily_entries")
+    _rebuild_notes_index(conn, "journal_notes_fts")
+    _rebuild_aggregate_tables(conn, "trade", ("day", "month", "year"), "trades")
+    _rebuild_notes_index(conn, "trade_notes_fts")
+    _reconcile_equity(conn)
+
+def _reconcile_equity(conn: sqlite3.Connection):
+    """Repair equity points left out of step with trade totals by the old two-file writes"""
+    first = conn.execute("SELECT equity - pnl FROM equity_curve ORDER BY day LIMIT 1").fetchone()
+    if not first:
+        return  # No equity history yet; it is built as trades are saved
+    conn.execute("""
+        INSERT INTO equity_curve (day, equity, pnl) SELECT key, 0, pnl FROM trade_days WHERE true
+        ON CONFLICT(day) DO UPDATE SET pnl = excluded.pnl
+    """)
+    equity = first[0]
+    updates = []
+    for day, pnl in conn.execute("SELECT day, pnl FROM equity_curve ORDER BY day").fetchall():
+        equity += pnl
+        updates.append((equity, day))
+    conn.executemany("UPDATE equity_curve SET equity = ? WHERE day = ?", updates)
+
+def _store_v3(conn: sqlite3.Connection):
+    # Equity is derived from prefix sums of the daily P&L (see equity_ledger),
+    # so a back-dated edit no longer has to rewrite every later row
+    conn.execute("ALTER TABLE equity_curve RENAME TO equity_curve_legacy")
+    conn.execute("""
+        CREATE TABLE equity_curve (
+            day INTEGER PRIMARY KEY,
+            pnl REAL NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT INTO equity_curve (day, pnl) SELECT day, COALESCE(pnl, 0) FROM equity_curve_legacy")
+    conn.execute("DROP TABLE equity_curve_legacy")
+
+def _store_v4(conn: sqlite3.Connection):
+    # Accounts; existing rows become the default account, whose starting
+    # balance moves here from account_config.json
+    conn.execute("""
+        CREATE TABLE accounts (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            starting_balance REAL NOT NULL DEFAULT 10000,
+            created_at REAL NOT NULL
+        )
+    """)
+    conn.execute("INSERT INTO accounts (id, name, starting_balance, created_at) VALUES (?, 'Main', ?, ?)",
+                 (DEFAULT_ACCOUNT_ID, _legacy_starting_balance(conn), time.time()))
+
+    # Journal entries get their own id so several accounts can share a day;
+    # migrated ids equal the old day keys, so the notes index keeps its rowids
+    conn.execute("DROP TABLE IF EXISTS journal_notes_fts")
+    conn.execute("ALTER TABLE daily_entries RENAME TO daily_entries_legacy")
+    conn.execute(f"""
+        CREATE TABLE daily_entries (
+            id INTEGER PRIMARY KEY,
+            account_id INTEGER NOT NULL DEFAULT {DEFAULT_ACCOUNT_ID},
+            day INTEGER NOT NULL,
+            pnl REAL NOT NULL,
+            gross REAL DEFAULT 0,
+            fees REAL DEFAULT 0,
+            notes TEXT DEFAULT '',
+            UNIQUE (account_id, day)
+        )
+    """)
+    conn.execute("""
+        INSERT INTO daily_entries (id, day, pnl, gross, fees, notes)
+        SELECT day, day, pnl, gross, fees, notes FROM daily_entries_legacy
+    """)
+    conn.execute("DROP TABLE daily_entries_legacy")
+    _create_notes_index(conn, "journal_notes_fts", "daily_entries", "rowid", "notes")
+
+    conn.execute(f"ALTER TABLE trades ADD COLUMN account_id INTEGER NOT NULL DEFAULT {DEFAULT_ACCOUNT_ID}")
+    conn.execute("DROP INDEX idx_trades_day")
+    conn.execute("CREATE INDEX idx_trades_account_day ON trades (account_id, day)")
+    conn.execute("DROP INDEX idx_trades_import_key")
+    conn.execute("""
+        CREATE UNIQUE INDEX idx_trades_import_key ON trades (account_id, import_key) WHERE import_key IS NOT NULL
+    """)
+
+    # Clustered by account then day, so one account's range scan reads only its rows
+    conn.execute("ALTER TABLE equity_curve RENAME TO equity_curve_legacy")
+    conn.execute(f"""
+        CREATE TABLE equity_curve (
+            account_id INTEGER NOT NULL DEFAULT {DEFAULT_ACCOUNT_ID},
+            day INTEGER NOT NULL,
+            pnl REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (account_id, day)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("INSERT INTO equity_curve (day, pnl) SELECT day, pnl FROM equity_curve_legacy")
+    conn.execute("DROP TABLE equity_curve_legacy")
+
+    for prefix, levels, source in (("journal", ("month", "year"), "daily_entries"),
+                                   ("trade", ("day", "month", "year"), "trades")):
+        for level in levels:
+            conn.execute(f"DROP TABLE IF EXISTS {prefix}_{level}s")
+        _create_aggregate_tables(conn, prefix, levels)
+        _rebuild_aggregate_tables(conn, prefix, levels, source)
+
+def _store_v5(conn: sqlite3.Connection):
+    # Intraday low and high rolled up from the equity snapshot files
+    conn.execute("ALTER TABLE equity_curve ADD COLUMN intraday_low REAL")
+    conn.execute("ALTER TABLE equity_curve ADD COLUMN intraday_high REAL")
+
+def _store_v6(conn: sqlite3.Connection):
+    # Release times of fetched high-impact events, for projecting future ones
+    conn.execute("""
+        CREATE TABLE news_history (
+            currency TEXT NOT NULL,
+            title TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            minute INTEGER NOT NULL,
+            PRIMARY KEY (currency, title, day)
+        ) WITHOUT ROWID
+    """)
+
+def _legacy_starting_balance(conn: sqlite3.Connection) -> float:
+    """Starting balance from the account_config.json next to the store, if one was set"""
+    store_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    path = os.path.join(os.path.dirname(store_file), "account_config.json") if store_file else ""
+    try:
+        with open(path, 'r') as f:
+            balance = json.load(f).get('starting_balance')
+        return 10000.0 if balance is None else float(balance)
+    except (OSError, ValueError, TypeError, AttributeError):
+        return 10000.0
+
+STORE_MIGRATIONS = [
+    Migration(1, "journal, trade and equity schemas in one file", _store_v1),
+    Migration(2, "merge the per-feature database files", _store_v2),
+    Migration(3, "equity curve stores daily P&L only", _store_v3),
+    Migration(4, "account-scoped journal, trades and equity", _store_v4),
+    Migration(5, "intraday equity low and high", _store_v5),
+    Migration(6, "news release history", _store_v6),
+]
@@ -8,6 +8,7 @@ class NewsAPI:
         self.cache = {}
         self.cache_ttl = 300  # 5 minutes cache
         self.base_url = "https://nfs.faireconomy.media/ff_calendar_thisweek.json"
+        self.last_error = None  # Why the last get_high_impact_news fetch failed, None if it worked
         
     def fetch_high_impact_events(self, currency: str, target_day: str) -> Optional[Dict]:
         """Fetch high-impact events using ForexFactory JSON API"""
@@ -127,6 +128,7 @@ class NewsAPI:
             response = requests.get(self.base_url, timeout=10)
             response.raise_for_status()
             data = response.json()
+            self.last_error = None
             
             matching_events = []
             now = datetime.now()
@@ -173,7 +175,8 @@ class NewsAPI:
             self.cache[cache_key] = (time.time(), matching_events)
             return matching_events
             
-        except Exception:
+        except Exception as e:
+            self.last_error = str(e)
             return []
     
     def fetch_high_impact_news(self, currency_code: str, session: str) -> Optional[Dict]:
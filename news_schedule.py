@@ -0,0 +1,202 @@
+"""
+News Schedule Module for PropFire
+Projects high-impact releases for the coming weeks from recurrence rules
+(NFP on the first Friday, weekly claims, the FOMC calendar) and from the
+release history of past fetches, so the countdown keeps working offline
+and over the weekend, when the feed only covers the week that is ending.
+"""
+
+import datetime
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from statistics import median
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import pytz
+from database import get_database, date_to_day, day_to_date
+from migrations import migrate, STORE_MIGRATIONS, STORE_PATH
+
+EASTERN = pytz.timezone('US/Eastern')  # Feed times, and so every projection, are Eastern
+LOOKAHEAD_DAYS = 21
+HISTORY_SIZE = 12  # Latest releases of an event used to learn its rule
+MIN_OBSERVATIONS = 2
+DAY_OF_MONTH_TOLERANCE = 2  # Releases on roughly the same date each month (e.g. CPI)
+
+@dataclass(frozen=True)
+class Recurrence:
+    """When an event repeats: weekly, nth weekday of the month, a day of the month, or listed dates"""
+    currency: str
+    title: str
+    kind: str  # "weekly", "nth_weekday", "month_day" or "dates"
+    at: datetime.time
+    weekday: int = 0  # Monday is 0
+    nth: int = 1  # 1 is the first such weekday of the month, -1 the last
+    day: int = 1  # Day of the month, moved to the next weekday if it falls on a weekend
+    dates: Tuple[datetime.date, ...] = ()
+    source: str = "rule"  # "rule" for the built-in calendar, "history" when learned
+
+    def occurrences(self, start: datetime.date, end: datetime.date) -> Iterator[datetime.date]:
+        """Dates of the event from start to end, inclusive"""
+        if self.kind == "dates":
+            yield from (date for date in self.dates if start <= date <= end)
+        elif self.kind == "weekly":
+            date = start + datetime.timedelta(days=(self.weekday - start.weekday()) % 7)
+            while date <= end:
+                yield date
+                date += datetime.timedelta(days=7)
+        else:
+            year, month = start.year, start.month
+            while datetime.date(year, month, 1) <= end:
+                date = self._in_month(year, month)
+                if start <= date <= end:
+                    yield date
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def _in_month(self, year: int, month: int) -> datetime.date:
+        """The event's date in a month, for the monthly kinds"""
+        if self.kind == "month_day":
+            date = datetime.date(year, month, min(self.day, 28))
+            while date.weekday() >= 5:
+                date += datetime.timedelta(days=1)
+            return date
+        if self.nth > 0:
+            first = datetime.date(year, month, 1)
+            return first + datetime.timedelta(days=(self.weekday - first.weekday()) % 7 + 7 * (self.nth - 1))
+        next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+        last = next_month - datetime.timedelta(days=1)
+        return last - datetime.timedelta(days=(last.weekday() - self.weekday) % 7)
+
+# FOMC decision days (the second day of each meeting); extend as the Fed publishes its calendar
+FOMC_DECISIONS = tuple(datetime.date.fromisoformat(d) for d in (
+    "2025-01-29", "2025-03-19", "2025-05-07", "2025-06-18", "2025-07-30", "2025-09-17", "2025-10-29", "2025-12-10",
+    "2026-01-28", "2026-03-18", "2026-04-29", "2026-06-17", "2026-07-29", "2026-09-16", "2026-10-28", "2026-12-09",
+))
+
+# Built-in rules, under the feed's titles; a rule learned from history replaces the one with the same title
+DEFAULT_RULES = (
+    Recurrence("USD", "Non-Farm Employment Change", "nth_weekday", datetime.time(8, 30), weekday=4, nth=1),
+    Recurrence("USD", "Unemployment Rate", "nth_weekday", datetime.time(8, 30), weekday=4, nth=1),
+    Recurrence("USD", "Unemployment Claims", "weekly", datetime.time(8, 30), weekday=3),
+    Recurrence("USD", "CPI m/m", "month_day", datetime.time(8, 30), day=12),
+    Recurrence("USD", "Federal Funds Rate", "dates", datetime.time(14, 0), dates=FOMC_DECISIONS),
+    Recurrence("USD", "FOMC Statement", "dates", datetime.time(14, 0), dates=FOMC_DECISIONS),
+    Recurrence("CAD", "Employment Change", "nth_weekday", datetime.time(8, 30), weekday=4, nth=1),
+)
+
+def learn_recurrence(currency: str, title: str, releases: List[datetime.datetime]) -> Optional[Recurrence]:
+    """Fit the simplest rule that matches every recent release, None if none does"""
+    releases = sorted(releases)[-HISTORY_SIZE:]
+    if len(releases) < MIN_OBSERVATIONS:
+        return None
+    at = Counter(release.time() for release in releases).most_common(1)[0][0]
+    dates = [release.date() for release in releases]
+    weekdays = {date.weekday() for date in dates}
+    if len(weekdays) == 1:
+        weekday = weekdays.pop()
+        gaps = [(b - a).days for a, b in zip(dates, dates[1:])]
+        if min(gaps) == 7 and all(gap % 7 == 0 for gap in gaps):
+            return Recurrence(currency, title, "weekly", at, weekday=weekday, source="history")
+        nths = {(date.day - 1) // 7 + 1 for date in dates}
+        # Most months have no fifth weekday; such a release is the last one, learned below
+        if len(nths) == 1 and max(nths) <= 4:
+            return Recurrence(currency, title, "nth_weekday", at, weekday=weekday, nth=nths.pop(),
+                              source="history")
+        if all((date + datetime.timedelta(days=7)).month != date.month for date in dates):
+            return Recurrence(currency, title, "nth_weekday", at, weekday=weekday, nth=-1, source="history")
+    days = [date.day for date in dates]
+    if len({(date.year, date.month) for date in dates}) == len(dates):
+        day = int(median(days))
+        if all(abs(d - day) <= DAY_OF_MONTH_TOLERANCE for d in days):
+            return Recurrence(currency, title, "month_day", at, day=day, source="history")
+    return None
+
+def week_end(date: datetime.date) -> datetime.date:
+    """Saturday ending the feed's Sunday-to-Saturday week that contains a date"""
+    return date + datetime.timedelta(days=(5 - date.weekday()) % 7)
+
+class NewsSchedule:
+    """Release history of fetched events and the projections made from it"""
+
+    def __init__(self, db_path: str = STORE_PATH, rules: Iterable[Recurrence] = DEFAULT_RULES):
+        self.db = get_database(db_path)
+        migrate(self.db, STORE_MIGRATIONS)
+        self.rules = tuple(rules)
+        self._lock = threading.Lock()
+        self._projections: Dict[Tuple[str, datetime.date], List[Dict]] = {}  # By currency and day made
+
+    def record(self, events: Iterable[Dict]) -> int:
+        """Remember fetched releases; returns how many were new or moved"""
+        rows = [(e["currency"], e["title"], date_to_day(e["datetime"].date()),
+                 e["datetime"].hour * 60 + e["datetime"].minute)
+                for e in events if not e.get("projected") and isinstance(e.get("datetime"), datetime.datetime)]
+        if not rows:
+            return 0
+        with self.db.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT INTO news_history (currency, title, day, minute) VALUES (?, ?, ?, ?)
+                ON CONFLICT(currency, title, day) DO UPDATE SET minute = excluded.minute
+                WHERE minute != excluded.minute
+            """, rows)
+            changed = conn.total_changes - before
+        if changed:
+            with self._lock:
+                self._projections.clear()
+        return changed
+
+    def recurrences(self, currency: str) -> List[Recurrence]:
+        """Rules for a currency's events: learned from history where it fits, built-in otherwise"""
+        releases: Dict[str, List[datetime.datetime]] = {}
+        for title, day, minute in self.db.fetchall("""
+            SELECT title, day, minute FROM news_history WHERE currency = ? ORDER BY title, day
+        """, (currency,)):
+            releases.setdefault(title, []).append(
+                datetime.datetime.combine(day_to_date(day), datetime.time(minute // 60, minute % 60)))
+        rules = {rule.title: rule for rule in self.rules if rule.currency == currency}
+        for title, times in releases.items():
+            learned = learn_recurrence(currency, title, times)
+            if learned:
+                rules[title] = learned
+        return list(rules.values())
+
+    def project(self, currency: str, today: Optional[datetime.date] = None,
+                days: int = LOOKAHEAD_DAYS) -> List[Dict]:
+        """Projected events from today for the coming days, computed once a day per currency"""
+        currency = currency.upper()
+        today = today or datetime.datetime.now(EASTERN).date()
+        key = (currency, today)
+        with self._lock:
+            cached = self._projections.get(key)
+        if cached is not None:
+            return cached
+        end = today + datetime.timedelta(days=days)
+        projected = []
+        for rule in self.recurrences(currency):
+            for date in rule.occurrences(today, end):
+                when = datetime.datetime.combine(date, rule.at)
+                projected.append({
+                    "title": rule.title,
+                    "datetime": when,
+                    "currency": currency,
+                    "time": when.strftime("%H:%M"),
+                    "day_name": when.strftime("%A"),
+                    "impact": "High",
+                    "projected": True,
+                })
+        projected.sort(key=lambda e: e["datetime"])
+        with self._lock:
+            # Other currencies' projections stay; only days that have passed are dropped
+            for stale in [k for k in self._projections if k[1] < today]:
+                del self._projections[stale]
+            self._projections[key] = projected
+        return projected
+
+    def merge(self, live: List[Dict], currency: str, covered_until: Optional[datetime.date] = None,
+              now: Optional[datetime.datetime] = None) -> List[Dict]:
+        """Live events plus upcoming projections the feed doesn't cover; covered_until is None when offline"""
+        now = now or datetime.datetime.now(EASTERN).replace(tzinfo=None)
+        seen = {(e["title"], e["datetime"].date()) for e in live}
+        projected = [e for e in self.project(currency, now.date())
+                     if e["datetime"] > now and (e["title"], e["datetime"].date()) not in seen
+                     and (covered_until is None or e["datetime"].date() > covered_until)]
+        return sorted(live + projected, key=lambda e: e["datetime"])
@@ -0,0 +1,94 @@
+"""
+Notes Index Module for PropFire
+FTS5 full-text indexes over journal notes, kept in sync by the repository
+write path
+"""
+
+import datetime
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+from database import ConnectionManager
+
+SNIPPET_TOKENS = 12
+
+@dataclass
+class SearchHit:
+    """One ranked search result"""
+    kind: str  # "trade" or "day"
+    ref_id: int  # Trade id or day number
+    date: datetime.date
+    title: str
+    snippet: str
+    pnl: float
+    rank: float  # bm25, lower is better
+
+def build_match_query(text: str) -> str:
+    """Turn free text into an FTS5 query: all words must match, the last as a prefix"""
+    phrases = re.findall(r'"([^"]+)"', text)
+    words = re.findall(r'\w+', re.sub(r'"[^"]*"?', ' ', text))
+    terms = ['"{}"'.format(" ".join(re.findall(r'\w+', phrase))) for phrase in phrases if re.search(r'\w', phrase)]
+    terms += [f'"{word}"' for word in words]
+    if not terms:
+        return ""
+    # Prefix-match the word being typed so results appear while typing
+    # (a trailing space or closing quote means the last word is finished)
+    if words and not text.endswith(' ') and not text.rstrip().endswith('"'):
+        terms[-1] += "*"
+    return " ".join(terms)
+
+class NotesIndex:
+    """External-content FTS5 table over text columns of a source table"""
+
+    def __init__(self, fts_table: str, source_table: str, rowid_column: str, columns: Sequence[str]):
+        self.fts_table = fts_table
+        self.source_table = source_table
+        self.rowid_column = rowid_column
+        self.columns = tuple(columns)
+
+    def add(self, conn: sqlite3.Connection, rowid: int, values: Sequence[str]):
+        """Index one row's text in the caller's transaction"""
+        placeholders = ", ".join("?" for _ in self.columns)
+        conn.execute(f"""
+            INSERT INTO {self.fts_table} (rowid, {", ".join(self.columns)}) VALUES (?, {placeholders})
+        """, (rowid, *values))
+
+    def remove(self, conn: sqlite3.Connection, rowid: int, values: Sequence[str]):
+        """Unindex a row; values must be exactly what was indexed for it"""
+        placeholders = ", ".join("?" for _ in self.columns)
+        conn.execute(f"""
+            INSERT INTO {self.fts_table} ({self.fts_table}, rowid, {", ".join(self.columns)})
+            VALUES ('delete', ?, {placeholders})
+        """, (rowid, *values))
+
+    def add_after(self, conn: sqlite3.Connection, last_rowid: int):
+        """Index every source row with a rowid above last_rowid, e.g. after a bulk insert"""
+        columns = ", ".join(self.columns)
+        conn.execute(f"""
+            INSERT INTO {self.fts_table} (rowid, {columns})
+            SELECT {self.rowid_column}, {columns} FROM {self.source_table} WHERE {self.rowid_column} > ?
+        """, (last_rowid,))
+
+    def search(self, db: ConnectionManager, text: str, select: str, limit: int = 50,
+               account_id: Optional[int] = None) -> List[tuple]:
+        """Ranked matches as (rowid, *select columns, snippet, rank); select uses the alias s"""
+        query = build_match_query(text)
+        if not query:
+            return []
+        account_filter = "AND s.account_id = ?" if account_id is not None else ""
+        return db.fetchall(f"""
+            SELECT s.{self.rowid_column}, {select},
+                   snippet({self.fts_table}, -1, '«', '»', '…', {SNIPPET_TOKENS}),
+                   bm25({self.fts_table}) AS rank
+            FROM {self.fts_table}
+            JOIN {self.source_table} s ON s.{self.rowid_column} = {self.fts_table}.rowid
+            WHERE {self.fts_table} MATCH ? {account_filter}
+            ORDER BY rank LIMIT ?
+        """, (query,) + ((account_id,) if account_id is not None else ()) + (limit,))
+
+def merge_hits(*hit_lists: List[SearchHit], limit: int = 50) -> List[SearchHit]:
+    """Combine results from several indexes by rank"""
+    hits = [hit for hits in hit_lists for hit in hits]
+    hits.sort(key=lambda hit: hit.rank)
+    return hits[:limit]
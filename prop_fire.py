@@ -4,18 +4,33 @@ import datetime
 import json
 import os
 from typing import Dict, List, Optional, Tuple
-import threading
 import time
 import pytz
 import webbrowser
 from news_api import NewsAPI
-from enhanced_journal import EnhancedJournalWindow, AccountSetupDialog
-from account_manager import AccountService
+from news_schedule import NewsSchedule, EASTERN, week_end
+from enhanced_journal import EnhancedJournalWindow, AccountSetupDialog, NewAccountDialog
+from equity_chart import EquityChartWindow
+from analytics import PerformanceAnalytics
+from rule_monitor import RuleMonitor, RuleStatus, BREACHED, WARNING
+from account_manager import AccountService, AccountSummary
+from database import close_all_databases
+from image_pipeline import shutdown_image_pipeline
+from write_queue import flush_write_queues
+from event_bus import get_event_bus, publish, EquityUpdated, NewsSnapshotChanged
+from backup import BackupService
+from worker_pool import get_worker_pool, shutdown_worker_pool, Channel, PRIORITY_NORMAL
 
 # Set customtkinter appearance
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# News fetches of every main window; only the newest one's result is shown
+NEWS_FETCHES = Channel("news")
+
+# Rotating backups of the store, shared by every main window
+STORE_BACKUPS = BackupService()
+
 class SplashScreen:
     def __init__(self, callback):
         self.callback = callback
@@ -171,6 +186,15 @@ class ConfigWindow:
         self.session_combo.set(self.settings["session"])
         self.session_combo.grid(row=2, column=1, sticky='ew', padx=(10, 20), pady=15)
         
+        # Prop firm selection (its loss rules are monitored)
+        ctk.CTkLabel(settings_container, text="Prop Firm:", 
+                    font=('Inter', 13, 'bold')).grid(row=3, column=0, sticky='w', padx=20, pady=15)
+        self.firm_combo = ctk.CTkComboBox(settings_container, 
+                                         values=list(self.prop_firms.keys()),
+                                         font=('Inter', 13), width=200, height=35)
+        self.firm_combo.set(self.settings.get("prop_firm", "FTMO"))
+        self.firm_combo.grid(row=3, column=1, sticky='ew', padx=(10, 20), pady=15)
+        
 
         
         # Button container in scrollable area - always visible
@@ -217,6 +241,7 @@ class ConfigWindow:
         self.settings["currency"] = self.currency_combo.get()
         self.settings["day"] = self.day_combo.get()
         self.settings["session"] = self.session_combo.get()
+        self.settings["prop_firm"] = self.firm_combo.get()
         
         # Close config window and start main app with news loading
         self.config_window.destroy()
@@ -234,9 +259,11 @@ class MainCountdownWindow:
         self.mock_news = mock_news
         self.config_callback = config_callback
         self.news_api = NewsAPI()
+        self.news_schedule = NewsSchedule()
         self.current_news_events = []
         self.api_error_message = None
         self.after_job = None
+        self.news_job = None
         self.drag_data = {"x": 0, "y": 0}
         self.session_start_times = {
             "London": "03:00",   # 8AM GMT = 3AM EST
@@ -245,11 +272,22 @@ class MainCountdownWindow:
             "Sydney": "17:00"    # 8AM AEDT = 5PM EST (previous day)
         }
         self.main_window = ctk.CTk()
+        # Data changes from any thread reach the views on this window's loop
+        self.event_bus = get_event_bus()
+        self.event_bus.attach(self.main_window)
         self.setup_main_window()
         self.create_main_widgets()
         self.setup_drag()
+        self.subscriptions = [
+            self.event_bus.subscribe(EquityUpdated, self.on_equity_updated),
+            self.event_bus.subscribe(NewsSnapshotChanged, self.on_news_changed)
+        ]
         # Load news when starting trading
         self.load_cached_news()
+        if not self.current_news_events:
+            # Projected releases keep the countdown going until the fetch finishes
+            self.current_news_events = self.news_schedule.merge([], self.settings["currency"])
+            self.update_news_table()
         self.fetch_live_news()
         self.update_timer()
         
@@ -363,6 +401,7 @@ class MainCountdownWindow:
         # Account & Equity section
         self.account_service = AccountService()
         self.create_equity_panel(right_column)
+        self.create_rules_panel(right_column)
         
         # Control buttons
         account_btn = ctk.CTkButton(right_column, text="💰 Set Account Size", 
@@ -380,6 +419,14 @@ class MainCountdownWindow:
                                       command=self.open_trading_journal)
         journal_button.pack(pady=5)
         
+        # Equity chart button
+        chart_button = ctk.CTkButton(right_column, text="📈 Equity Chart", 
+                                    font=('Inter', 12, 'bold'), 
+                                    width=140, height=35,
+                                    fg_color='#6f42c1', hover_color='#5a32a3',
+                                    command=self.open_equity_chart)
+        chart_button.pack(pady=5)
+        
         # Sticky footer spanning both columns - BOTTOM MOST
         footer_frame = ctk.CTkFrame(main_container, fg_color='transparent')
         footer_frame.grid(row=4, column=0, columnspan=2, sticky='ew', pady=(10, 0))
@@ -397,11 +444,31 @@ class MainCountdownWindow:
         try:
             if hasattr(self, 'after_job') and self.after_job:
                 self.main_window.after_cancel(self.after_job)
+            self.rule_monitor.close()
+            self.close_subscriptions()
+            STORE_BACKUPS.cancel()
             self.main_window.quit()
             self.main_window.destroy()
+            # A running attachment copy or thumbnail finishes, queued ones are dropped;
+            # first, so nothing it hands on is still pending when the queues flush
+            shutdown_image_pipeline()
+            # Queued background jobs are dropped; running ones (an import) get to finish
+            if not shutdown_worker_pool(timeout=30):
+                print("DEBUG: Exiting with background jobs still running")
+            # Queued journal saves are committed before the connections close
+            if not flush_write_queues(timeout=30):
+                print("DEBUG: Exiting with journal writes still pending")
+            close_all_databases()
         except Exception as e:
             print(f"Exit error: {e}")
         
+    def close_subscriptions(self):
+        """Stop receiving events and drop the pending news fetch before the window goes away"""
+        self.news_job.cancel()
+        for unsubscribe in self.subscriptions:
+            unsubscribe()
+        self.event_bus.detach(self.main_window)
+        
     def setup_drag(self):
         """Setup window dragging functionality"""
         self.main_window.bind("<Button-1>", self.start_drag)
@@ -423,39 +490,55 @@ class MainCountdownWindow:
         try:
             if hasattr(self, 'after_job') and self.after_job:
                 self.main_window.after_cancel(self.after_job)
+            self.rule_monitor.close()
+            self.close_subscriptions()
             self.main_window.destroy()
             self.config_callback()
         except Exception as e:
             print(f"Settings transition error: {e}")
         
     def fetch_live_news(self):
-        """Fetch live news data from API in background thread"""
+        """Fetch live news data from API on the worker pool"""
+        currency = self.settings["currency"]
+        
         def fetch_news():
-            try:
-                print(f"DEBUG: Fetching news for {self.settings['currency']} in {self.settings['session']} session")
-                events = self.news_api.get_high_impact_news(
-                    self.settings["currency"], 
-                    self.settings["session"]
-                )
-                if events:
-                    self.current_news_events = events
-                    self.api_error_message = None
-                    print(f"DEBUG: Successfully fetched {len(events)} news events")
-                    # Update table only when new events are fetched
-                    self.update_news_table()
-                else:
-                    self.current_news_events = []
-                    self.api_error_message = None
-                    print(f"DEBUG: No news events found, will use session fallback")
-                    self.update_news_table()
-            except Exception as e:
-                self.api_error_message = f"API Error: {str(e)}"
-                self.current_news_events = []
-                print(f"DEBUG: News fetch error: {e}")
-                
-        # Run in background thread to avoid blocking UI
-        thread = threading.Thread(target=fetch_news, daemon=True)
-        thread.start()
+            print(f"DEBUG: Fetching news for {currency} in {self.settings['session']} session")
+            events = self.news_api.get_high_impact_news(
+                currency, 
+                self.settings["session"]
+            )
+            if events:
+                print(f"DEBUG: Successfully fetched {len(events)} news events")
+            else:
+                print(f"DEBUG: No news events found, will use session fallback")
+            if self.news_api.last_error is not None:
+                # Offline: projected releases stand in for the whole feed
+                print(f"DEBUG: News feed unreachable ({self.news_api.last_error}), using projected events")
+                return self.news_schedule.merge([], currency)
+            self.news_schedule.record(events)
+            # The feed covers this week; projections fill in the weeks after it
+            covered = week_end(datetime.datetime.now(EASTERN).date())
+            return self.news_schedule.merge(events or [], currency, covered)
+            
+        def on_error(e):
+            print(f"DEBUG: News fetch error: {e}")
+            publish(NewsSnapshotChanged(self.news_schedule.merge([], currency), f"API Error: {str(e)}"))
+            
+        # A newer fetch (a refresh, or a new window after settings) supersedes this one,
+        # so a slow stale response never replaces the table; the update reaches the UI thread
+        # through the event bus
+        self.news_job = get_worker_pool().submit(
+            fetch_news, "news fetch", PRIORITY_NORMAL, NEWS_FETCHES,
+            on_done=lambda events: publish(NewsSnapshotChanged(events)), on_error=on_error)
+        
+    def on_news_changed(self, events: List[NewsSnapshotChanged]):
+        """Show a finished news fetch and cache it"""
+        snapshot = events[-1]
+        self.current_news_events = snapshot.events
+        self.api_error_message = snapshot.error
+        if snapshot.error is None:
+            self.save_news_cache()
+        self.update_news_table()
         
     def get_next_news_event(self) -> Optional[Dict]:
         """Find the next available high-impact news event"""
@@ -529,7 +612,7 @@ class MainCountdownWindow:
                 news_release_est = event["datetime"].replace(tzinfo=est_tz)
                 
                 if news_release_est > now_est:
-                    event_name = event["title"]
+                    event_name = event["title"] + (" (projected)" if event.get("projected") else "")
                     return news_release_est.replace(tzinfo=None), f"Next {selected_day}: {event_name}"
         
         # Fallback to session start
@@ -610,6 +693,11 @@ class MainCountdownWindow:
             local_time, est_time = self.get_current_times()
             self.time_label.configure(text=f"Local: {local_time} | {est_time}")
             
+            # Snapshots may have been appended by an EA since the last tick
+            self.rule_monitor.poll()
+            # Daily store backup on the worker pool; cheap when none is due
+            STORE_BACKUPS.run_if_due()
+            
             # Check if selected day has passed
             if self.is_selected_day_passed():
                 self.timer_label.configure(text="EVENT PASSED", text_color='#ff4444')
@@ -659,13 +747,19 @@ class MainCountdownWindow:
                     currency = event.get('currency', 'N/A')
                     title = event.get('title', event.get('name', 'Economic Event'))
                     impact = event.get('impact', 'Medium')
+                    if event.get('projected'):
+                        # Several weeks ahead, so the date matters too
+                        time_str = event['datetime'].strftime("%d %b %H:%M")
+                        impact_cell = ('◌ Projected', '#ffaa00')
+                    else:
+                        impact_cell = ('🔴 High' if impact == 'High' else impact, '#ff4444' if impact == 'High' else '#ffaa00')
                     
                     # Create cells with borders for table structure
                     cells_data = [
                         (time_str, '#ffffff'),
                         (currency, '#ffffff'),
                         (title[:40] + '...' if len(title) > 40 else title, '#ffffff'),
-                        ('🔴 High' if impact == 'High' else impact, '#ff4444' if impact == 'High' else '#ffaa00')
+                        impact_cell
                     ]
                     
                     for j, (text, color) in enumerate(cells_data):
@@ -720,7 +814,6 @@ class MainCountdownWindow:
         print("DEBUG: Manual news refresh initiated")
         self.current_news_events = []
         self.fetch_live_news()
-        self.save_news_cache()
     
     def load_cached_news(self):
         """Load cached news data"""
@@ -748,7 +841,8 @@ class MainCountdownWindow:
         try:
             cache_data = {
                 'timestamp': datetime.datetime.now().isoformat(),
-                'events': self.current_news_events
+                # Projections are recomputed, not cached
+                'events': [e for e in self.current_news_events if not e.get('projected')]
             }
             with open('news_cache.json', 'w') as f:
                 json.dump(cache_data, f)
@@ -777,15 +871,24 @@ class MainCountdownWindow:
                                    text_color='#ff6b35')
         equity_title.pack(pady=(10, 5))
         
-        # Current equity display
-        current_equity = self.account_service.get_current_equity()
-        starting_balance = self.account_service.repository.get_starting_balance() or 10000.0
+        # Account switcher; each account keeps its own journal and equity
+        account_row = ctk.CTkFrame(equity_container, fg_color="transparent")
+        account_row.pack(padx=5, pady=(0, 5))
         
-        equity_text = f"Starting: ${starting_balance:,.2f}\n"
-        equity_text += f"Current: ${current_equity:,.2f}\n"
-        equity_text += f"P&L: ${current_equity - starting_balance:+,.2f}"
+        self.account_menu = ctk.CTkOptionMenu(account_row, values=[""], 
+                                             font=('Inter', 11), width=110,
+                                             command=self.on_account_selected)
+        self.account_menu.pack(side='left', padx=(0, 5))
         
-        color = '#00FF00' if current_equity >= starting_balance else '#FF4444'
+        new_account_btn = ctk.CTkButton(account_row, text="➕", 
+                                       font=('Inter', 12), 
+                                       width=30, height=28,
+                                       command=self.open_new_account)
+        new_account_btn.pack(side='left')
+        self.refresh_account_menu()
+        
+        # Current equity display
+        equity_text, color = self._equity_summary_text()
         
         self.equity_label = ctk.CTkLabel(equity_container, text=equity_text, 
                                         font=('Inter', 12), 
@@ -793,27 +896,127 @@ class MainCountdownWindow:
                                         justify='center')
         self.equity_label.pack(padx=5, pady=(0, 10))
     
+    def refresh_account_menu(self):
+        """List the accounts and select the active one"""
+        self._accounts = {account.name: account.id for account in self.account_service.list_accounts()}
+        self.account_menu.configure(values=list(self._accounts))
+        self.account_menu.set(self.account_service.get_summary().name)
+    
+    def on_account_selected(self, name: str):
+        """Switch the panels over to another account"""
+        account_id = self._accounts.get(name)
+        if account_id is None or account_id == self.account_service.repository.account_id:
+            return
+        self.account_service.switch_account(account_id)
+        self.on_account_switched()
+    
+    def open_new_account(self):
+        """Open the new account dialog"""
+        NewAccountDialog(self.account_service, self.on_account_switched)
+    
+    def on_account_switched(self):
+        """Re-point the equity and rule panels at the active account"""
+        self.refresh_account_menu()
+        self.rule_monitor.close()
+        self.start_rule_monitor()
+        self.refresh_equity_display()
+    
+    def create_rules_panel(self, parent):
+        """Create prop firm rule headroom panel, updated as equity changes"""
+        firm = self.settings.get("prop_firm", "FTMO")
+        rules_container = ctk.CTkFrame(parent, corner_radius=8)
+        rules_container.pack(fill='x', padx=5, pady=5)
+        
+        rules_title = ctk.CTkLabel(rules_container, text=f"{firm} Rules", 
+                                  font=('Inter', 14, 'bold'), 
+                                  text_color='#ff6b35')
+        rules_title.pack(pady=(10, 5))
+        
+        self.rules_label = ctk.CTkLabel(rules_container, text="", 
+                                       font=('Inter', 12), 
+                                       justify='left')
+        self.rules_label.pack(padx=5, pady=(0, 10))
+        self.start_rule_monitor()
+    
+    def start_rule_monitor(self):
+        """Watch the active account's equity against the selected firm's rules"""
+        firm = self.settings.get("prop_firm", "FTMO")
+        self.rule_monitor = RuleMonitor(self.prop_firms.get(firm, {}), self.account_service.repository)
+        # Writes commit on other threads; hand the update to the UI thread
+        self.rule_monitor.subscribe(
+            lambda statuses, worse: self.main_window.after(0, lambda: self.on_rules_changed(statuses, worse)))
+        self.show_rule_statuses(self.rule_monitor.check())
+    
+    def show_rule_statuses(self, statuses: List[RuleStatus]):
+        """Show remaining headroom under each rule, colored by the worst one"""
+        if not statuses:
+            self.rules_label.configure(text="No loss limits defined", text_color='#888888')
+            return
+        lines = []
+        for status in statuses:
+            if status.name == "Trading days":
+                lines.append(f"{status.name}: {status.used:.0f}/{status.limit:.0f}")
+            else:
+                lines.append(f"{status.name}: ${status.remaining:,.2f} left")
+        levels = {status.level for status in statuses}
+        color = '#FF4444' if BREACHED in levels else '#FFB000' if WARNING in levels else '#00FF00'
+        self.rules_label.configure(text="\n".join(lines), text_color=color)
+    
+    def on_rules_changed(self, statuses: List[RuleStatus], worse: List[RuleStatus]):
+        """Refresh the panels after an equity change and warn about rules nearing a breach"""
+        if not self.main_window.winfo_exists():
+            return
+        self.show_rule_statuses(statuses)
+        if worse:
+            message = "\n".join(
+                f"{status.name}: {'BREACHED' if status.level == BREACHED else 'close to the limit'} "
+                f"(${status.used:,.2f} of ${status.limit:,.2f} used)"
+                for status in worse)
+            messagebox.showwarning("Prop Firm Rules", message)
+    
     def open_account_setup(self):
         """Open account setup dialog"""
-        AccountSetupDialog(self.account_service, self.refresh_equity_display)
+        AccountSetupDialog(self.account_service)
     
     def open_trading_journal(self):
         """Open Enhanced Trading Journal window"""
         journal = EnhancedJournalWindow()
         journal.show()
     
-    def refresh_equity_display(self):
-        """Refresh equity display after account changes"""
-        current_equity = self.account_service.get_current_equity()
-        starting_balance = self.account_service.repository.get_starting_balance() or 10000.0
+    def _equity_summary_text(self, summary: Optional[AccountSummary] = None) -> Tuple[str, str]:
+        """Equity panel text and color from an account summary (the in-memory one by default)"""
+        summary = summary or self.account_service.get_summary()
         
-        equity_text = f"Starting: ${starting_balance:,.2f}\n"
-        equity_text += f"Current: ${current_equity:,.2f}\n"
-        equity_text += f"P&L: ${current_equity - starting_balance:+,.2f}"
+        equity_text = f"Starting: ${summary.starting_balance:,.2f}\n"
+        equity_text += f"Current: ${summary.current_equity:,.2f}\n"
+        equity_text += f"Peak: ${summary.high_water_mark:,.2f}\n"
+        equity_text += f"P&L: ${summary.total_pnl:+,.2f}"
         
-        color = '#00FF00' if current_equity >= starting_balance else '#FF4444'
+        rollup = self.account_service.get_rollup()
+        if len(rollup.accounts) > 1:
+            equity_text += f"\nAll accounts: ${rollup.current_equity:,.2f} ({rollup.total_pnl:+,.2f})"
+        
+        color = '#00FF00' if summary.total_pnl >= 0 else '#FF4444'
+        return equity_text, color
+    
+    def open_equity_chart(self):
+        """Open the equity curve chart"""
+        EquityChartWindow(PerformanceAnalytics(account_id=self.account_service.repository.account_id))
+    
+    def refresh_equity_display(self, summary: Optional[AccountSummary] = None):
+        """Refresh equity display after account changes"""
+        equity_text, color = self._equity_summary_text(summary)
         self.equity_label.configure(text=equity_text, text_color=color)
     
+    def on_equity_updated(self, events: List[EquityUpdated]):
+        """Show the new summary carried by an equity change of the displayed account"""
+        account_id = self.account_service.repository.account_id
+        for event in events:
+            if event.account_id == account_id:
+                self.refresh_equity_display(event.summary)
+            else:
+                self.refresh_equity_display()  # Only the all-accounts line moved
+    
     def open_coffee_link(self):
         """Open Buy Me Coffee link in browser"""
         webbrowser.open('https://www.buymeacoffee.com/traderndumia')
@@ -853,6 +1056,7 @@ class PropFireApp:
             "currency": "USD",
             "day": "Tuesday",
             "session": "London",
+            "prop_firm": "FTMO",
             "dark_mode": True
         }
         
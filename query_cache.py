@@ -0,0 +1,134 @@
+"""
+Query Cache Module for PropFire
+Thread-safe, size-bounded LRU of repository query results keyed by the day
+range they cover, invalidated write-through when a write to that range commits
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, Tuple
+from database import ConnectionManager
+
+MAX_ENTRIES = 512
+MAX_WEIGHT = 200000  # Total rows held across all entries
+ALL_DAYS = (0, 1 << 31)  # Range of results that depend on the whole history
+
+@dataclass
+class CacheStats:
+    """Counters for one cache"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    weight: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups served from memory"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+def _weight(value: Any) -> int:
+    """Rough size of a cached result: its row count, at least 1"""
+    try:
+        return max(1, len(value))
+    except TypeError:
+        return 1
+
+class QueryCache:
+    """LRU of (namespace, first day, last day, *args) -> result for one database"""
+
+    def __init__(self, db: ConnectionManager, max_entries: int = MAX_ENTRIES, max_weight: int = MAX_WEIGHT):
+        self.db = db
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self._entries: "OrderedDict[tuple, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by every invalidation and patch
+        self._stats = CacheStats()
+
+    def get(self, namespace: str, day_range: Tuple[int, int], loader: Callable[[], Any],
+            *args: Hashable) -> Any:
+        """Cached result for a query over an inclusive day range, loading it on a miss"""
+        key = (namespace, day_range[0], day_range[1]) + args
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return entry[0]
+            self._stats.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        # Results read inside an open transaction may never commit, and a load
+        # that raced an invalidation may predate the write; neither is kept
+        if self.db.in_transaction():
+            return value
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, value)
+        return value
+
+    def _store(self, key: tuple, value: Any):
+        """Insert an entry and evict least recently used ones past the limits"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._stats.weight -= old[1]
+        weight = _weight(value)
+        self._entries[key] = (value, weight)
+        self._stats.weight += weight
+        while self._entries and (len(self._entries) > self.max_entries or self._stats.weight > self.max_weight):
+            _, (_, evicted_weight) = self._entries.popitem(last=False)
+            self._stats.weight -= evicted_weight
+            self._stats.evictions += 1
+
+    def patch(self, namespace: str, day_range: Tuple[int, int], update: Callable[[Any], Any],
+              *args: Hashable):
+        """Replace a cached result with update(result), e.g. to show a write that is still queued"""
+        key = (namespace, day_range[0], day_range[1]) + args
+        with self._lock:
+            # Loads already in flight read the database before this change
+            self._generation += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._store(key, update(entry[0]))
+
+    def invalidate(self, first_day: int, last_day: Optional[int] = None):
+        """Drop results overlapping a day range once the current transaction commits"""
+        last_day = first_day if last_day is None else last_day
+        self.db.on_commit(lambda: self._invalidate_now(first_day, last_day))
+
+    def _invalidate_now(self, first_day: int, last_day: int):
+        """Drop every entry whose day range overlaps [first_day, last_day]"""
+        with self._lock:
+            self._generation += 1
+            stale = [key for key in self._entries if key[1] <= last_day and key[2] >= first_day]
+            for key in stale:
+                self._stats.weight -= self._entries.pop(key)[1]
+            self._stats.invalidations += len(stale)
+
+    def clear(self):
+        """Drop every entry once the current transaction commits"""
+        self.invalidate(*ALL_DAYS)
+
+    def stats(self) -> CacheStats:
+        """Snapshot of the counters"""
+        with self._lock:
+            self._stats.entries = len(self._entries)
+            return CacheStats(**vars(self._stats))
+
+_caches: "weakref.WeakKeyDictionary[ConnectionManager, QueryCache]" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+def get_query_cache(db: ConnectionManager) -> QueryCache:
+    """Get the cache shared by every repository on a database"""
+    with _caches_lock:
+        cache = _caches.get(db)
+        if cache is None:
+            cache = _caches[db] = QueryCache(db)
+        return cache
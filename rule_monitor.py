@@ -0,0 +1,149 @@
+"""
+Rule Monitor Module for PropFire
+Evaluates a prop firm's loss, drawdown and trading-day rules against the
+equity ledger. Day-start equity, high-water mark and trading-day count are
+kept current by the ledger as writes commit, so a check never rescans history.
+Where intraday equity snapshots are recorded, losses are judged on the day's low.
+"""
+
+import datetime
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from account_manager import AccountRepository
+from database import date_to_day
+from equity_snapshots import get_snapshot_store, day_bounds
+
+WARN_AT = 0.8  # Share of a limit used before warning
+
+OK = "ok"
+WARNING = "warning"
+BREACHED = "breached"
+
+@dataclass
+class RuleStatus:
+    """Headroom left under one rule"""
+    name: str
+    limit: float  # Allowed loss in account currency, or days required
+    used: float
+    level: str = OK
+
+    @property
+    def remaining(self) -> float:
+        """Loss still allowed, or days still to trade"""
+        return max(0.0, self.limit - self.used)
+
+    @property
+    def used_ratio(self) -> float:
+        """Share of the limit used"""
+        return self.used / self.limit if self.limit else 0.0
+
+@dataclass
+class AccountState:
+    """Running figures the rules are checked against"""
+    starting_balance: float
+    equity: float
+    day_start_equity: float  # Equity at the previous close
+    high_water_mark: float
+    trading_days: int
+    intraday_low: Optional[float] = None  # Lowest snapshot equity of the day, if any were recorded
+
+    @property
+    def worst_equity(self) -> float:
+        """Equity that losses are judged on: the close, or the intraday low if lower"""
+        return self.equity if self.intraday_low is None else min(self.equity, self.intraday_low)
+
+def _loss_rule(name: str, percent: float, base: float, floor_from: float, equity: float) -> RuleStatus:
+    """Status of a rule allowing `percent` of `base` to be lost below `floor_from`"""
+    limit = base * percent / 100
+    used = max(0.0, floor_from - equity)
+    return RuleStatus(name, limit, used, _level(used, limit))
+
+def _level(used: float, limit: float) -> str:
+    """Severity for a share of a limit"""
+    if used >= limit:
+        return BREACHED
+    return WARNING if used >= limit * WARN_AT else OK
+
+def evaluate_rules(rules: Dict, state: AccountState) -> List[RuleStatus]:
+    """Check every rule a firm defines (percentages of the starting balance, daily drawdown of the day's start)"""
+    statuses = []
+    equity = state.worst_equity
+    if "max_daily_loss" in rules:
+        statuses.append(_loss_rule("Daily loss", rules["max_daily_loss"], state.starting_balance,
+                                   state.day_start_equity, equity))
+    if "max_daily_drawdown" in rules:
+        statuses.append(_loss_rule("Daily drawdown", rules["max_daily_drawdown"], state.day_start_equity,
+                                   state.day_start_equity, equity))
+    if "max_overall_loss" in rules:
+        statuses.append(_loss_rule("Overall loss", rules["max_overall_loss"], state.starting_balance,
+                                   state.starting_balance, equity))
+    if "max_overall_drawdown" in rules:
+        # Trailing: the floor rises with the high-water mark
+        statuses.append(_loss_rule("Overall drawdown", rules["max_overall_drawdown"], state.starting_balance,
+                                   state.high_water_mark, equity))
+    if "min_trading_days" in rules:
+        # A requirement to reach rather than a limit to stay under, so never a warning
+        statuses.append(RuleStatus("Trading days", rules["min_trading_days"], state.trading_days))
+    return statuses
+
+class RuleMonitor:
+    """Watches the equity ledger and re-checks a firm's rules after every committed write"""
+
+    def __init__(self, rules: Dict, account: Optional[AccountRepository] = None):
+        self.rules = rules
+        self.account = account or AccountRepository()
+        self.snapshots = get_snapshot_store(self.account.db, self.account.account_id)
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[List[RuleStatus], List[RuleStatus]], None]] = []
+        # Only rules that get worse from here on are reported
+        self._levels: Dict[str, str] = {s.name: s.level for s in self.check()}
+        self.account.ledger.add_listener(self._on_change)
+
+    def state(self, date: Optional[datetime.date] = None) -> AccountState:
+        """Running figures at the close of a date (today by default) in O(log n)"""
+        date = date or datetime.date.today()
+        day = date_to_day(date)
+        ledger = self.account.ledger
+        summary = self.account.get_summary()
+        day_start = summary.starting_balance + ledger.cumulative(day - 1)
+        extremes = self.snapshots.extremes(*day_bounds(date))
+        return AccountState(
+            starting_balance=summary.starting_balance,
+            equity=day_start + ledger.day_pnl(day),
+            day_start_equity=day_start,
+            high_water_mark=summary.high_water_mark,
+            trading_days=ledger.trading_days(),
+            intraday_low=extremes[0] if extremes else None
+        )
+
+    def check(self, date: Optional[datetime.date] = None) -> List[RuleStatus]:
+        """Status of every rule at the close of a date (today by default)"""
+        return evaluate_rules(self.rules, self.state(date))
+
+    def subscribe(self, callback: Callable[[List[RuleStatus], List[RuleStatus]], None]):
+        """Call back with (all statuses, rules that just got worse) after each change, on the writing thread"""
+        self._callbacks.append(callback)
+
+    def poll(self):
+        """Re-check if snapshots were appended since the last look (they may come from another process)"""
+        if self.snapshots.refresh():
+            self._on_change()
+
+    def close(self):
+        """Stop watching the ledger"""
+        self.account.ledger.remove_listener(self._on_change)
+        self._callbacks.clear()
+
+    def _on_change(self):
+        """Re-check after a write and report rules that moved towards a breach"""
+        statuses = self.check()
+        severity = {OK: 0, WARNING: 1, BREACHED: 2}
+        with self._lock:
+            worse = [s for s in statuses if severity[s.level] > severity[self._levels.get(s.name, OK)]]
+            self._levels = {s.name: s.level for s in statuses}
+        for callback in list(self._callbacks):
+            try:
+                callback(statuses, worse)
+            except Exception as e:
+                print(f"DEBUG: Rule monitor callback error: {e}")
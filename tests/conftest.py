@@ -0,0 +1,18 @@
+"""
+Shared fixtures for the PropFire tests
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import close_all_databases
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """Empty working directory for a store and its side files, closed again afterwards"""
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    close_all_databases()
@@ -0,0 +1,73 @@
+"""
+Tests for the vectorized performance statistics
+"""
+
+import datetime
+import math
+import statistics
+import numpy as np
+import pytest
+from analytics import PerformanceAnalytics, drawdown, risk_ratios, streaks, trade_stats
+from database import date_to_day
+from enhanced_journal import EnhancedJournalRepository, TradeEntry
+
+def test_trade_stats_match_plain_sums():
+    pnl = np.array([100.0, -50.0, 0.0, 200.0, -25.0])
+    r = np.array([2.0, -1.0, np.nan, 4.0, np.nan])
+    stats = trade_stats(pnl, r)
+    assert (stats["trade_count"], stats["wins"], stats["losses"]) == (5, 2, 2)
+    assert stats["net_pnl"] == 225.0
+    assert stats["win_rate"] == 0.5  # Breakeven trades are not decided
+    assert (stats["avg_win"], stats["avg_loss"]) == (150.0, -37.5)
+    assert stats["expectancy"] == 45.0
+    assert stats["profit_factor"] == 4.0
+    assert stats["avg_r"] == pytest.approx(5.0 / 3)
+    assert trade_stats(np.array([10.0]), np.array([np.nan]))["profit_factor"] == math.inf
+    assert trade_stats(np.array([]), np.array([])) == {}
+
+def test_streaks_skip_breakeven_trades():
+    assert streaks(np.array([1.0, 2.0, 0.0, 3.0, -1.0, -1.0, 5.0, -2.0, -2.0, -2.0, -2.0])) == (3, 4, -4)
+    assert streaks(np.array([1.0, -1.0, 1.0, 1.0])) == (2, 1, 2)
+    assert streaks(np.array([0.0, 0.0])) == (0, 0, 0)
+
+def test_drawdown_depth_and_duration():
+    days = np.array([0, 1, 2, 3, 4, 10, 11])
+    equity = np.array([100.0, 120.0, 90.0, 110.0, 125.0, 100.0, 105.0])
+    depth, depth_pct, duration = drawdown(days, equity)
+    assert depth == 30.0
+    assert depth_pct == pytest.approx(0.25)
+    # 120 on day 1 recovered on day 4 (3 days); 125 on day 4 still open on day 11 (7 days)
+    assert duration == 7
+    assert drawdown(days[:1], equity[:1]) == (0.0, 0.0, 0)
+
+def test_risk_ratios_match_statistics():
+    returns = np.array([0.01, -0.02, 0.015, 0.005, -0.01])
+    sharpe, sortino = risk_ratios(returns)
+    assert sharpe == pytest.approx(statistics.mean(returns) / statistics.stdev(returns) * math.sqrt(252))
+    downside = math.sqrt(sum(min(r, 0.0) ** 2 for r in returns) / len(returns))
+    assert sortino == pytest.approx(statistics.mean(returns) / downside * math.sqrt(252))
+    assert risk_ratios(np.array([0.01])) == (0.0, 0.0)
+
+def test_stats_from_the_store_follow_new_trades(store_dir):
+    journal = EnhancedJournalRepository()
+    journal.account.set_starting_balance(1000.0)
+    journal.save_trade(TradeEntry(date=datetime.date(2025, 3, 3), pnl=100.0, direction="Long",
+                                  entry_price=1.10, exit_price=1.12, stop_loss=1.09))
+    journal.save_trade(TradeEntry(date=datetime.date(2025, 3, 4), pnl=-200.0, direction="Short",
+                                  entry_price=1.10, exit_price=1.11, stop_loss=1.11))
+    analytics = PerformanceAnalytics()
+    stats = analytics.get_stats()
+    assert (stats.trade_count, stats.net_pnl, stats.current_streak) == (2, -100.0, -1)
+    assert stats.avg_r == pytest.approx((2.0 - 1.0) / 2)
+    # The first day's gain counts towards the peak the drawdown starts from
+    assert (stats.max_drawdown, stats.max_drawdown_pct) == (200.0, pytest.approx(200.0 / 1100.0))
+
+    journal.save_trade(TradeEntry(date=datetime.date(2025, 3, 5), pnl=50.0))
+    assert analytics.get_stats().trade_count == 3
+    march_4 = analytics.get_stats(datetime.date(2025, 3, 4), datetime.date(2025, 3, 4))
+    assert (march_4.trade_count, march_4.net_pnl) == (1, -200.0)
+
+    journal.account.set_starting_balance(2000.0)
+    equity = analytics.load_equity()
+    assert list(equity.days) == [date_to_day(datetime.date(2025, 3, d)) for d in (3, 4, 5)]
+    assert list(equity.equity) == [2100.0, 1900.0, 1950.0]
@@ -0,0 +1,101 @@
+"""
+Tests for taking, rotating, verifying and restoring store backups
+"""
+
+import gzip
+import os
+import sqlite3
+import pytest
+from backup import BackupService
+
+def make_store(path, rows):
+    """Small database with one table of numbered rows"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, note TEXT)")
+    conn.execute("DELETE FROM entries")
+    conn.executemany("INSERT INTO entries (note) VALUES (?)", [(f"row {i}",) for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+def row_count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    finally:
+        conn.close()
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "propfire.db")
+    make_store(path, 100)
+    return path
+
+def test_backup_is_compressed_and_verified(store):
+    service = BackupService(store)
+    result = service.run()
+    assert os.path.basename(result.path).startswith("propfire-")
+    assert result.row_counts == {"entries": 100}
+    assert service.verify(result.path, result.row_counts)
+    assert service.backups() == [result.path]
+
+def test_quick_successive_backups_never_overwrite(store):
+    service = BackupService(store, keep=10)
+    paths = [service.run().path for _ in range(3)]
+    assert len(set(paths)) == 3
+    assert service.backups() == sorted(paths, reverse=True)
+
+def test_rotation_keeps_the_newest(store):
+    service = BackupService(store, keep=2)
+    paths = [service.run().path for _ in range(4)]
+    assert service.backups() == [paths[3], paths[2]]
+
+def test_corrupt_backup_fails_verification(store):
+    service = BackupService(store)
+    path = service.run().path
+    with open(path, 'r+b') as f:
+        f.seek(os.path.getsize(path) // 2)
+        f.write(b"\0" * 64)
+    assert not service.verify(path)
+    make_store(store, 7)
+    with pytest.raises(sqlite3.DatabaseError):
+        service.restore(path)
+    assert row_count(store) == 7
+
+def test_restore_replaces_the_store_and_keeps_the_current_one(store):
+    service = BackupService(store, keep=5)
+    backup = service.run().path
+    make_store(store, 7)
+
+    service.restore(backup)
+    assert row_count(store) == 100
+    # The replaced store was backed up first
+    newest = service.backups()[0]
+    assert newest != backup
+    with gzip.open(newest, 'rb') as src, open(store + ".pre", 'wb') as dst:
+        dst.write(src.read())
+    assert row_count(store + ".pre") == 7
+
+def test_restore_decompresses_the_backup_once(store, monkeypatch):
+    service = BackupService(store)
+    backup = service.run().path
+    os.remove(store)  # Nothing to back up first, so every read is of the restored file
+    opened = []
+    real_open = gzip.open
+
+    def counting_open(path, *args, **kwargs):
+        opened.append(path)
+        return real_open(path, *args, **kwargs)
+    monkeypatch.setattr(gzip, "open", counting_open)
+    service.restore(backup)
+    assert opened == [backup]
+    assert row_count(store) == 100
+
+def test_restoring_the_oldest_backup_survives_rotation(store):
+    service = BackupService(store, keep=2)
+    oldest = service.run().path
+    service.run()
+    make_store(store, 3)
+
+    service.restore(oldest)
+    assert row_count(store) == 100
+    assert os.path.exists(oldest)
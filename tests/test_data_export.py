@@ -0,0 +1,69 @@
+"""
+Tests for streaming exports of trades, daily totals and the equity curve
+"""
+
+import csv
+import datetime
+import json
+import os
+import pytest
+import data_export
+from account_manager import AccountRepository
+from data_export import export_dataset, export_all
+from enhanced_journal import EnhancedJournalRepository, TradeEntry
+
+@pytest.fixture
+def journal(store_dir):
+    journal = EnhancedJournalRepository()
+    journal.account.set_starting_balance(1000.0)
+    for day, pnl in ((1, 100.0), (1, -30.0), (4, 50.0), (5, -20.0), (8, 10.0)):
+        journal.save_trade(TradeEntry(date=datetime.date(2025, 3, day), pnl=pnl, instrument="EURUSD",
+                                      notes=f"trade on the {day}"))
+    return journal
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def test_trades_are_streamed_in_day_order(journal, store_dir):
+    result = export_dataset("trades", str(store_dir / "out"), chunk_size=2)
+    assert (result.rows, os.path.basename(result.path)) == (5, "trades.csv")
+    rows = read_csv(result.path)
+    assert [row["date"] for row in rows] == ["2025-03-01", "2025-03-01", "2025-03-04", "2025-03-05", "2025-03-08"]
+    assert float(rows[1]["pnl"]) == -30.0
+
+def test_date_range_is_inclusive(journal, store_dir):
+    result = export_dataset("trade_days", str(store_dir / "out"),
+                            start=datetime.date(2025, 3, 4), end=datetime.date(2025, 3, 5))
+    assert [(row["date"], float(row["pnl"])) for row in read_csv(result.path)] == [
+        ("2025-03-04", 50.0), ("2025-03-05", -20.0)]
+
+def test_equity_includes_the_starting_balance(journal, store_dir):
+    result = export_dataset("equity", str(store_dir / "out"), fmt="jsonl", start=datetime.date(2025, 3, 4))
+    with open(result.path) as f:
+        rows = [json.loads(line) for line in f]
+    # Equity before the range still counts
+    assert [(row["date"], row["equity"]) for row in rows] == [
+        ("2025-03-04", 1120.0), ("2025-03-05", 1100.0), ("2025-03-08", 1110.0)]
+
+def test_exports_follow_the_account(journal, store_dir):
+    other = AccountRepository().create_account("Challenge", 5000.0)
+    EnhancedJournalRepository(account=AccountRepository(account_id=other.id)).save_trade(
+        TradeEntry(date=datetime.date(2025, 3, 2), pnl=7.0))
+    result = export_dataset("trades", str(store_dir / "out"), account_id=other.id)
+    assert [float(row["pnl"]) for row in read_csv(result.path)] == [7.0]
+
+def test_failed_export_leaves_no_file(journal, store_dir, monkeypatch):
+    def broken(self, rows):
+        raise OSError("disk full")
+    monkeypatch.setattr(data_export.CsvWriter, "write", broken)
+    with pytest.raises(OSError):
+        export_dataset("trades", str(store_dir / "out"))
+    assert os.listdir(store_dir / "out") == []
+
+def test_unknown_format_and_missing_sources(journal, store_dir):
+    with pytest.raises(ValueError):
+        export_dataset("trades", str(store_dir / "out"), fmt="xlsx")
+    # No news cache in the store directory: skipped rather than failing
+    assert [result.dataset for result in export_all(str(store_dir / "out"))] == [
+        "trades", "trade_days", "journal_days", "equity"]
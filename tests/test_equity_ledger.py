@@ -0,0 +1,117 @@
+"""
+Tests for the equity ledger's Fenwick and peak trees and the ledger kept over them
+"""
+
+import datetime
+import random
+from account_manager import AccountRepository
+from database import date_to_day
+from equity_ledger import FenwickTree, PeakTree, get_equity_ledger, MIN_CAPACITY
+
+def naive_peak(values):
+    """Highest running total, never below zero"""
+    best = running = 0.0
+    for value in values:
+        running += value
+        best = max(best, running)
+    return best
+
+def test_fenwick_prefix_sums_follow_updates():
+    rng = random.Random(1)
+    values = [rng.uniform(-100, 100) for _ in range(300)]
+    tree = FenwickTree(values)
+    for _ in range(200):
+        index, delta = rng.randrange(len(values)), rng.uniform(-50, 50)
+        values[index] += delta
+        tree.add(index, delta)
+    for index in (0, 1, 7, 150, 299):
+        assert abs(tree.prefix_sum(index) - sum(values[:index + 1])) < 1e-6
+    assert tree.prefix_sum(-1) == 0.0
+    assert abs(tree.prefix_sum(10_000) - sum(values)) < 1e-6
+
+def test_peak_tree_tracks_highest_prefix_sum():
+    rng = random.Random(2)
+    values = [rng.uniform(-100, 100) for _ in range(256)]
+    tree = PeakTree(values)
+    assert abs(tree.peak() - naive_peak(values)) < 1e-6
+    for _ in range(300):
+        index, value = rng.randrange(len(values)), rng.uniform(-100, 100)
+        values[index] = value
+        tree.set(index, value)
+        assert abs(tree.peak() - naive_peak(values)) < 1e-6
+
+def test_peak_is_zero_when_always_losing():
+    assert PeakTree([-1.0, -2.0, -3.0, 0.0]).peak() == 0.0
+    assert PeakTree([]).peak() == 0.0
+
+def test_ledger_follows_back_dated_edits(store_dir):
+    account = AccountRepository()
+    start = datetime.date(2025, 1, 1)
+    pnl = {start + datetime.timedelta(days=i): float(i % 7 - 3) * 10 for i in range(60)}
+    account.set_daily_pnl(pnl)
+    ledger = account.ledger
+    ledger.cumulative(date_to_day(start))  # Loaded, so later writes go through apply()
+
+    edits = {start + datetime.timedelta(days=5): 500.0, start + datetime.timedelta(days=40): -250.0}
+    account.set_daily_pnl(edits)
+    pnl.update(edits)
+
+    running = 0.0
+    for date in sorted(pnl):
+        running += pnl[date]
+        assert abs(ledger.cumulative(date_to_day(date)) - running) < 1e-6
+    total, peak, last_day = ledger.snapshot()
+    assert abs(total - sum(pnl.values())) < 1e-6
+    assert abs(peak - naive_peak([pnl[d] for d in sorted(pnl)])) < 1e-6
+    assert last_day == date_to_day(max(pnl))
+    assert ledger.trading_days() == sum(1 for value in pnl.values() if value)
+
+def test_ledger_grows_past_its_capacity(store_dir):
+    account = AccountRepository()
+    first = datetime.date(2020, 1, 1)
+    account.set_daily_pnl({first: 100.0})
+    ledger = account.ledger
+    assert ledger.total() == 100.0
+    far = first + datetime.timedelta(days=MIN_CAPACITY * 3)
+    earlier = first - datetime.timedelta(days=MIN_CAPACITY)
+    account.set_daily_pnl({far: 50.0, earlier: -20.0})
+    assert ledger.cumulative(date_to_day(earlier)) == -20.0
+    assert ledger.cumulative(date_to_day(first)) == 80.0
+    assert ledger.cumulative(date_to_day(far)) == 130.0
+    assert ledger.snapshot() == (130.0, 130.0, date_to_day(far))
+
+def test_empty_ledger_lays_out_only_the_days_held(store_dir):
+    account = AccountRepository()
+    ledger = account.ledger
+    assert ledger.total() == 0.0  # Loaded while empty
+    day = datetime.date(2025, 3, 3)
+    account.set_daily_pnl({day: 75.0})
+    # Not a tree from day 0 up to today
+    assert ledger._tree.size == MIN_CAPACITY
+    assert ledger.cumulative(date_to_day(day)) == 75.0
+    assert ledger.cumulative(date_to_day(day) - 1) == 0.0
+
+def test_ledger_matches_a_fresh_load(store_dir):
+    account = AccountRepository()
+    rng = random.Random(3)
+    start = datetime.date(2024, 6, 1)
+    account.ledger.total()
+    for _ in range(50):
+        date = start + datetime.timedelta(days=rng.randrange(400))
+        account.set_daily_pnl({date: round(rng.uniform(-300, 300), 2)})
+    total, peak, last_day = account.ledger.snapshot()
+    account.ledger.reset()
+    fresh_total, fresh_peak, fresh_last_day = account.ledger.snapshot()
+    # Incremental updates and a fresh load sum in different orders
+    assert abs(fresh_total - total) < 1e-6
+    assert abs(fresh_peak - peak) < 1e-6
+    assert fresh_last_day == last_day
+
+def test_ledgers_are_per_account(store_dir):
+    main = AccountRepository()
+    other = AccountRepository(account_id=main.create_account("Challenge", 5000.0).id)
+    main.set_daily_pnl({datetime.date(2025, 2, 3): 100.0})
+    other.set_daily_pnl({datetime.date(2025, 2, 3): -40.0})
+    assert get_equity_ledger(main.db, main.account_id).total() == 100.0
+    assert get_equity_ledger(other.db, other.account_id).total() == -40.0
+    assert other.get_summary().current_equity == 4960.0
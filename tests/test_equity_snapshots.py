@@ -0,0 +1,113 @@
+"""
+Tests for searching intraday equity snapshots and rolling them up into the equity curve
+"""
+
+import datetime
+import random
+import numpy as np
+import pytest
+import equity_snapshots
+from account_manager import AccountRepository
+from database import date_to_day
+from equity_snapshots import SnapshotStore, day_bounds
+from event_bus import get_event_bus, EquityUpdated
+
+@pytest.fixture
+def store(store_dir, monkeypatch):
+    # Small blocks, so a few hundred snapshots exercise the block summaries
+    monkeypatch.setattr(equity_snapshots, "BLOCK_SIZE", 16)
+    account = AccountRepository()
+    snapshots = SnapshotStore(account.db, account.account_id, str(store_dir / "snapshots" / "account_1.bin"))
+    yield snapshots
+    snapshots.close()
+
+def day_series(date, count, seed):
+    """Snapshots spread over the trading hours of a day"""
+    rng = random.Random(seed)
+    start = datetime.datetime.combine(date, datetime.time(8)).timestamp()
+    return [(start + i * 60.0, 100000.0, 100000.0 + rng.uniform(-500, 500)) for i in range(count)]
+
+def test_window_search_matches_a_scan(store):
+    series = day_series(datetime.date(2025, 3, 3), 500, seed=1)
+    store.extend(series)
+    rng = random.Random(2)
+    for _ in range(50):
+        a, b = sorted(rng.uniform(series[0][0] - 600, series[-1][0] + 600) for _ in range(2))
+        wanted = [s for s in series if a <= s[0] < b]
+        found = store.between(a, b)
+        assert len(found) == len(wanted)
+        if wanted:
+            assert store.extremes(a, b) == (min(s[2] for s in wanted), max(s[2] for s in wanted))
+            assert float(found["ts"][0]) == wanted[0][0]
+        else:
+            assert store.extremes(a, b) is None
+
+def test_exact_boundaries_are_half_open(store):
+    series = day_series(datetime.date(2025, 3, 3), 64, seed=3)
+    store.extend(series)
+    first, last = series[0][0], series[-1][0]
+    assert len(store.between(first, last)) == 63
+    assert len(store.between(first, last + 1)) == 64
+    assert len(store.between(last + 1, last + 100)) == 0
+
+def test_snapshots_must_be_in_time_order(store):
+    store.extend(day_series(datetime.date(2025, 3, 3), 10, seed=4))
+    with pytest.raises(ValueError):
+        store.append(100000.0, 99000.0, timestamp=0.0)
+
+def test_finished_days_are_rolled_up(store):
+    monday, tuesday = datetime.date(2025, 3, 3), datetime.date(2025, 3, 4)
+    store.extend(day_series(monday, 100, seed=5))
+    store.extend(day_series(tuesday, 100, seed=6))  # The first snapshot of Tuesday closes Monday
+    low, high = store.extremes(*day_bounds(monday))
+    assert store.db.fetchone("""
+        SELECT pnl, intraday_low, intraday_high FROM equity_curve WHERE account_id = ? AND day = ?
+    """, (store.account_id, date_to_day(monday))) == (0.0, low, high)
+    # Both days lie before today, so Tuesday is finished as well; nothing is written twice
+    assert store.db.fetchone("SELECT intraday_low FROM equity_curve WHERE day = ?",
+                             (date_to_day(tuesday),)) == (store.extremes(*day_bounds(tuesday))[0],)
+    assert store.rollup() == 0
+    # Equity itself is unchanged by the zero-P&L rows
+    assert AccountRepository().ledger.total() == 0.0
+
+def test_rollup_moves_the_ledger_and_tells_views(store):
+    account = AccountRepository()
+    monday, wednesday = datetime.date(2025, 3, 3), datetime.date(2025, 3, 5)
+    account.set_daily_pnl({monday: 250.0})
+    assert account.get_summary().last_update == monday
+    events = []
+    unsubscribe = get_event_bus().subscribe(EquityUpdated, events.extend)
+    try:
+        store.extend(day_series(wednesday, 10, seed=10))
+        assert store.rollup(until=wednesday + datetime.timedelta(days=1)) == 1
+    finally:
+        unsubscribe()
+    # A quiet day with snapshots is now the latest on the curve, as a fresh load sees it
+    summary = account.get_summary()
+    assert (summary.last_update, account.ledger.total()) == (wednesday, 250.0)
+    account.ledger.reset()
+    assert account.get_summary().last_update == wednesday
+    assert [(e.days, e.summary.last_update) for e in events] == [
+        (frozenset({date_to_day(wednesday)}), wednesday)]
+
+def test_today_is_not_rolled_up(store):
+    today = datetime.date(2025, 3, 4)
+    store.extend(day_series(today - datetime.timedelta(days=1), 10, seed=8))
+    store.close()
+    quiet = SnapshotStore(store.db, store.account_id, store.path)
+    quiet.extend(day_series(today, 10, seed=9))
+    quiet.db.execute("DELETE FROM equity_curve")
+    assert quiet.rollup(until=today) == 1
+    assert quiet.db.fetchone("SELECT 1 FROM equity_curve WHERE day = ?", (date_to_day(today),)) is None
+    quiet.close()
+
+def test_latest_and_reopen(store):
+    series = day_series(datetime.date(2025, 3, 3), 40, seed=7)
+    store.extend(series)
+    store.close()
+    reopened = SnapshotStore(store.db, store.account_id, store.path)
+    assert reopened.latest() == series[-1]
+    reopened.append(100000.0, 101000.0, timestamp=series[-1][0] + 60)
+    assert store.refresh()
+    assert np.isclose(store.latest()[2], 101000.0)
+    reopened.close()
@@ -0,0 +1,125 @@
+"""
+Tests for per-frame event delivery, merging and batching on the event bus
+"""
+
+import datetime
+import pytest
+from enhanced_journal import EnhancedJournalRepository, TradeEntry
+from event_bus import EventBus, EquityUpdated, NewsSnapshotChanged, TradeDeleted, TradeSaved, get_event_bus
+
+class FakeWidget:
+    """Stands in for a Tk widget: holds after() callbacks until the test runs the frame"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+    def run_frame(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback in scheduled:
+            callback()
+
+@pytest.fixture
+def bus():
+    return EventBus()
+
+def test_without_a_widget_events_are_delivered_right_away(bus):
+    received = []
+    bus.subscribe(NewsSnapshotChanged, received.append)
+    bus.publish(NewsSnapshotChanged(error="offline"))
+    assert received == [[NewsSnapshotChanged(error="offline")]]
+
+def test_one_frame_merges_events_about_the_same_thing(bus):
+    widget = FakeWidget()
+    bus.attach(widget)
+    received = []
+    bus.subscribe(EquityUpdated, received.append)
+    bus.publish(EquityUpdated(1, "first", frozenset({10})))
+    bus.publish(EquityUpdated(2, "other account", frozenset({10})))
+    bus.publish(EquityUpdated(1, "second", frozenset({11}), rebased=True))
+    assert received == [] and len(widget.scheduled) == 1  # One frame scheduled for all three
+    widget.run_frame()
+    assert received == [[EquityUpdated(2, "other account", frozenset({10})),
+                         EquityUpdated(1, "second", frozenset({10, 11}), rebased=True)]]
+
+def test_batches_keep_the_order_across_types(bus):
+    widget = FakeWidget()
+    bus.attach(widget)
+    order = []
+    bus.subscribe(TradeDeleted, lambda batch: order.append(("deleted", len(batch))))
+    bus.subscribe(NewsSnapshotChanged, lambda batch: order.append(("news", len(batch))))
+    day = datetime.date(2025, 3, 3)
+    bus.publish(TradeDeleted(1, 5, day))
+    bus.publish(TradeDeleted(1, 6, day))
+    bus.publish(NewsSnapshotChanged())
+    bus.publish(TradeDeleted(1, 7, day))
+    widget.run_frame()
+    assert order == [("deleted", 2), ("news", 1), ("deleted", 1)]
+
+def test_a_later_event_replaces_one_of_another_type(bus):
+    received = []
+    bus.subscribe(TradeSaved, received.extend)
+    bus.subscribe(TradeDeleted, received.extend)
+    widget = FakeWidget()
+    bus.attach(widget)
+    trade = TradeEntry(date=datetime.date(2025, 3, 3), pnl=10.0, id=9)
+    bus.publish(TradeSaved(1, trade))
+    bus.publish(TradeDeleted(1, 9, trade.date))  # Same trade: only the delete is left
+    widget.run_frame()
+    assert received == [TradeDeleted(1, 9, trade.date)]
+
+def test_unsubscribed_and_unwanted_events_are_dropped(bus):
+    received = []
+    unsubscribe = bus.subscribe(NewsSnapshotChanged, received.append)
+    unsubscribe()
+    unsubscribe()  # Twice is harmless
+    bus.publish(NewsSnapshotChanged())
+    assert received == []
+
+def test_a_failing_handler_does_not_stop_the_others(bus):
+    received = []
+    bus.subscribe(NewsSnapshotChanged, lambda batch: 1 / 0)
+    bus.subscribe(NewsSnapshotChanged, received.append)
+    bus.publish(NewsSnapshotChanged())
+    assert len(received) == 1
+
+def test_detaching_delivers_what_is_pending(bus):
+    widget = FakeWidget()
+    bus.attach(widget)
+    received = []
+    bus.subscribe(NewsSnapshotChanged, received.append)
+    bus.publish(NewsSnapshotChanged())
+    bus.detach(widget)
+    assert len(received) == 1
+    widget.run_frame()  # The stale frame finds nothing left to deliver
+    assert len(received) == 1
+
+def test_a_destroyed_widget_falls_back_to_direct_delivery(bus):
+    class Destroyed:
+        def after(self, ms, callback):
+            raise RuntimeError("application has been destroyed")
+    bus.attach(Destroyed())
+    received = []
+    bus.subscribe(NewsSnapshotChanged, received.append)
+    bus.publish(NewsSnapshotChanged())
+    assert len(received) == 1
+    bus.publish(NewsSnapshotChanged())
+    assert len(received) == 2
+
+def test_events_follow_commits_only(store_dir):
+    journal = EnhancedJournalRepository()
+    received = []
+    unsubscribe = get_event_bus().subscribe(TradeSaved, received.extend)
+    try:
+        with pytest.raises(RuntimeError):
+            with journal.db.transaction():
+                journal.save_trade(TradeEntry(date=datetime.date(2025, 3, 3), pnl=10.0))
+                raise RuntimeError("rolled back")
+        assert received == []
+        trade_id = journal.save_trade(TradeEntry(date=datetime.date(2025, 3, 3), pnl=10.0))
+    finally:
+        unsubscribe()
+    assert [event.trade.id for event in received] == [trade_id]
+    assert received[0].totals[datetime.date(2025, 3, 3)].pnl == 10.0
@@ -0,0 +1,81 @@
+"""
+Tests for content-addressed chart images, their refcounts and garbage collection
+"""
+
+import datetime
+import os
+import threading
+import time
+import pytest
+from PIL import Image
+from enhanced_journal import EnhancedJournalRepository, TradeEntry
+
+@pytest.fixture
+def journal(store_dir):
+    return EnhancedJournalRepository()
+
+def make_png(path, color):
+    Image.new("RGB", (320, 200), color).save(path)
+    return str(path)
+
+def add_and_wait(images, source):
+    """Stage an image and wait for its background copy and thumbnails"""
+    ready = threading.Event()
+    path = images.add(source, lambda info: ready.set())
+    assert ready.wait(10)
+    return path
+
+def refcount(journal, path):
+    row = journal.db.fetchone("SELECT refcount FROM image_blobs WHERE path = ?", (path,))
+    return row[0] if row else None
+
+def test_identical_images_share_one_blob(journal, store_dir):
+    first = add_and_wait(journal.images, make_png(store_dir / "a.png", "red"))
+    second = add_and_wait(journal.images, make_png(store_dir / "b.png", "red"))
+    other = add_and_wait(journal.images, make_png(store_dir / "c.png", "blue"))
+    assert first == second != other
+    assert os.path.exists(first)
+    assert journal.images.get_dimensions(first) == (320, 200)
+    assert journal.db.fetchone("SELECT COUNT(*) FROM image_blobs")[0] == 2
+
+def test_trades_hold_references(journal, store_dir):
+    path = add_and_wait(journal.images, make_png(store_dir / "a.png", "red"))
+    day = datetime.date(2025, 3, 3)
+    first = journal.save_trade(TradeEntry(date=day, pnl=50.0, chart_image=path))
+    second = journal.save_trade(TradeEntry(date=day, pnl=-20.0, chart_image=path))
+    assert refcount(journal, path) == 2
+
+    trade = journal.get_trade(first)
+    trade.chart_image = ""
+    journal.save_trade(trade)
+    assert refcount(journal, path) == 1
+    journal.delete_trade(second)
+    assert refcount(journal, path) == 0
+
+def test_gc_removes_only_released_blobs_past_the_grace_period(journal, store_dir):
+    kept = add_and_wait(journal.images, make_png(store_dir / "a.png", "red"))
+    dropped = add_and_wait(journal.images, make_png(store_dir / "b.png", "blue"))
+    journal.save_trade(TradeEntry(date=datetime.date(2025, 3, 3), pnl=10.0, chart_image=kept))
+
+    # Just staged: the grace period protects it from a concurrent save
+    assert journal.images.collect_garbage() == (0, 0)
+    removed, freed = journal.images.collect_garbage(grace=-1)
+    assert removed == 1 and freed > 0
+    assert not os.path.exists(dropped)
+    assert os.path.exists(kept)
+    assert refcount(journal, dropped) is None
+
+def test_gc_removes_stray_object_files(journal, store_dir):
+    path = add_and_wait(journal.images, make_png(store_dir / "a.png", "red"))
+    journal.db.execute("DELETE FROM image_blobs")
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+    assert journal.images.collect_garbage()[0] == 1
+    assert not os.path.exists(path)
+
+def test_rebuilt_refcounts_follow_the_trades(journal, store_dir):
+    path = add_and_wait(journal.images, make_png(store_dir / "a.png", "red"))
+    journal.save_trade(TradeEntry(date=datetime.date(2025, 3, 3), pnl=10.0, chart_image=path))
+    journal.db.execute("UPDATE image_blobs SET refcount = 7")
+    journal.rebuild_image_refcounts()
+    assert refcount(journal, path) == 1
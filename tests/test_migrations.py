@@ -0,0 +1,96 @@
+"""
+Tests for the store migrations, including the merge of the per-feature database files
+"""
+
+import hashlib
+import json
+import sqlite3
+from database import get_database, DEFAULT_ACCOUNT_ID
+from migrations import migrate, get_schema_version, table_columns, STORE_MIGRATIONS, STORE_PATH
+
+def create_legacy_files(directory):
+    """Per-feature files as the first releases wrote them: TEXT dates, one row per day"""
+    conn = sqlite3.connect(directory / "trading_journal.db")
+    conn.execute("CREATE TABLE daily_entries (date TEXT PRIMARY KEY, pnl REAL NOT NULL, "
+                 "gross REAL DEFAULT 0, fees REAL DEFAULT 0, notes TEXT DEFAULT '')")
+    conn.executemany("INSERT INTO daily_entries VALUES (?, ?, ?, ?, ?)", [
+        ("2024-03-01", 120.0, 125.0, 5.0, "faded the London open"),
+        ("2024-03-04", -80.0, -75.0, 5.0, "chased NFP"),
+        ("not a date", 1.0, 1.0, 0.0, ""),
+    ])
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(directory / "enhanced_journal.db")
+    conn.execute("CREATE TABLE trade_entries (date TEXT PRIMARY KEY, pnl REAL NOT NULL, "
+                 "entry_price REAL DEFAULT 0, stop_loss REAL DEFAULT 0, take_profit REAL DEFAULT 0, "
+                 "risk_reward REAL DEFAULT 0, notes TEXT DEFAULT '', chart_image TEXT DEFAULT '')")
+    conn.executemany("INSERT INTO trade_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+        ("2024-03-01", 120.0, 1.085, 1.080, 1.095, 2.0, "EURUSD breakout", "journal_images\\2024-03-01.png"),
+        ("2024-03-04", -80.0, 1.090, 1.085, 1.100, 2.0, "stopped out", ""),
+    ])
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(directory / "propfire_account.db")
+    conn.execute("CREATE TABLE equity_curve (date TEXT PRIMARY KEY, equity REAL NOT NULL, pnl REAL DEFAULT 0)")
+    conn.executemany("INSERT INTO equity_curve VALUES (?, ?, ?)", [
+        ("2024-03-01", 120.0, 120.0),
+        ("2024-03-04", 40.0, -80.0),
+    ])
+    conn.commit()
+    conn.close()
+
+    (directory / "account_config.json").write_text(json.dumps({"starting_balance": 0}))
+
+def file_digests(directory):
+    """Content hash of every file in a directory"""
+    return {path.name: hashlib.sha256(path.read_bytes()).hexdigest() for path in directory.iterdir()}
+
+def test_fresh_store_reaches_the_latest_version(store_dir):
+    db = get_database(STORE_PATH)
+    version = migrate(db, STORE_MIGRATIONS)
+    assert version == max(migration.version for migration in STORE_MIGRATIONS)
+    assert get_schema_version(db.connection()) == version
+    assert "account_id" in table_columns(db.connection(), "trades")
+    assert table_columns(db.connection(), "equity_curve") == [
+        "account_id", "day", "pnl", "intraday_low", "intraday_high"]
+    assert db.fetchone("SELECT id, name FROM accounts") == (DEFAULT_ACCOUNT_ID, "Main")
+
+def test_migrate_is_a_no_op_when_current(store_dir):
+    db = get_database(STORE_PATH)
+    version = migrate(db, STORE_MIGRATIONS)
+    before = db.connection().total_changes
+    assert migrate(db, STORE_MIGRATIONS) == version
+    assert db.connection().total_changes == before
+
+def test_legacy_files_are_merged(store_dir):
+    create_legacy_files(store_dir)
+    db = get_database(STORE_PATH)
+    migrate(db, STORE_MIGRATIONS)
+
+    assert db.fetchall("SELECT account_id, pnl, notes FROM daily_entries ORDER BY day") == [
+        (DEFAULT_ACCOUNT_ID, 120.0, "faded the London open"), (DEFAULT_ACCOUNT_ID, -80.0, "chased NFP")]
+    assert db.fetchall("SELECT pnl, notes FROM trades ORDER BY day") == [(120.0, "EURUSD breakout"),
+                                                                        (-80.0, "stopped out")]
+    assert db.fetchall("SELECT pnl FROM equity_curve ORDER BY day") == [(120.0,), (-80.0,)]
+    # A starting balance of 0 is a real balance, not a missing one
+    assert db.fetchone("SELECT starting_balance FROM accounts") == (0.0,)
+
+    # Aggregates and notes indexes are rebuilt over the merged rows
+    assert db.fetchone("SELECT pnl, trade_count, wins, losses FROM trade_months WHERE key = 202403") == (
+        40.0, 2, 1, 1)
+    assert db.fetchone("SELECT pnl FROM journal_years WHERE key = 2024") == (40.0,)
+    assert db.fetchone("SELECT rowid FROM journal_notes_fts WHERE journal_notes_fts MATCH 'fade'")
+    assert db.fetchone("SELECT rowid FROM trade_notes_fts WHERE trade_notes_fts MATCH 'breakout'")
+    assert db.fetchone("SELECT refcount FROM image_blobs") == (1,)
+
+def test_legacy_files_are_left_untouched(store_dir):
+    create_legacy_files(store_dir)
+    before = file_digests(store_dir)
+    migrate(get_database(STORE_PATH), STORE_MIGRATIONS)
+    after = file_digests(store_dir)
+    assert {name: after[name] for name in before} == before
+    # Nothing but the store itself (and its WAL files) appears next to them
+    assert {name for name in after if name not in before} <= {
+        STORE_PATH, STORE_PATH + "-wal", STORE_PATH + "-shm"}
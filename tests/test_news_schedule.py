@@ -0,0 +1,77 @@
+"""
+Tests for learning release recurrences and projecting upcoming events
+"""
+
+import datetime
+from news_schedule import Recurrence, NewsSchedule, learn_recurrence, week_end
+
+def releases(*dates, at=datetime.time(8, 30)):
+    return [datetime.datetime.combine(datetime.date.fromisoformat(d), at) for d in dates]
+
+def test_learns_a_weekly_release():
+    rule = learn_recurrence("USD", "Unemployment Claims",
+                            releases("2025-01-02", "2025-01-09", "2025-01-16", "2025-01-30"))
+    assert (rule.kind, rule.weekday, rule.at, rule.source) == ("weekly", 3, datetime.time(8, 30), "history")
+
+def test_learns_the_nth_weekday():
+    rule = learn_recurrence("USD", "Non-Farm Employment Change",
+                            releases("2025-01-03", "2025-02-07", "2025-03-07"))
+    assert (rule.kind, rule.weekday, rule.nth) == ("nth_weekday", 4, 1)
+    assert list(rule.occurrences(datetime.date(2025, 4, 1), datetime.date(2025, 5, 31))) == [
+        datetime.date(2025, 4, 4), datetime.date(2025, 5, 2)]
+
+def test_fifth_weekday_is_learned_as_the_last():
+    rule = learn_recurrence("USD", "Month End", releases("2024-03-29", "2024-05-31"))
+    assert (rule.kind, rule.nth) == ("nth_weekday", -1)
+    # Never spills into the next month, as a literal fifth Friday would in June
+    assert list(rule.occurrences(datetime.date(2024, 6, 1), datetime.date(2024, 7, 31))) == [
+        datetime.date(2024, 6, 28), datetime.date(2024, 7, 26)]
+
+def test_learns_roughly_the_same_day_of_month():
+    rule = learn_recurrence("USD", "CPI m/m", releases("2025-01-14", "2025-02-12", "2025-03-12"))
+    assert (rule.kind, rule.day) == ("month_day", 12)
+
+def test_irregular_or_sparse_history_learns_nothing():
+    assert learn_recurrence("USD", "Speech", releases("2025-01-15")) is None
+    assert learn_recurrence("USD", "Speech", releases("2025-01-03", "2025-01-21", "2025-03-28")) is None
+
+def test_month_day_moves_off_weekends():
+    rule = Recurrence("USD", "CPI m/m", "month_day", datetime.time(8, 30), day=12)
+    # 12 April 2025 is a Saturday
+    assert list(rule.occurrences(datetime.date(2025, 4, 1), datetime.date(2025, 4, 30))) == [
+        datetime.date(2025, 4, 14)]
+
+def test_week_end_is_saturday():
+    assert week_end(datetime.date(2025, 1, 6)) == datetime.date(2025, 1, 11)
+    assert week_end(datetime.date(2025, 1, 11)) == datetime.date(2025, 1, 11)
+
+def test_history_overrides_the_built_in_rule(store_dir):
+    schedule = NewsSchedule()
+    events = [{"currency": "USD", "title": "CPI m/m", "datetime": when}
+              for when in releases("2025-01-14", "2025-02-12", "2025-03-12")]
+    assert schedule.record(events) == 3
+    assert schedule.record(events) == 0
+    rules = {rule.title: rule for rule in schedule.recurrences("USD")}
+    assert rules["CPI m/m"].source == "history"
+    assert rules["Unemployment Claims"].source == "rule"
+
+def test_projections_are_cached_per_currency(store_dir):
+    schedule = NewsSchedule()
+    today = datetime.date(2025, 1, 6)
+    usd = schedule.project("USD", today)
+    cad = schedule.project("CAD", today)
+    assert schedule.project("USD", today) is usd
+    assert schedule.project("CAD", today) is cad
+    assert all(event["projected"] and event["currency"] == "USD" for event in usd)
+    # A new day drops the stale projections
+    schedule.project("USD", today + datetime.timedelta(days=1))
+    assert schedule.project("CAD", today + datetime.timedelta(days=1)) is not cad
+
+def test_merge_prefers_fetched_events(store_dir):
+    schedule = NewsSchedule()
+    now = datetime.datetime(2025, 1, 6, 7, 0)
+    live = [{"title": "Unemployment Claims", "datetime": datetime.datetime(2025, 1, 9, 8, 30), "currency": "USD"}]
+    merged = schedule.merge(live, "USD", covered_until=datetime.date(2025, 1, 11), now=now)
+    claims = [e for e in merged if e["title"] == "Unemployment Claims"]
+    assert claims[0] is live[0]
+    assert all(e["datetime"].date() > datetime.date(2025, 1, 11) for e in claims[1:])
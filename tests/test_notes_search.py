@@ -0,0 +1,66 @@
+"""
+Tests for full-text search over trade and daily journal notes
+"""
+
+import datetime
+import pytest
+from account_manager import AccountRepository
+from enhanced_journal import EnhancedJournalRepository, TradeEntry
+from notes_index import build_match_query, merge_hits
+from trading_journal import JournalRepository
+
+DAY = datetime.date(2025, 3, 3)
+
+@pytest.fixture
+def journal(store_dir):
+    return EnhancedJournalRepository()
+
+def ids(hits):
+    return sorted(hit.ref_id for hit in hits)
+
+def test_match_query_building():
+    assert build_match_query("london fade") == '"london" "fade"*'
+    assert build_match_query('"london open" fade ') == '"london open" "fade"'
+    assert build_match_query('fade "london open"') == '"london open" "fade"'
+    assert build_match_query("  ;; ") == ""
+
+def test_stemming_prefixes_and_diacritics(journal):
+    first = journal.save_trade(TradeEntry(date=DAY, pnl=50.0, instrument="EURUSD", notes="Fading the London open"))
+    second = journal.save_trade(TradeEntry(date=DAY, pnl=-20.0, instrument="GER40", notes="Zürich data surprise"))
+    assert ids(journal.search_notes("fade")) == [first]
+    assert ids(journal.search_notes("lond")) == [first]  # Prefix while typing
+    assert ids(journal.search_notes("zurich")) == [second]
+    assert ids(journal.search_notes("ger40")) == [second]  # Instruments are indexed too
+    assert journal.search_notes("") == []
+    hit = journal.search_notes("london")[0]
+    assert (hit.kind, hit.date, hit.pnl, hit.title) == ("trade", DAY, 50.0, "EURUSD")
+    assert "«London»" in hit.snippet
+
+def test_edits_and_deletes_are_reindexed(journal):
+    trade_id = journal.save_trade(TradeEntry(date=DAY, pnl=50.0, notes="revenge trade after news"))
+    trade = journal.get_trade(trade_id)
+    trade.notes = "patient pullback entry"
+    journal.save_trade(trade)
+    assert journal.search_notes("revenge") == []
+    assert ids(journal.search_notes("pullback")) == [trade_id]
+    journal.delete_trade(trade_id)
+    assert journal.search_notes("pullback") == []
+
+def test_search_is_scoped_to_the_account(journal):
+    other = EnhancedJournalRepository(
+        account=AccountRepository(account_id=AccountRepository().create_account("Challenge", 5000.0).id))
+    mine = journal.save_trade(TradeEntry(date=DAY, pnl=1.0, notes="breakout"))
+    other.save_trade(TradeEntry(date=DAY, pnl=2.0, notes="breakout"))
+    assert ids(journal.search_notes("breakout")) == [mine]
+
+def test_daily_notes_and_merged_ranking(journal, store_dir):
+    days = JournalRepository()
+    days.update_daily_pnl(DAY, 120.0, notes="followed the plan, no FOMO")
+    days.update_daily_pnl(DAY, 120.0, notes="followed the plan")
+    journal.save_trade(TradeEntry(date=DAY, pnl=5.0, notes="plan"))
+    day_hits = days.search_notes("plan")
+    assert [(hit.kind, hit.date) for hit in day_hits] == [("day", DAY)]
+    assert days.search_notes("fomo") == []
+    merged = merge_hits(day_hits, journal.search_notes("plan"), limit=5)
+    assert {hit.kind for hit in merged} == {"day", "trade"}
+    assert [hit.rank for hit in merged] == sorted(hit.rank for hit in merged)
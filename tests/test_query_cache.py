@@ -0,0 +1,102 @@
+"""
+Tests for the day-range query cache, its invalidation and optimistic patches
+"""
+
+import datetime
+import pytest
+from database import get_database
+from enhanced_journal import EnhancedJournalRepository, TradeEntry
+from query_cache import QueryCache, ALL_DAYS
+
+@pytest.fixture
+def cache(store_dir):
+    return QueryCache(get_database(str(store_dir / "cache.db")), max_entries=3, max_weight=10)
+
+def counting_loader(value):
+    """Loader that records how often it ran"""
+    def load():
+        load.calls += 1
+        return value
+    load.calls = 0
+    return load
+
+def test_hits_after_the_first_load(cache):
+    load = counting_loader([1, 2])
+    assert cache.get("rows", (1, 5), load) == [1, 2]
+    assert cache.get("rows", (1, 5), load) == [1, 2]
+    assert cache.get("rows", (1, 5), load, "other account") == [1, 2]
+    stats = cache.stats()
+    assert (load.calls, stats.hits, stats.misses, stats.entries, stats.weight) == (2, 1, 2, 2, 4)
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for day in (1, 2, 3):
+        cache.get("n", (day, day), lambda: day)
+    cache.get("n", (1, 1), lambda: 1)  # Day 1 is now the most recent
+    cache.get("n", (4, 4), lambda: 4)
+    load = counting_loader(2)
+    cache.get("n", (2, 2), load)
+    assert load.calls == 1
+    assert cache.stats().evictions == 2  # Day 2, then day 3 to fit day 2 back in
+
+def test_weight_limit_bounds_large_results(cache):
+    cache.get("big", (1, 1), lambda: list(range(8)))
+    cache.get("big", (2, 2), lambda: list(range(8)))
+    stats = cache.stats()
+    assert (stats.entries, stats.weight, stats.evictions) == (1, 8, 1)
+
+def test_invalidation_drops_overlapping_ranges(cache):
+    cache.get("day", (5, 5), lambda: "day 5")
+    cache.get("month", (1, 30), lambda: "month")
+    cache.get("day", (40, 40), lambda: "day 40")
+    cache.invalidate(5)
+    assert cache.stats().entries == 1
+    load = counting_loader("day 40")
+    cache.get("day", (40, 40), load)
+    assert load.calls == 0
+    cache.clear()
+    assert cache.stats().entries == 0
+
+def test_invalidation_waits_for_the_commit(cache):
+    cache.get("day", (5, 5), lambda: "old")
+    with pytest.raises(RuntimeError):
+        with cache.db.transaction():
+            cache.invalidate(5)
+            raise RuntimeError("rolled back")
+    assert cache.stats().entries == 1
+    with cache.db.transaction():
+        cache.invalidate(*ALL_DAYS)
+        assert cache.stats().entries == 1
+        # Reads inside the open transaction are served but never stored
+        assert cache.get("day", (9, 9), lambda: "uncommitted") == "uncommitted"
+    assert cache.stats().entries == 0
+
+def test_loads_racing_a_write_are_not_kept(cache):
+    def load():
+        cache.invalidate(5)  # A write commits while the query runs
+        return "stale"
+    assert cache.get("day", (5, 5), load) == "stale"
+    assert cache.stats().entries == 0
+
+def test_patches_update_cached_results_only(cache):
+    cache.get("total", (5, 5), lambda: 10)
+    cache.patch("total", (5, 5), lambda total: total + 5)
+    cache.patch("total", (6, 6), lambda total: total + 5)
+    assert cache.get("total", (5, 5), counting_loader(0)) == 15
+    assert cache.stats().entries == 1
+
+def test_queued_trades_show_before_they_are_written(store_dir):
+    journal = EnhancedJournalRepository()
+    day = datetime.date(2025, 3, 3)
+    journal.save_trade(TradeEntry(date=day, pnl=100.0))
+    assert journal.get_daily_total(day).pnl == 100.0
+    assert journal.get_month_summary(2025, 3).trade_count == 1
+    assert len(journal.get_trades_for_day(day)) == 1
+
+    journal._preview_trade(TradeEntry(date=day, pnl=-40.0), 1)
+    assert journal.get_daily_total(day).pnl == 60.0
+    assert journal.get_month_summary(2025, 3).trade_count == 2
+    assert [t.pnl for t in journal.get_trades_for_day(day)] == [100.0, -40.0]
+    # A failed write drops the optimistic values again
+    journal._revert_preview([TradeEntry(date=day, pnl=-40.0)], None)(RuntimeError("failed"))
+    assert journal.get_daily_total(day).pnl == 100.0
+    assert journal.get_month_summary(2025, 3).trade_count == 1
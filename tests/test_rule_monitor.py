@@ -0,0 +1,77 @@
+"""
+Tests for prop firm rule checks and the monitor that re-runs them on every write
+"""
+
+import datetime
+import pytest
+from account_manager import AccountRepository
+from rule_monitor import AccountState, RuleMonitor, evaluate_rules, OK, WARNING, BREACHED
+
+RULES = {"max_daily_loss": 5, "max_daily_drawdown": 4, "max_overall_loss": 10,
+         "max_overall_drawdown": 8, "min_trading_days": 4}
+
+def by_name(statuses):
+    return {s.name: s for s in statuses}
+
+def state(equity, day_start=100000.0, high_water_mark=100000.0, trading_days=0, intraday_low=None):
+    return AccountState(100000.0, equity, day_start, high_water_mark, trading_days, intraday_low)
+
+@pytest.mark.parametrize("equity, level", [
+    (96001.0, OK),          # 3,999 of 5,000
+    (96000.0, WARNING),     # Exactly 80% used
+    (95000.01, WARNING),
+    (95000.0, BREACHED),    # The limit itself is a breach
+    (101000.0, OK),
+])
+def test_daily_loss_thresholds(equity, level):
+    daily = by_name(evaluate_rules({"max_daily_loss": 5}, state(equity)))["Daily loss"]
+    assert daily.level == level
+    assert daily.limit == 5000.0
+    assert daily.remaining == max(0.0, 5000.0 - max(0.0, 100000.0 - equity))
+
+def test_daily_drawdown_is_a_share_of_the_day_start():
+    # Up 10,000 before today: 4% of 110,000 may be lost today
+    statuses = by_name(evaluate_rules(RULES, state(106000.0, day_start=110000.0, high_water_mark=110000.0)))
+    drawdown = statuses["Daily drawdown"]
+    assert (drawdown.limit, drawdown.used, drawdown.level) == (4400.0, 4000.0, WARNING)
+    # The daily loss limit stays a share of the starting balance, lost from the day start
+    assert (statuses["Daily loss"].limit, statuses["Daily loss"].used) == (5000.0, 4000.0)
+    assert statuses["Overall loss"].used == 0.0
+
+def test_overall_drawdown_trails_the_high_water_mark():
+    statuses = by_name(evaluate_rules(RULES, state(112000.0, day_start=112000.0, high_water_mark=120000.0)))
+    trailing = statuses["Overall drawdown"]
+    assert (trailing.limit, trailing.used, trailing.level) == (8000.0, 8000.0, BREACHED)
+    assert statuses["Overall loss"].level == OK
+
+def test_intraday_low_counts_against_the_limits():
+    statuses = by_name(evaluate_rules(RULES, state(100000.0, intraday_low=95500.0)))
+    assert statuses["Daily loss"].level == WARNING
+    assert statuses["Daily loss"].used == 4500.0
+    assert state(100000.0, intraday_low=101000.0).worst_equity == 100000.0
+
+def test_trading_days_never_warn():
+    days = by_name(evaluate_rules(RULES, state(100000.0, trading_days=3)))["Trading days"]
+    assert (days.level, days.remaining, days.used_ratio) == (OK, 1.0, 0.75)
+    assert evaluate_rules({}, state(0.0)) == []
+
+def test_monitor_reports_rules_that_get_worse(store_dir):
+    account = AccountRepository()
+    account.set_starting_balance(100000.0)
+    monday, tuesday = datetime.date(2025, 3, 3), datetime.date(2025, 3, 4)
+    account.set_daily_pnl({monday: 10000.0})
+    monitor = RuleMonitor(RULES, account)
+    reports = []
+    monitor.subscribe(lambda statuses, worse: reports.append([s.name for s in worse]))
+
+    account.set_daily_pnl({tuesday: -4500.0})
+    statuses = by_name(monitor.check(tuesday))
+    assert statuses["Daily drawdown"].limit == 4400.0  # 4% of Monday's close
+    assert statuses["Daily drawdown"].level == BREACHED
+    assert statuses["Overall drawdown"].used == 4500.0
+    assert monitor.state(tuesday).trading_days == 2
+    assert len(reports) == 1
+
+    monitor.close()
+    account.set_daily_pnl({tuesday: -9000.0})
+    assert len(reports) == 1
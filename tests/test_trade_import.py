@@ -0,0 +1,108 @@
+"""
+Tests for importing broker statements and re-importing them
+"""
+
+import datetime
+import pytest
+from enhanced_journal import EnhancedJournalRepository
+from trade_import import TradeImporter, parse_number
+
+STATEMENT = """Ticket,Symbol,Type,Volume,Open Time,Close Time,Open Price,Close Price,Commission,Swap,Profit
+1001,EURUSD,buy,1.00,2024.03.01 09:00,2024.03.01 11:30,1.0850,1.0870,-7.00,0.00,200.00
+1002,GBPUSD,sell,0.50,2024.03.01 14:00,2024.03.01 15:00,1.2700,1.2720,-3.50,0.00,-100.00
+1003,USDJPY,buy,1.00,2024.03.04 09:00,2024.03.05 10:00,150.10,150.40,-7.00,-1.20,200.00
+1004,EURUSD,balance,,,,,,,,5000.00
+"""
+
+@pytest.fixture
+def journal(store_dir):
+    return EnhancedJournalRepository()
+
+@pytest.fixture
+def statement(store_dir):
+    path = store_dir / "statement.csv"
+    path.write_text(STATEMENT)
+    return str(path)
+
+def test_import_stores_trades_totals_and_equity(journal, statement):
+    result = TradeImporter(journal).import_file(statement)
+    assert (result.imported, result.duplicates, result.skipped, result.days) == (3, 0, 1, 2)
+
+    trades = journal.get_trades_between(datetime.date(2024, 3, 1), datetime.date(2024, 3, 31))
+    assert [(t.instrument, t.direction, t.pnl, t.fees) for t in trades] == [
+        ("EURUSD", "Long", 193.0, 7.0), ("GBPUSD", "Short", -103.5, 3.5), ("USDJPY", "Long", 191.8, 8.2)]
+    total = journal.get_daily_total(datetime.date(2024, 3, 1))
+    assert (total.pnl, total.trade_count, total.wins, total.losses) == (89.5, 2, 1, 1)
+    assert journal.account.get_equity_at(datetime.date(2024, 3, 5)) == pytest.approx(
+        journal.account.effective_starting_balance() + 89.5 + 191.8)
+
+def test_reimport_is_a_no_op(journal, statement):
+    importer = TradeImporter(journal)
+    importer.import_file(statement)
+    summary = journal.get_month_summary(2024, 3)
+    equity = journal.account.get_summary()
+
+    result = importer.import_file(statement)
+    assert (result.imported, result.duplicates, result.days) == (0, 3, 0)
+    assert journal.get_month_summary(2024, 3) == summary
+    assert journal.account.get_summary() == equity
+
+def test_reimport_only_reports_days_of_new_trades(journal, statement, store_dir):
+    importer = TradeImporter(journal)
+    importer.import_file(statement)
+    longer = store_dir / "longer.csv"
+    longer.write_text(STATEMENT + "1005,EURUSD,sell,1.00,2024.03.07 09:00,2024.03.07 10:00,"
+                                  "1.0900,1.0880,-7.00,0.00,200.00\n")
+    result = importer.import_file(str(longer))
+    assert (result.imported, result.duplicates, result.days) == (1, 3, 1)
+
+def test_edited_import_keeps_its_key(journal, statement):
+    importer = TradeImporter(journal)
+    importer.import_file(statement)
+    trade = journal.get_trades_for_day(datetime.date(2024, 3, 5))[0]
+    trade.notes = "held over the rollover"
+    trade.pnl = 150.0
+    journal.save_trade(trade)
+    assert journal.get_trade(trade.id).notes == "held over the rollover"
+
+    # Still recognised as already imported, so the edit is not duplicated or undone
+    result = importer.import_file(statement)
+    assert result.imported == 0
+    assert journal.get_trade(trade.id).pnl == 150.0
+
+def test_saving_a_missing_trade_fails(journal, statement):
+    TradeImporter(journal).import_file(statement)
+    trade = journal.get_trades_for_day(datetime.date(2024, 3, 5))[0]
+    trade.id = 999
+    with pytest.raises(ValueError):
+        journal.save_trade(trade)
+
+@pytest.mark.parametrize("text, number", [
+    ("1234.5", 1234.5),
+    ("1,234.56", 1234.56),
+    ("1.234,56", 1234.56),
+    ("-1.234,56", -1234.56),
+    ("1,234", 1234.0),
+    ("1,234,567", 1234567.0),
+    ("1.234.567", 1234567.0),
+    ("1 234.50", 1234.5),
+    ("-12,5", -12.5),
+    ("0,125", 0.125),
+    ("(3.20)", -3.2),
+    ("150.123", 150.123),
+    ("", 0.0),
+    ("-", 0.0),
+])
+def test_parse_number_separators(text, number):
+    assert parse_number(text) == pytest.approx(number)
+
+def test_european_statement_imports_full_amounts(journal, store_dir):
+    path = store_dir / "statement_eu.csv"
+    path.write_text("Ticket;Symbol;Type;Volume;Open Time;Close Time;Open Price;Close Price;Commission;Swap;Profit\n"
+                    "2001;GER40;buy;1,00;2024.03.01 09:00;2024.03.01 11:30;17.650,5;17.890,5;-7,00;0,00;1.234,56\n"
+                    "2002;GER40;sell;1,00;2024.03.01 12:00;2024.03.01 13:00;17.900;17.950;0;0;-1.250.000,00\n")
+    result = TradeImporter(journal).import_file(str(path))
+    assert (result.imported, result.skipped) == (2, 0)
+    trades = journal.get_trades_for_day(datetime.date(2024, 3, 1))
+    assert sorted(t.pnl for t in trades) == [-1250000.0, 1227.56]
+    assert trades[0].entry_price in (17650.5, 17900.0)
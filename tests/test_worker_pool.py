@@ -0,0 +1,111 @@
+"""
+Tests for the worker pool's priorities, channel generations and shutdown
+"""
+
+import threading
+import pytest
+from worker_pool import Channel, WorkerPool, PRIORITY_BACKGROUND, PRIORITY_NORMAL, PRIORITY_UI
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(max_workers=1)
+    yield pool
+    pool.shutdown(10)
+
+def block(pool):
+    """Occupy the only worker until released, so the jobs queued meanwhile wait"""
+    started, release = threading.Event(), threading.Event()
+    pool.submit(lambda: (started.set(), release.wait(10)), "block")
+    assert started.wait(10)
+    return release
+
+def drain(pool):
+    """Wait until every job queued so far has run"""
+    done = threading.Event()
+    pool.submit(done.set, "drain", priority=PRIORITY_BACKGROUND + 1)
+    assert done.wait(10)
+
+def test_urgent_jobs_run_first_and_fifo_within_a_priority(pool):
+    order = []
+    release = block(pool)
+    pool.submit(lambda: order.append("export"), priority=PRIORITY_BACKGROUND)
+    pool.submit(lambda: order.append("normal 1"))
+    pool.submit(lambda: order.append("ui"), priority=PRIORITY_UI)
+    pool.submit(lambda: order.append("normal 2"), priority=PRIORITY_NORMAL)
+    release.set()
+    drain(pool)
+    assert order == ["ui", "normal 1", "normal 2", "export"]
+
+def test_newer_work_on_a_channel_skips_queued_jobs(pool):
+    channel = Channel("month loads")
+    ran, results = [], []
+    release = block(pool)
+    for month in (1, 2, 3):
+        pool.submit(lambda month=month: ran.append(month) or month, channel=channel, on_done=results.append)
+    release.set()
+    drain(pool)
+    assert (ran, results) == ([3], [3])
+    assert pool.stats().skipped == 2
+
+def test_results_superseded_while_running_are_dropped(pool):
+    channel = Channel()
+    started, release = threading.Event(), threading.Event()
+    results, errors = [], []
+    pool.submit(lambda: (started.set(), release.wait(10)) and "january", channel=channel,
+                on_done=results.append, on_error=errors.append)
+    assert started.wait(10)
+    pool.submit(lambda: "february", channel=channel, on_done=results.append)
+    release.set()
+    drain(pool)
+    assert results == ["february"] and errors == []
+    assert pool.stats().dropped == 1
+
+def test_cancelling_a_channel_drops_everything_in_flight(pool):
+    channel = Channel("closed window")
+    results = []
+    release = block(pool)
+    job = pool.submit(lambda: "late", channel=channel, on_done=results.append)
+    channel.cancel()
+    assert not job.is_current()
+    release.set()
+    drain(pool)
+    assert results == []
+
+def test_a_result_superseded_before_delivery_is_not_called_back(pool):
+    channel = Channel()
+    deliveries, results = [], []
+    pool.submit(lambda: "old", channel=channel, on_done=results.append, deliver=deliveries.append)
+    drain(pool)
+    channel.advance()  # Newer work arrives while the result waits for the Tk thread
+    deliveries[0]()
+    assert results == []
+
+def test_errors_reach_on_error(pool):
+    errors = []
+    pool.submit(lambda: 1 / 0, on_error=errors.append)
+    pool.submit(lambda: 1, on_done=lambda result: 1 / 0)  # A failing callback is only logged
+    drain(pool)
+    assert [type(e) for e in errors] == [ZeroDivisionError]
+    assert pool.stats().failed == 1
+
+def test_shutdown_drops_queued_jobs_and_waits_for_running_ones(pool):
+    ran = []
+    started, release = threading.Event(), threading.Event()
+    pool.submit(lambda: (started.set(), release.wait(10), ran.append("running")))
+    assert started.wait(10)
+    queued = pool.submit(lambda: ran.append("queued"))
+    assert pool.shutdown(timeout=0.05) is False  # Still running
+    release.set()
+    assert pool.shutdown(timeout=10)
+    assert ran == ["running"] and queued.cancelled
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
+
+def test_workers_are_bounded():
+    pool = WorkerPool(max_workers=2)
+    release = threading.Event()
+    for _ in range(6):
+        pool.submit(lambda: release.wait(10))
+    assert pool.stats().workers == 2
+    release.set()
+    assert pool.shutdown(10)
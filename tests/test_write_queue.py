@@ -0,0 +1,101 @@
+"""
+Tests for the write-behind queue and its per-write savepoints
+"""
+
+import datetime
+import sqlite3
+import threading
+import pytest
+import write_queue
+from database import get_database
+from enhanced_journal import EnhancedJournalRepository, TradeEntry
+from write_queue import WriteBehindQueue
+
+@pytest.fixture
+def db(store_dir):
+    db = get_database(str(store_dir / "queue.db"))
+    db.execute("CREATE TABLE notes (text TEXT NOT NULL)")
+    return db
+
+def texts(db):
+    return [row[0] for row in db.fetchall("SELECT text FROM notes ORDER BY rowid")]
+
+def hold_writer(writes):
+    """Queue a write that blocks the writer until released, so later writes form one batch"""
+    started, release = threading.Event(), threading.Event()
+    writes.submit(lambda: (started.set(), release.wait(10)), "hold")
+    assert started.wait(10)
+    return release
+
+def test_a_failing_write_is_rolled_back_alone(db):
+    writes = WriteBehindQueue(db)
+    results, errors = [], []
+
+    def insert(text):
+        db.execute("INSERT INTO notes VALUES (?)", (text,))
+        return text
+
+    def half_then_fail():
+        db.execute("INSERT INTO notes VALUES ('partial')")
+        raise ValueError("bad trade")
+
+    release = hold_writer(writes)
+    writes.submit(lambda: insert("first"), "first", results.append, errors.append)
+    writes.submit(half_then_fail, "broken", results.append, errors.append)
+    writes.submit(lambda: insert("second"), "second", results.append, errors.append)
+    assert writes.pending() == 4
+    release.set()
+    assert writes.flush(10)
+    # The failed write's own row went with its savepoint; the batch still committed
+    assert texts(db) == ["first", "second"]
+    assert results == ["first", "second"]
+    assert [str(e) for e in errors] == ["bad trade"]
+    assert writes.pending() == 0
+
+def test_commit_callbacks_of_a_failed_write_are_dropped(db):
+    writes = WriteBehindQueue(db)
+    committed = []
+
+    def failing():
+        db.on_commit(lambda: committed.append("failed"))
+        raise ValueError("no")
+
+    writes.submit(failing, "failing")
+    writes.submit(lambda: db.on_commit(lambda: committed.append("kept")), "kept")
+    assert writes.flush(10)
+    assert committed == ["kept"]
+
+def test_busy_database_is_retried(db, monkeypatch):
+    monkeypatch.setattr(write_queue, "RETRY_DELAYS", (0.01, 0.01))
+    writes = WriteBehindQueue(db)
+    attempts, results = [], []
+
+    def locked_once():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        db.execute("INSERT INTO notes VALUES ('after retry')")
+        return len(attempts)
+
+    writes.submit(locked_once, "locked once", results.append)
+    assert writes.flush(10)
+    assert (results, texts(db)) == ([2], ["after retry"])
+
+def test_writer_survives_a_callback_error(db):
+    writes = WriteBehindQueue(db)
+    writes.submit(lambda: 1, "first", lambda result: 1 / 0)
+    done = []
+    writes.submit(lambda: 2, "second", done.append)
+    assert writes.flush(10)
+    assert done == [2]
+
+def test_async_trade_saves_reach_the_store(store_dir):
+    journal = EnhancedJournalRepository()
+    day = datetime.date(2025, 3, 3)
+    saved = []
+    journal.save_trade_async(TradeEntry(date=day, pnl=25.0), on_done=saved.append)
+    journal.save_trade_async(TradeEntry(date=day, pnl=-5.0), on_done=saved.append)
+    assert journal.writes.flush(10)
+    assert len(saved) == 2
+    assert journal.get_daily_total(day).pnl == 20.0
+    assert sorted(t.id for t in journal.get_trades_for_day(day)) == sorted(saved)
@@ -0,0 +1,417 @@
+"""
+Trade Import Module for PropFire
+Streams broker statement exports (CSV, MT4/MT5 HTML reports) into the
+enhanced journal in bulk
+"""
+
+import csv
+import datetime
+import hashlib
+import html
+import os
+import re
+import time
+from dataclasses import dataclass
+from tkinter import filedialog
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import customtkinter as ctk
+from enhanced_journal import EnhancedJournalRepository, TradeEntry
+from worker_pool import get_worker_pool, PRIORITY_BACKGROUND
+
+# Normalized header name -> field. Headers are lower-cased with everything
+# but letters and digits removed, so "S / L", "Open Time" and "Net USD" map.
+COLUMN_ALIASES = {
+    'ticket': ('ticket', 'position', 'positionid', 'id', 'order', 'deal'),
+    'instrument': ('symbol', 'item', 'instrument'),
+    'direction': ('type', 'direction', 'side', 'openingdirection', 'action'),
+    'size': ('size', 'volume', 'lots', 'quantity', 'closingquantity', 'qty'),
+    'entry_time': ('opentime', 'openingtime', 'entrytime', 'timeopen'),
+    'exit_time': ('closetime', 'closingtime', 'exittime', 'timeclose'),
+    'entry_price': ('openprice', 'entryprice', 'priceopen'),
+    'exit_price': ('closeprice', 'closingprice', 'exitprice', 'priceclose'),
+    'stop_loss': ('sl', 'stoploss'),
+    'take_profit': ('tp', 'takeprofit'),
+    'commission': ('commission', 'commissions'),
+    'swap': ('swap', 'swaps', 'rollover'),
+    'taxes': ('taxes', 'fee', 'fees'),
+    'profit': ('profit', 'grossprofit', 'grossusd', 'gross'),
+    'net_profit': ('netprofit', 'netusd', 'net', 'pnl'),
+}
+FIELD_BY_HEADER = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+
+# MT4/MT5 reports repeat "Time" and "Price" for the open and close legs
+REPEATED_HEADERS = {'time': ('opentime', 'closetime'), 'price': ('openprice', 'closeprice')}
+
+TIME_FORMATS = (
+    "%Y.%m.%d %H:%M:%S", "%Y.%m.%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
+    "%d/%m/%Y %H:%M:%S.%f", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%m/%d/%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M",
+)
+
+# Year-first timestamps (MT4/MT5, ISO) are built directly, without strptime
+FAST_TIME = re.compile(r'(\d{4})[.-](\d\d)[.-](\d\d)[ T](\d\d):(\d\d)(?::(\d\d))?$')
+
+BUY_TYPES = ('buy', 'long')
+SELL_TYPES = ('sell', 'short')
+
+@dataclass
+class ImportResult:
+    """Outcome of one statement import"""
+    path: str
+    rows_read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    days: int = 0
+    seconds: float = 0.0
+
+def normalize_header(name: str) -> str:
+    """Lower-case a column title and drop everything but letters and digits"""
+    return re.sub(r'[^a-z0-9]', '', name.strip().lower())
+
+def map_header(cells: List[str]) -> Dict[str, int]:
+    """Map trade fields to column indexes for a statement header row"""
+    seen: Dict[str, int] = {}
+    columns: Dict[str, int] = {}
+    for index, cell in enumerate(cells):
+        name = normalize_header(cell)
+        if name in REPEATED_HEADERS:
+            occurrence = seen.get(name, 0)
+            seen[name] = occurrence + 1
+            if occurrence > 1:
+                continue
+            name = REPEATED_HEADERS[name][occurrence]
+        field = FIELD_BY_HEADER.get(name)
+        if field and field not in columns:
+            columns[field] = index
+    return columns
+
+def is_trade_header(columns: Dict[str, int]) -> bool:
+    """Closed-trade tables have a symbol, both legs' times and a P&L column"""
+    return ('instrument' in columns and 'exit_time' in columns and 'entry_time' in columns
+            and ('profit' in columns or 'net_profit' in columns))
+
+class TimeParser:
+    """Parses statement timestamps, remembering the last format that matched"""
+
+    def __init__(self):
+        self._format: Optional[str] = None
+
+    def parse(self, value: str) -> Optional[datetime.datetime]:
+        """Parse a timestamp in any known statement format, None if blank or unknown"""
+        value = value.strip()
+        if not value:
+            return None
+        fast = FAST_TIME.match(value)
+        if fast:
+            return datetime.datetime(*(int(part) for part in fast.groups() if part))
+        if self._format:
+            try:
+                return datetime.datetime.strptime(value, self._format)
+            except ValueError:
+                pass
+        for fmt in TIME_FORMATS:
+            try:
+                parsed = datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            self._format = fmt
+            return parsed
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+
+def parse_number(value: str) -> float:
+    """Parse a statement number such as '1 234.50', '1.234,56', '-12,5' or '(3.20)'"""
+    try:
+        return float(value)  # Plain numbers are the common case
+    except ValueError:
+        pass
+    value = value.strip().replace('\xa0', '').replace(' ', '')
+    if not value or value == '-':
+        return 0.0
+    negative = value.startswith('(') and value.endswith(')')
+    value = value.strip('()')
+    if ',' in value and '.' in value:
+        # The separator that comes last is the decimal point, the other groups thousands
+        decimal = value[max(value.rfind(','), value.rfind('.'))]
+        value = value.replace('.' if decimal == ',' else ',', '').replace(decimal, '.')
+    elif value.count(',') > 1 or value.count('.') > 1:
+        value = value.replace(',', '').replace('.', '')  # '1,234,567' or '1.234.567'
+    elif ',' in value:
+        whole, fraction = value.split(',')
+        # '1,234' groups thousands; '-12,5' and '0,125' use a decimal comma
+        grouped = len(fraction) == 3 and whole.lstrip('-').strip('0') != ''
+        value = whole + fraction if grouped else f"{whole}.{fraction}"
+    number = float(value)
+    return -number if negative else number
+
+def build_trade(cells: List[str], columns: Dict[str, int],
+                times: TimeParser) -> Optional[Tuple[str, TradeEntry]]:
+    """Convert one statement row to (import_key, trade), or None for non-trade rows"""
+    def cell(field: str) -> str:
+        index = columns.get(field)
+        return cells[index] if index is not None and index < len(cells) else ""
+
+    side = cell('direction').strip().lower()
+    if side.startswith(BUY_TYPES):
+        direction = "Long"
+    elif side.startswith(SELL_TYPES):
+        direction = "Short"
+    else:
+        return None  # Balance, credit, deposit and pending-order rows
+    if any(word in side for word in ('limit', 'stop')):
+        return None  # Cancelled pending orders in MT4 statements
+
+    exit_time = times.parse(cell('exit_time'))
+    if exit_time is None:
+        return None  # Still open
+    entry_time = times.parse(cell('entry_time'))
+
+    commission = parse_number(cell('commission'))
+    swap = parse_number(cell('swap'))
+    taxes = parse_number(cell('taxes'))
+    fees = -(commission + swap + taxes)
+    if 'net_profit' in columns:
+        pnl = parse_number(cell('net_profit'))
+    else:
+        pnl = parse_number(cell('profit')) - fees
+
+    entry = TradeEntry(
+        date=exit_time.date(),  # P&L is realized on the close
+        pnl=round(pnl, 2),
+        instrument=cell('instrument').strip().upper(),
+        direction=direction,
+        size=parse_number(cell('size')),
+        entry_time=entry_time,
+        exit_time=exit_time,
+        entry_price=parse_number(cell('entry_price')),
+        exit_price=parse_number(cell('exit_price')),
+        stop_loss=parse_number(cell('stop_loss')),
+        take_profit=parse_number(cell('take_profit')),
+        fees=round(fees, 2)
+    )
+    ticket = cell('ticket').strip()
+    if ticket:
+        import_key = f"{ticket}|{entry.instrument}|{entry_time.isoformat() if entry_time else ''}"
+    else:
+        # No ticket column: fingerprint the fields that identify a fill
+        identity = "|".join(cells[index] for index in sorted(columns.values()) if index < len(cells))
+        import_key = "sha1:" + hashlib.sha1(identity.encode('utf-8')).hexdigest()
+    return import_key, entry
+
+class _CountingLines:
+    """Iterates a text file line by line while counting characters consumed"""
+
+    def __init__(self, f):
+        self.f = f
+        self.position = 0
+
+    def __iter__(self):
+        for line in self.f:
+            self.position += len(line)
+            yield line
+
+# Statements are flat, generated tables, so rows and cells are scanned with
+# regexes; html.parser is several times slower on 50k-row reports
+ROW_END = re.compile(r'</tr\s*>', re.IGNORECASE)
+CELL = re.compile(r'<t[dh]([^>]*)>(.*?)(?=<t[dh][\s>]|</t[dh]\s*>|$)', re.IGNORECASE | re.DOTALL)
+COLSPAN = re.compile(r'colspan\s*=\s*["\']?(\d+)', re.IGNORECASE)
+TAG = re.compile(r'<[^>]*>')
+
+def parse_table_row(row_html: str) -> List[str]:
+    """Cell texts of one <tr>, with colspan cells padded to keep columns aligned"""
+    cells = []
+    for attrs, content in CELL.findall(row_html):
+        if '<' in content:
+            content = TAG.sub('', content)
+        if '&' in content:
+            content = html.unescape(content).replace('\xa0', ' ')
+        cells.append(content.strip())
+        span = COLSPAN.search(attrs) if attrs else None
+        if span:
+            cells.extend([""] * (int(span.group(1)) - 1))
+    return cells
+
+class StatementReader:
+    """Streams (import_key, trade) pairs out of a statement file"""
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, path: str):
+        self.path = path
+        self.total_bytes = os.path.getsize(path)
+        self.bytes_read = 0
+        self.trades_read = 0
+        self.skipped = 0
+        self._times = TimeParser()
+
+    def trades(self) -> Iterator[Tuple[str, TradeEntry]]:
+        """Yield every closed trade in the statement"""
+        ext = os.path.splitext(self.path)[1].lower()
+        rows = self._html_rows() if ext in ('.htm', '.html') else self._csv_rows()
+        columns: Optional[Dict[str, int]] = None
+        for cells in rows:
+            # Data rows start with a ticket or a timestamp; only other rows can be headers
+            if not cells or not cells[0][:1].isdigit():
+                candidate = map_header(cells)
+                if is_trade_header(candidate):
+                    columns = candidate
+                    continue
+                if len(candidate) >= 3:
+                    columns = None  # Header of an orders/deals table: the trade table ended
+                    continue
+            if columns is None or not any(cells):
+                continue
+            try:
+                trade = build_trade(cells, columns, self._times)
+            except ValueError:
+                trade = None
+            if trade is None:
+                self.skipped += 1
+                continue
+            self.trades_read += 1
+            yield trade
+
+    def _csv_rows(self) -> Iterator[List[str]]:
+        """Rows of a CSV export; the delimiter is sniffed from the first lines"""
+        with open(self.path, 'r', encoding='utf-8-sig', errors='replace', newline='') as f:
+            sample = f.read(8192)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            lines = _CountingLines(f)
+            for row in csv.reader(lines, dialect):
+                self.bytes_read = min(self.total_bytes, lines.position)
+                yield row
+        self.bytes_read = self.total_bytes
+
+    def _html_rows(self) -> Iterator[List[str]]:
+        """Table rows of an HTML report, read in chunks"""
+        with open(self.path, 'rb') as f:
+            encoding = 'utf-16' if f.read(2) in (b'\xff\xfe', b'\xfe\xff') else 'utf-8'
+        # MT5 writes UTF-16 reports, MT4 single-byte ones
+        with open(self.path, 'r', encoding=encoding, errors='replace') as f:
+            pending = ""
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.bytes_read = min(self.total_bytes, f.buffer.tell())
+                # Only complete rows are parsed; the tail waits for the next chunk
+                parts = ROW_END.split(pending + chunk)
+                pending = parts.pop()
+                for part in parts:
+                    start = part.lower().rfind('<tr')
+                    if start >= 0:
+                        yield parse_table_row(part[start:])
+        self.bytes_read = self.total_bytes
+
+class TradeImporter:
+    """Imports broker statements into the journal and its equity curve in one transaction"""
+
+    def __init__(self, repository: EnhancedJournalRepository):
+        self.repository = repository
+
+    def import_file(self, path: str, progress: Optional[Callable[[float, int, int], None]] = None,
+                    batch_size: int = 5000) -> ImportResult:
+        """Import one statement; progress gets (fraction of file, rows read, rows imported)"""
+        started = time.perf_counter()
+        reader = StatementReader(path)
+
+        def report(read: int, imported: int):
+            if progress:
+                fraction = reader.bytes_read / reader.total_bytes if reader.total_bytes else 1.0
+                progress(fraction, read, imported)
+
+        imported, days = self.repository.import_trades(reader.trades(), batch_size, report)
+        result = ImportResult(path=path, imported=imported, skipped=reader.skipped, days=len(days))
+        result.rows_read = reader.trades_read
+        result.duplicates = result.rows_read - imported
+        result.seconds = time.perf_counter() - started
+        print(f"DEBUG: Imported {imported} trade(s) from {path} in {result.seconds:.2f}s "
+              f"({result.duplicates} duplicate, {result.skipped} skipped)")
+        return result
+
+class ImportDialog:
+    """Picks a statement file and imports it on a worker thread with a progress bar"""
+
+    def __init__(self, repository: EnhancedJournalRepository,
+                 on_complete: Optional[Callable[[ImportResult], None]] = None):
+        self.importer = TradeImporter(repository)
+        self.on_complete = on_complete
+        self.path = filedialog.askopenfilename(
+            title="Import Broker Statement",
+            filetypes=[("Statements", "*.csv *.htm *.html"), ("CSV files", "*.csv"),
+                       ("HTML reports", "*.htm *.html")]
+        )
+        if self.path:
+            self._create_dialog()
+            get_worker_pool().submit(
+                self._run, f"import {os.path.basename(self.path)}", PRIORITY_BACKGROUND,
+                on_done=self._finished, on_error=lambda e: self._failed(str(e)),
+                deliver=lambda call: self.dialog.after(0, call)
+            )
+
+    def _create_dialog(self):
+        """Create the progress dialog"""
+        self.dialog = ctk.CTkToplevel()
+        self.dialog.title("Import Trades")
+        self.dialog.geometry("420x180+400+300")
+        self.dialog.configure(fg_color="#111111")
+        self.dialog.attributes('-topmost', True)
+        self.dialog.grab_set()
+
+        ctk.CTkLabel(self.dialog, text=os.path.basename(self.path),
+                    font=('Inter', 14, 'bold')).pack(pady=(20, 10))
+
+        self.progress_bar = ctk.CTkProgressBar(self.dialog, width=340)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(pady=5)
+
+        self.status_label = ctk.CTkLabel(self.dialog, text="Reading statement...",
+                                        font=('Inter', 11), text_color='#888888')
+        self.status_label.pack(pady=5)
+
+        self.close_btn = ctk.CTkButton(self.dialog, text="Close", command=self.dialog.destroy,
+                                      fg_color="#666666", width=80, state='disabled')
+        self.close_btn.pack(pady=10)
+
+    def _run(self) -> ImportResult:
+        """Import on a pool worker, posting progress to the Tk thread"""
+        try:
+            return self.importer.import_file(
+                self.path,
+                progress=lambda fraction, read, imported: self.dialog.after(
+                    0, lambda: self._show_progress(fraction, read, imported))
+            )
+        finally:
+            self.importer.repository.db.close_thread_connection()
+
+    def _show_progress(self, fraction: float, read: int, imported: int):
+        """Update the progress bar"""
+        if self.dialog.winfo_exists():
+            self.progress_bar.set(fraction)
+            self.status_label.configure(text=f"{read:,} trades read · {imported:,} new")
+
+    def _finished(self, result: ImportResult):
+        """Show the import summary and notify the journal"""
+        if self.dialog.winfo_exists():
+            self.progress_bar.set(1)
+            self.status_label.configure(
+                text=f"Imported {result.imported:,} trades over {result.days:,} days in {result.seconds:.1f}s\n"
+                     f"{result.duplicates:,} already in journal · {result.skipped:,} rows skipped",
+                text_color='#00FF00'
+            )
+            self.close_btn.configure(state='normal')
+        if self.on_complete:
+            self.on_complete(result)
+
+    def _failed(self, error: str):
+        """Show an import error"""
+        if self.dialog.winfo_exists():
+            self.status_label.configure(text=f"Import failed: {error}", text_color='#FF4444')
+            self.close_btn.configure(state='normal')
@@ -4,13 +4,27 @@ Professional trading journal with calendar view and SQLite persistence
 """
 
 import customtkinter as ctk
-import sqlite3
 import calendar
+import tkinter as tk
+from tkinter import messagebox
 import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from dataclasses import dataclass
 import asyncio
-import threading
+from database import get_database, date_to_day, day_to_date, month_range, year_range
+from migrations import migrate, STORE_MIGRATIONS, STORE_PATH
+from notes_index import NotesIndex, SearchHit
+from query_cache import get_query_cache
+from write_queue import get_write_queue
+from aggregates import PnLAggregates, PnLSummary, month_key, year_month_keys
+from calendar_grid import CalendarGrid
+from account_manager import AccountRepository
+from worker_pool import get_worker_pool, Channel, PRIORITY_UI
+
+# Monthly and yearly totals and the notes index over daily_entries, maintained on write
+# (the index follows rowid, which is the entry id)
+JOURNAL_AGGREGATES = PnLAggregates("journal", levels=("month", "year"))
+JOURNAL_NOTES_INDEX = NotesIndex("journal_notes_fts", "daily_entries", "rowid", ("notes",))
 
 @dataclass
 class DailyEntry:
@@ -24,66 +38,132 @@ class DailyEntry:
 class JournalRepository:
     """Data access layer for trading journal"""
     
-    def __init__(self, db_path: str = "trading_journal.db"):
+    def __init__(self, db_path: str = STORE_PATH, account_id: Optional[int] = None):
         self.db_path = db_path
+        self.db = get_database(db_path)
         self._init_db()
-        self._cache = {}
+        self.cache = get_query_cache(self.db)
+        self.writes = get_write_queue(self.db)
+        self.account_id = account_id if account_id is not None else AccountRepository(db_path).account_id
     
     def _init_db(self):
-        """Initialize database schema"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS daily_entries (
-                    date TEXT PRIMARY KEY,
-                    pnl REAL NOT NULL,
-                    gross REAL DEFAULT 0,
-                    fees REAL DEFAULT 0,
-                    notes TEXT DEFAULT ''
-                )
-            """)
-            conn.commit()
+        """Initialize or upgrade database schema"""
+        migrate(self.db, STORE_MIGRATIONS)
+    
+    def get_entries_between(self, start: datetime.date, end: datetime.date) -> List[DailyEntry]:
+        """Get all entries in an inclusive date range"""
+        return self._get_entries(date_to_day(start), date_to_day(end))
+    
+    def _get_entries(self, first_day: int, last_day: int) -> List[DailyEntry]:
+        """Get entries by day number range (account and day index range scan)"""
+        cursor = self.db.execute("""
+            SELECT day, pnl, gross, fees, notes 
+            FROM daily_entries 
+            WHERE account_id = ? AND day BETWEEN ? AND ? 
+            ORDER BY day
+        """, (self.account_id, first_day, last_day))
+        
+        return [
+            DailyEntry(
+                date=day_to_date(row[0]),
+                pnl=row[1],
+                gross=row[2],
+                fees=row[3],
+                notes=row[4]
+            )
+            for row in cursor.fetchall()
+        ]
     
     def get_monthly_pnl(self, year: int, month: int) -> List[DailyEntry]:
         """Get all entries for a specific month"""
-        cache_key = f"{year}-{month:02d}"
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                SELECT date, pnl, gross, fees, notes 
-                FROM daily_entries 
-                WHERE date LIKE ? 
-                ORDER BY date
-            """, (f"{year}-{month:02d}%",))
-            
-            entries = [
-                DailyEntry(
-                    date=datetime.datetime.strptime(row[0], "%Y-%m-%d").date(),
-                    pnl=row[1],
-                    gross=row[2],
-                    fees=row[3],
-                    notes=row[4]
-                )
-                for row in cursor.fetchall()
-            ]
-            
-        self._cache[cache_key] = entries
-        return entries
+        days = month_range(year, month)
+        return self.cache.get("journal.entries", days, lambda: self._get_entries(*days), self.account_id)
+    
+    def get_yearly_pnl(self, year: int) -> List[DailyEntry]:
+        """Get all entries for a specific year"""
+        return self._get_entries(*year_range(year))
+    
+    def get_month_summary(self, year: int, month: int) -> PnLSummary:
+        """Get the aggregated totals for a month"""
+        key = month_key(datetime.date(year, month, 1))
+        return self.cache.get("journal.month", month_range(year, month),
+                              lambda: JOURNAL_AGGREGATES.get(self.db, self.account_id, "month", key), self.account_id)
+    
+    def get_year_summary(self, year: int) -> PnLSummary:
+        """Get the aggregated totals for a year"""
+        return self.cache.get("journal.year", year_range(year),
+                              lambda: JOURNAL_AGGREGATES.get(self.db, self.account_id, "year", year), self.account_id)
+    
+    def get_year_months(self, year: int) -> Dict[int, PnLSummary]:
+        """Get aggregated totals for each month of a year, keyed by month number"""
+        def load():
+            months = JOURNAL_AGGREGATES.get_range(self.db, self.account_id, "month", *year_month_keys(year))
+            return {key % 100: summary for key, summary in months.items()}
+        return self.cache.get("journal.year_months", year_range(year), load, self.account_id)
     
     def update_daily_pnl(self, date: datetime.date, pnl: float, gross: float = 0, fees: float = 0, notes: str = ""):
         """Update or insert daily PnL entry"""
-        date_str = date.strftime("%Y-%m-%d")
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO daily_entries (date, pnl, gross, fees, notes)
-                VALUES (?, ?, ?, ?, ?)
-            """, (date_str, pnl, gross, fees, notes))
-            conn.commit()
+        day = date_to_day(date)
+        with self.db.transaction() as conn:
+            old = conn.execute("""
+                SELECT id, pnl, fees, notes FROM daily_entries WHERE account_id = ? AND day = ?
+            """, (self.account_id, day)).fetchone()
+            if old:
+                entry_id = old[0]
+                JOURNAL_AGGREGATES.apply(conn, self.account_id, day, old[1], old[2], sign=-1)
+                JOURNAL_NOTES_INDEX.remove(conn, entry_id, (old[3],))
+                conn.execute("""
+                    UPDATE daily_entries SET pnl = ?, gross = ?, fees = ?, notes = ? WHERE id = ?
+                """, (pnl, gross, fees, notes, entry_id))
+            else:
+                entry_id = conn.execute("""
+                    INSERT INTO daily_entries (account_id, day, pnl, gross, fees, notes)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (self.account_id, day, pnl, gross, fees, notes)).lastrowid
+            JOURNAL_AGGREGATES.apply(conn, self.account_id, day, pnl, fees)
+            JOURNAL_NOTES_INDEX.add(conn, entry_id, (notes,))
+            self.cache.invalidate(day)
+
+    def update_daily_pnl_async(self, entry: DailyEntry, previous: Optional[DailyEntry] = None,
+                               on_error: Optional[Callable[[Exception], None]] = None):
+        """Queue an update on the writer thread; cached views show it right away"""
+        self._preview_entry(entry, previous)
+        
+        def failed(error: Exception):
+            self.cache.invalidate(date_to_day(entry.date))
+            if on_error:
+                on_error(error)
+        self.writes.submit(
+            lambda: self.update_daily_pnl(entry.date, entry.pnl, entry.gross, entry.fees, entry.notes),
+            f"save journal day {entry.date}", on_error=failed)
+    
+    def _preview_entry(self, entry: DailyEntry, previous: Optional[DailyEntry]):
+        """Replace a day's entry in the cached views until the queued write commits"""
+        date = entry.date
+        
+        def shift(summary):
+            if previous:
+                summary = summary.shifted(previous.pnl, previous.fees, -1)
+            return summary.shifted(entry.pnl, entry.fees)
+        
+        def replace(entries):
+            return sorted([e for e in entries if e.date != date] + [entry], key=lambda e: e.date)
+        
+        def shift_month(months):
+            return {**months, date.month: shift(months.get(date.month, PnLSummary()))}
         
-        # Clear cache for affected month
-        cache_key = f"{date.year}-{date.month:02d}"
-        self._cache.pop(cache_key, None)
+        self.cache.patch("journal.entries", month_range(date.year, date.month), replace, self.account_id)
+        self.cache.patch("journal.month", month_range(date.year, date.month), shift, self.account_id)
+        self.cache.patch("journal.year", year_range(date.year), shift, self.account_id)
+        self.cache.patch("journal.year_months", year_range(date.year), shift_month, self.account_id)
+    
+    def search_notes(self, text: str, limit: int = 50) -> List[SearchHit]:
+        """Days whose notes match a full-text query, best first"""
+        rows = JOURNAL_NOTES_INDEX.search(self.db, text, "s.day, s.pnl", limit, self.account_id)
+        return [
+            SearchHit("day", row[1], day_to_date(row[1]), "Daily notes", row[3], row[2], row[4])
+            for row in rows
+        ]
 
 class JournalService:
     """Business logic layer for trading journal"""
@@ -94,12 +174,25 @@ class JournalService:
     def get_monthly_summary(self, year: int, month: int) -> Dict:
         """Get monthly PnL summary"""
         entries = self.repository.get_monthly_pnl(year, month)
-        total_pnl = sum(entry.pnl for entry in entries)
+        totals = self.repository.get_month_summary(year, month)
         
         return {
-            "total_pnl": total_pnl,
+            "total_pnl": totals.pnl,
             "entries": {entry.date.day: entry for entry in entries},
-            "trading_days": len([e for e in entries if e.pnl != 0])
+            "trading_days": totals.wins + totals.losses,
+            "year_pnl": self.repository.get_year_summary(year).pnl
+        }
+    
+    def get_yearly_summary(self, year: int) -> Dict:
+        """Get yearly PnL summary with a per-month breakdown"""
+        totals = self.repository.get_year_summary(year)
+        
+        return {
+            "total_pnl": totals.pnl,
+            "months": self.repository.get_year_months(year),
+            "trading_days": totals.wins + totals.losses,
+            "winning_days": totals.wins,
+            "losing_days": totals.losses
         }
 
 class TradingJournalWindow:
@@ -108,9 +201,11 @@ class TradingJournalWindow:
     def __init__(self, parent_callback=None):
         self.parent_callback = parent_callback
         self.service = JournalService(JournalRepository())
-        self.current_date = datetime.date.today()
+        # Pinned to the 1st so month navigation never hits a missing day
+        self.current_date = datetime.date.today().replace(day=1)
         self.journal_window = None
-        self.day_cells = {}
+        self.calendar_grid = None
+        self.month_loads = Channel("journal months")
         
     def show(self):
         """Display trading journal window"""
@@ -154,97 +249,45 @@ class TradingJournalWindow:
                                        font=('Inter', 16, 'bold'), text_color='#00FF00')
         self.total_label.pack(pady=5)
         
-        # Calendar grid
-        self.calendar_frame = ctk.CTkFrame(self.journal_window, fg_color="#000000")
-        self.calendar_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
-        
-        # Configure grid
-        for i in range(7):
-            self.calendar_frame.grid_columnconfigure(i, weight=1, uniform="col")
-        for i in range(7):  # 6 weeks + header
-            self.calendar_frame.grid_rowconfigure(i, weight=1, uniform="row")
-        
-        # Weekday headers
-        weekdays = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        for i, day in enumerate(weekdays):
-            label = ctk.CTkLabel(self.calendar_frame, text=day,
-                               font=('Inter', 12, 'bold'), text_color='#888888')
-            label.grid(row=0, column=i, padx=1, pady=1, sticky='nsew')
-        
-        # Create day cells
-        self._create_calendar_grid()
+        # Calendar grid, built once and re-labelled on navigation
+        self.calendar_grid = CalendarGrid(self.journal_window, self._edit_day)
+        self.calendar_grid.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        self.calendar_grid.show_month(self.current_date.year, self.current_date.month)
         
         # Close button
         close_btn = ctk.CTkButton(self.journal_window, text="Close",
                                  command=self._close_journal, fg_color="#ff6b35")
         close_btn.pack(pady=10)
     
-    def _create_calendar_grid(self):
-        """Create calendar day cells"""
-        self.day_cells.clear()
-        
-        # Get calendar data
-        cal = calendar.monthcalendar(self.current_date.year, self.current_date.month)
-        
-        for week_num, week in enumerate(cal, 1):
-            for day_num, day in enumerate(week):
-                if day == 0:
-                    continue
-                    
-                # Create day cell
-                cell = ctk.CTkFrame(self.calendar_frame, fg_color="#111111", 
-                                  corner_radius=5, border_width=1, border_color="#333333")
-                cell.grid(row=week_num, column=day_num, padx=2, pady=2, sticky='nsew')
-                
-                # Day number
-                day_label = ctk.CTkLabel(cell, text=str(day),
-                                       font=('Inter', 12, 'bold'), text_color='#ffffff')
-                day_label.pack(anchor='nw', padx=5, pady=2)
-                
-                # PnL placeholder
-                pnl_label = ctk.CTkLabel(cell, text="$0.00",
-                                       font=('Courier', 10), text_color='#666666')
-                pnl_label.pack(anchor='w', padx=5)
-                
-                # Store cell reference
-                cell_date = datetime.date(self.current_date.year, self.current_date.month, day)
-                self.day_cells[cell_date] = {
-                    'frame': cell,
-                    'pnl_label': pnl_label
-                }
-                
-                # Bind click event
-                cell.bind("<Button-1>", lambda e, d=cell_date: self._edit_day(d))
-                day_label.bind("<Button-1>", lambda e, d=cell_date: self._edit_day(d))
-    
     def _load_month_data(self):
         """Load and display month data"""
-        def load_data():
-            summary = self.service.get_monthly_summary(
-                self.current_date.year, self.current_date.month
-            )
-            
-            # Update UI in main thread
-            self.journal_window.after(0, lambda: self._update_calendar_display(summary))
-        
-        # Load data in background thread
-        threading.Thread(target=load_data, daemon=True).start()
+        year, month = self.current_date.year, self.current_date.month
+        # Each load supersedes the previous one, so rapid navigation queues at most one
+        # load and a slow result for a month already left never reaches the calendar
+        get_worker_pool().submit(
+            lambda: self.service.get_monthly_summary(year, month),
+            f"journal month {year}-{month:02d}", PRIORITY_UI, self.month_loads,
+            on_done=self._update_calendar_display,
+            deliver=lambda call: self.journal_window.after(0, call)
+        )
     
     def _update_calendar_display(self, summary: Dict):
         """Update calendar with PnL data"""
         # Update total
         total_pnl = summary['total_pnl']
         color = '#00FF00' if total_pnl > 0 else '#FF4444' if total_pnl < 0 else '#888888'
-        self.total_label.configure(text=f"Total PnL: ${total_pnl:,.2f}", text_color=color)
+        self.total_label.configure(
+            text=f"Total PnL: ${total_pnl:,.2f}  |  {self.current_date.year}: ${summary['year_pnl']:,.2f}",
+            text_color=color
+        )
         
         # Update day cells
-        entries = summary['entries']
-        for cell_date, cell_data in self.day_cells.items():
-            if cell_date.day in entries:
-                entry = entries[cell_date.day]
-                pnl_text = f"${entry.pnl:,.0f}" if abs(entry.pnl) >= 1 else f"${entry.pnl:.2f}"
-                pnl_color = '#00FF00' if entry.pnl > 0 else '#FF4444' if entry.pnl < 0 else '#666666'
-                cell_data['pnl_label'].configure(text=pnl_text, text_color=pnl_color)
+        values = {}
+        for entry in summary['entries'].values():
+            pnl_text = f"${entry.pnl:,.0f}" if abs(entry.pnl) >= 1 else f"${entry.pnl:.2f}"
+            pnl_color = '#00FF00' if entry.pnl > 0 else '#FF4444' if entry.pnl < 0 else '#666666'
+            values[entry.date] = (pnl_text, pnl_color)
+        self.calendar_grid.set_values(values)
     
     def _prev_month(self):
         """Navigate to previous month"""
@@ -264,16 +307,11 @@ class TradingJournalWindow:
     
     def _refresh_calendar(self):
         """Refresh calendar display"""
-        # Clear existing cells
-        for widget in self.calendar_frame.winfo_children():
-            if int(widget.grid_info()["row"]) > 0:  # Keep headers
-                widget.destroy()
-        
         # Update month label
         self.month_label.configure(text=f"{calendar.month_name[self.current_date.month]} {self.current_date.year}")
         
-        # Recreate calendar
-        self._create_calendar_grid()
+        # Re-label the existing cells (no-op when the month is unchanged)
+        self.calendar_grid.show_month(self.current_date.year, self.current_date.month)
         self._load_month_data()
     
     def _edit_day(self, date: datetime.date):
@@ -282,6 +320,7 @@ class TradingJournalWindow:
     
     def _close_journal(self):
         """Close journal window"""
+        self.month_loads.cancel()
         if self.journal_window:
             self.journal_window.destroy()
         if self.parent_callback:
@@ -297,7 +336,8 @@ class EditDayDialog:
         
         # Get existing entry
         entries = service.get_monthly_summary(date.year, date.month)['entries']
-        self.entry = entries.get(date.day, DailyEntry(date=date, pnl=0.0))
+        self.previous = entries.get(date.day)
+        self.entry = self.previous or DailyEntry(date=date, pnl=0.0)
         
         self._create_dialog()
     
@@ -343,8 +383,10 @@ class EditDayDialog:
             pnl = float(self.pnl_entry.get() or "0")
             notes = self.notes_entry.get("1.0", "end-1c")
             
-            self.service.repository.update_daily_pnl(
-                self.date, pnl, notes=notes
+            # Committed by the writer thread; the calendar shows the change meanwhile
+            self.service.repository.update_daily_pnl_async(
+                DailyEntry(date=self.date, pnl=pnl, notes=notes),
+                previous=self.previous, on_error=self._failure_callback()
             )
             
             self.dialog.destroy()
@@ -352,4 +394,19 @@ class EditDayDialog:
             
         except ValueError:
             # Show error - simplified for minimal implementation
-            pass
\ No newline at end of file
+            pass
+    
+    def _failure_callback(self):
+        """Callback for a failed queued write that reports it and refreshes on the Tk thread"""
+        master = self.dialog.master
+        refresh = self.refresh_callback
+        
+        def on_error(error: Exception):
+            def report():
+                messagebox.showerror("Error", f"Failed to save entry: {error}")
+                try:
+                    refresh()  # Drops the optimistic values
+                except tk.TclError:
+                    pass
+            master.after(0, report)
+        return on_error
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Worker Pool Module for PropFire
+One bounded pool of worker threads for background jobs (news fetches, month
+loads, exports, imports). Jobs wait in a priority queue. Jobs on a channel
+carry its generation token: submitting newer work on the channel supersedes
+them, so stale jobs are skipped before they start and late results dropped.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+PRIORITY_UI = 0  # Something on screen is waiting for the result
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2  # Exports, imports and other long jobs
+MAX_WORKERS = 4
+
+class Channel:
+    """Generation token for a stream of jobs where only the newest matters (e.g. a window's month loads)"""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def advance(self) -> int:
+        """Start a new generation, superseding every job of the earlier ones"""
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def cancel(self):
+        """Supersede every job submitted so far, e.g. when their window closes"""
+        self.advance()
+
+    def is_current(self, generation: int) -> bool:
+        """Check if nothing newer has been submitted since a generation"""
+        return generation == self._generation
+
+@dataclass
+class Job:
+    """Queued call with its priority, generation and callbacks"""
+    fn: Callable[[], Any]
+    description: str
+    priority: int = PRIORITY_NORMAL
+    channel: Optional[Channel] = None
+    generation: int = 0
+    on_done: Optional[Callable[[Any], None]] = None
+    on_error: Optional[Callable[[Exception], None]] = None
+    deliver: Optional[Callable[[Callable[[], None]], None]] = None  # e.g. schedules on the Tk thread
+    cancelled: bool = field(default=False, repr=False)
+
+    def cancel(self):
+        """Skip the job if it hasn't started, and drop its result if it has"""
+        self.cancelled = True
+
+    def is_current(self) -> bool:
+        """Check if the job is neither cancelled nor superseded on its channel"""
+        return not self.cancelled and (self.channel is None or self.channel.is_current(self.generation))
+
+@dataclass
+class PoolStats:
+    """Counters of what the pool did, for spotting wasted work"""
+    submitted: int = 0
+    completed: int = 0
+    skipped: int = 0  # Superseded or cancelled before starting
+    dropped: int = 0  # Finished after being superseded; result discarded
+    failed: int = 0
+    workers: int = 0
+
+class WorkerPool:
+    """Bounded worker threads taking jobs from a priority queue"""
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self._queue: List[tuple] = []  # (priority, sequence, job) heap; FIFO within a priority
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._idle = 0
+        self._running = 0
+        self._shutdown = False
+        self._stats = PoolStats()
+
+    def submit(self, fn: Callable[[], Any], description: str = "", priority: int = PRIORITY_NORMAL,
+               channel: Optional[Channel] = None, on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               deliver: Optional[Callable[[Callable[[], None]], None]] = None) -> Job:
+        """Queue a job; on a channel it supersedes every earlier job there.
+        Callbacks run on the worker thread, or through deliver (e.g. lambda f: widget.after(0, f))"""
+        job = Job(fn, description or getattr(fn, "__name__", "job"), priority, channel,
+                  channel.advance() if channel else 0, on_done, on_error, deliver)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Worker pool is shut down")
+            heapq.heappush(self._queue, (priority, next(self._sequence), job))
+            self._stats.submitted += 1
+            if self._idle == 0 and len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._run, name=f"worker-{len(self._workers) + 1}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            else:
+                self._cond.notify()
+        return job
+
+    def _run(self):
+        """Worker loop: run the most urgent job that is still wanted"""
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._queue and not self._shutdown:
+                    self._cond.wait()
+                self._idle -= 1
+                if self._shutdown:
+                    return
+                job = heapq.heappop(self._queue)[2]
+                if not job.is_current():
+                    self._stats.skipped += 1
+                    continue
+                self._running += 1
+            try:
+                self._execute(job)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def _execute(self, job: Job):
+        """Run a job and hand its outcome to its callbacks, unless it went stale meanwhile"""
+        try:
+            result, error = job.fn(), None
+        except Exception as e:
+            result, error = None, e
+            print(f"DEBUG: Background job failed ({job.description}): {e}")
+        with self._cond:
+            if not job.is_current():
+                self._stats.dropped += 1
+                return
+            if error:
+                self._stats.failed += 1
+            else:
+                self._stats.completed += 1
+        callback, value = (job.on_error, error) if error else (job.on_done, result)
+        if callback is None:
+            return
+
+        def call():
+            # Checked again: newer work may have arrived while this was being scheduled
+            if job.is_current():
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"DEBUG: Job callback error ({job.description}): {e}")
+        if job.deliver is None:
+            call()
+            return
+        try:
+            job.deliver(call)
+        except Exception as e:
+            print(f"DEBUG: Could not deliver result of {job.description}: {e}")
+
+    def stats(self) -> PoolStats:
+        """Snapshot of the counters"""
+        with self._cond:
+            return PoolStats(**{**self._stats.__dict__, "workers": len(self._workers)})
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Drop queued jobs and wait for running ones; False if some were still running at the timeout"""
+        with self._cond:
+            self._shutdown = True
+            for _, _, job in self._queue:
+                job.cancel()
+            self._stats.skipped += len(self._queue)
+            self._queue.clear()
+            self._cond.notify_all()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+def get_worker_pool() -> WorkerPool:
+    """Get the process-wide worker pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+def shutdown_worker_pool(timeout: Optional[float] = None) -> bool:
+    """Shut down the process-wide pool; the next get_worker_pool() starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    return pool.shutdown(timeout) if pool else True
@@ -0,0 +1,143 @@
+"""
+Write Queue Module for PropFire
+Write-behind queue: dialogs hand saves to one writer thread per store, which
+commits everything pending in a single transaction and reports each outcome
+back, so the UI never waits on the disk or on another process's lock
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from database import ConnectionManager
+
+MAX_BATCH = 200
+# Backoff between attempts while another process holds the write lock; each
+# attempt already waits out the connection's busy timeout
+RETRY_DELAYS = (0.5, 1.0, 2.0, 4.0, 8.0)
+
+@dataclass
+class PendingWrite:
+    """One queued save"""
+    apply: Callable[[], Any]  # Runs on the writer thread inside the batch transaction
+    description: str
+    on_done: Optional[Callable[[Any], None]] = None
+    on_error: Optional[Callable[[Exception], None]] = None
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    """Check if an error means the database was locked by someone else"""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+class WriteBehindQueue:
+    """Single writer thread that applies queued saves in batched transactions"""
+
+    def __init__(self, db: ConnectionManager, max_batch: int = MAX_BATCH):
+        self.db = db
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[PendingWrite]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+
+    def submit(self, apply: Callable[[], Any], description: str,
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None):
+        """Queue a write; callbacks run on the writer thread once it commits or fails"""
+        with self._lock:
+            self._pending += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+                self._thread.start()
+        self._queue.put(PendingWrite(apply, description, on_done, on_error))
+
+    def pending(self) -> int:
+        """Number of writes not yet committed or failed"""
+        with self._lock:
+            return self._pending
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued write has been applied; False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def _run(self):
+        """Writer loop: take whatever is queued and commit it as one batch"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                with self._idle:
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+
+    def _write_batch(self, batch):
+        """Apply a batch in one transaction, retrying while the database is locked"""
+        started = time.perf_counter()
+        for delay in RETRY_DELAYS + (None,):
+            outcomes = []
+            try:
+                with self.db.transaction():
+                    for write in batch:
+                        # A savepoint per write: one bad save doesn't sink the batch
+                        try:
+                            with self.db.transaction():
+                                outcomes.append((write, write.apply(), None))
+                        except sqlite3.OperationalError as e:
+                            if _is_busy(e):
+                                raise
+                            outcomes.append((write, None, e))
+                        except Exception as e:
+                            outcomes.append((write, None, e))
+                break
+            except sqlite3.OperationalError as e:
+                if delay is None or not _is_busy(e):
+                    outcomes = [(write, None, e) for write in batch]
+                    break
+                print(f"DEBUG: Database busy, retrying {len(batch)} queued write(s) in {delay}s")
+                time.sleep(delay)
+            except Exception as e:
+                # Any other failure of the batch still reaches every write's on_error,
+                # and the writer thread lives on for the next batch
+                outcomes = [(write, None, e) for write in batch]
+                break
+
+        failed = sum(1 for _, _, error in outcomes if error)
+        print(f"DEBUG: Wrote {len(batch) - failed} queued write(s) in "
+              f"{(time.perf_counter() - started) * 1000:.1f} ms, {failed} failed")
+        for write, result, error in outcomes:
+            callback, value = (write.on_error, error) if error else (write.on_done, result)
+            if error:
+                print(f"DEBUG: Queued write failed ({write.description}): {error}")
+            if callback:
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"DEBUG: Write callback error ({write.description}): {e}")
+
+_queues: "weakref.WeakKeyDictionary[ConnectionManager, WriteBehindQueue]" = weakref.WeakKeyDictionary()
+_queues_lock = threading.Lock()
+
+def get_write_queue(db: ConnectionManager) -> WriteBehindQueue:
+    """Get the write queue shared by every repository on a database"""
+    with _queues_lock:
+        writes = _queues.get(db)
+        if writes is None:
+            writes = _queues[db] = WriteBehindQueue(db)
+        return writes
+
+def flush_write_queues(timeout: Optional[float] = None) -> bool:
+    """Wait for every queue to drain, e.g. before closing the databases on exit"""
+    with _queues_lock:
+        queues = list(_queues.values())
+    return all(writes.flush(timeout) for writes in queues)